@@ -1,21 +1,30 @@
 # API ESIEE - Gestion des salles et réservations
 # Version avec autodeploy configuré
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, send_file
 from datetime import datetime, timedelta
+import os
 import requests
 import threading
 from collections import defaultdict
 from cache_manager import (
     get_cached_events, get_cached_room_schedules, get_cached_rooms_data,
     get_cached_available_rooms, get_cache_stats, force_cache_refresh,
-    cache_manager
+    get_cached_week_events, get_cached_room_events, get_cached_room_schedule_index, get_event_store,
+    get_cache_snapshot, begin_request_snapshot, end_request_snapshot, cache_manager
 )
-from events_api import get_events_next_week, get_events_for_room, get_available_rooms_today
+from response_cache import IDENTITY, response_cache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_cache_metrics
+from request_metrics import request_metrics
+from request_profiler import PROFILE_HEADER, request_profiler
+from schedule_index import DAY_NAMES, build_week_schedule, empty_week_schedule
 from user_manager import user_manager
 from posthog_tracking import capture_event, capture_exception
 
 app = Flask(__name__)
 
+# Instrumentation enregistrée en premier : elle englobe les autres hooks
+request_metrics.install(app)
+
 ALLOWED_ORIGINS = [
     'http://localhost:8000',
     'http://localhost:5500',
@@ -29,7 +38,8 @@ def apply_cors(response):
         response.headers['Access-Control-Allow-Origin'] = origin
         response.headers['Access-Control-Allow-Credentials'] = 'true'
         response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-CSRF-Token'
+        response.headers['Access-Control-Allow-Headers'] = f'Content-Type, Authorization, X-CSRF-Token, {PROFILE_HEADER}'
+        response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Timestamp, X-Cache-Version, X-Profile'
     return response
 
 @app.before_request
@@ -39,6 +49,28 @@ def handle_preflight():
         apply_cors(response)
         return response
 
+# Un seul instantané du cache par requête : un rafraîchissement concurrent
+# ne mélange pas deux versions dans une même réponse
+@app.before_request
+def pin_cache_snapshot():
+    begin_request_snapshot()
+
+@app.teardown_request
+def release_cache_snapshot(exc):
+    end_request_snapshot()
+
+# Rafraîchissement avant expiration, hors du chemin des requêtes : démarré à la
+# première requête de chaque processus (workers gunicorn, export WSGI), donc
+# après un éventuel fork qui ne conserve pas le thread
+refresher_pid = None
+
+@app.before_request
+def ensure_background_refresh():
+    global refresher_pid
+    if refresher_pid != os.getpid():
+        refresher_pid = os.getpid()
+        cache_manager.start_background_refresh()
+
 # Verrou global pour éviter les race conditions sur les réservations
 reservation_lock = threading.Lock()
 
@@ -149,91 +181,19 @@ def get_room_schedule_from_cache(room_number, week_offset=0):
     Récupère l'emploi du temps d'une salle depuis le cache (ultra rapide)
     """
     try:
-        # Pour cette semaine (week_offset=0), utiliser le cache
+        # Pour cette semaine (week_offset=0), lecture directe de l'index par salle et par jour
         if week_offset == 0:
-            # Construire le nom complet de la salle
-            room_full_name = f"PER - {room_number}"
-
-            # Récupérer tous les événements depuis le cache
-            all_events = get_cached_events()
-
-            # Filtrer les événements pour cette salle
-            room_events = []
-            for event in all_events:
-                if event.get('room_full') == room_full_name:
-                    room_events.append(event)
-
-            # Organiser par jour de la semaine
-            schedule = {
-                'monday': [], 'tuesday': [], 'wednesday': [], 'thursday': [],
-                'friday': [], 'saturday': [], 'sunday': []
-            }
-
-            day_mapping = {
-                0: 'monday', 1: 'tuesday', 2: 'wednesday', 3: 'thursday',
-                4: 'friday', 5: 'saturday', 6: 'sunday'
-            }
-
-            for event in room_events:
-                start_time = event.get('start_datetime')
-                end_time = event.get('end_datetime')
-
-                if isinstance(start_time, datetime) and isinstance(end_time, datetime):
-                    day_name = day_mapping.get(start_time.weekday())
-                    if day_name:
-                        schedule[day_name].append({
-                            'start': start_time.strftime('%H:%M'),
-                            'end': end_time.strftime('%H:%M'),
-                            'course': event.get('summary', 'Cours'),
-                            'full_event': event
-                        })
-
-            # Trier chaque jour par heure de début
-            for day in schedule:
-                schedule[day].sort(key=lambda x: x['start'])
+            index = get_cached_room_schedule_index()
+            if index is not None:
+                return index.schedule(room_number)
 
-            return schedule
-
-        else:
-            # Pour les autres semaines, utiliser l'ancienne méthode (plus lent mais nécessaire)
-            room_full_name = f"PER - {room_number}"
-            events = get_events_for_room(room_full_name, week_offset)
-
-            schedule = {
-                'monday': [], 'tuesday': [], 'wednesday': [], 'thursday': [],
-                'friday': [], 'saturday': [], 'sunday': []
-            }
-
-            day_mapping = {
-                0: 'monday', 1: 'tuesday', 2: 'wednesday', 3: 'thursday',
-                4: 'friday', 5: 'saturday', 6: 'sunday'
-            }
-
-            for event in events:
-                start_time = event.get('start_datetime')
-                end_time = event.get('end_datetime')
-
-                if isinstance(start_time, datetime) and isinstance(end_time, datetime):
-                    day_name = day_mapping.get(start_time.weekday())
-                    if day_name:
-                        schedule[day_name].append({
-                            'start': start_time.strftime('%H:%M'),
-                            'end': end_time.strftime('%H:%M'),
-                            'course': event.get('summary', 'Cours'),
-                            'full_event': event
-                        })
-
-            for day in schedule:
-                schedule[day].sort(key=lambda x: x['start'])
-
-            return schedule
+        # Pour les autres semaines, utiliser le découpage par semaine du cache
+        room_full_name = f"PER - {room_number}"
+        return build_week_schedule(get_cached_room_events(room_full_name, week_offset))
 
     except Exception as e:
         print(f"Erreur lors de la récupération de l'emploi du temps de {room_number}: {e}")
-        return {
-            'monday': [], 'tuesday': [], 'wednesday': [], 'thursday': [],
-            'friday': [], 'saturday': [], 'sunday': []
-        }
+        return empty_week_schedule()
 
 def is_room_available_at_time(room_number, day, time):
     """
@@ -248,28 +208,14 @@ def is_room_available_at_time(room_number, day, time):
     Returns:
         bool: True si la salle est libre, False sinon
     """
-    schedule = get_room_schedule_from_cache(room_number)
-    day_schedule = schedule.get(day, [])
+    index = get_cached_room_schedule_index()
+    if index is None or day not in DAY_NAMES:
+        return True  # Aucun cours connu = salle libre
 
-    if not day_schedule:
-        return True  # Aucun cours prévu = salle libre
+    hours, minutes = map(int, time.split(':'))
 
-    # Convertir l'heure en minutes pour faciliter la comparaison
-    def time_to_minutes(time_str):
-        hours, minutes = map(int, time_str.split(':'))
-        return hours * 60 + minutes
-
-    current_time_minutes = time_to_minutes(time)
-
-    # Vérifier si l'heure actuelle est dans une plage de cours
-    for course in day_schedule:
-        start_minutes = time_to_minutes(course['start'])
-        end_minutes = time_to_minutes(course['end'])
-
-        if start_minutes <= current_time_minutes < end_minutes:
-            return False  # Salle occupée par un cours
-
-    return True  # Aucun conflit trouvé = salle libre
+    # Recherche dichotomique dans les créneaux du jour (index par salle)
+    return index.is_free(room_number, DAY_NAMES.index(day), hours * 60 + minutes)
 
 def get_room_availability_from_api(room_number):
     """
@@ -336,6 +282,43 @@ def get_room_floor(room_number):
     }
     return floor_map.get(second_digit, 'Étage inconnu')
 
+def cached_json_response(name, key, build):
+    """
+    Réponse JSON pré-sérialisée, rendue une fois par clé (voir response_cache)
+
+    Le corps ne contient pas d'horodatage : l'heure de la réponse est dans
+    l'en-tête X-Timestamp, et If-None-Match reçoit un 304 sans sérialisation.
+    La variante (br, gzip ou brute) est choisie selon Accept-Encoding, déjà
+    compressée au rendu.
+    """
+    rendered = response_cache.get(name, key, lambda: app.json.dumps(build()).encode('utf-8'))
+
+    encoding = request.accept_encodings.best_match(rendered.encodings, default=IDENTITY)
+    variant = rendered.variants[encoding]
+
+    if request.if_none_match.contains(variant.etag):
+        response_cache.record_sent(rendered, encoding, not_modified=True)
+        response = app.response_class(status=304)
+    else:
+        response_cache.record_sent(rendered, encoding)
+        response = app.response_class(variant.body, mimetype='application/json')
+        if encoding != IDENTITY:
+            response.headers['Content-Encoding'] = encoding
+
+    response.set_etag(variant.etag)
+    response.vary.add('Accept-Encoding')
+    # Revalidation systématique : le navigateur renvoie l'ETag et reçoit un 304
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Timestamp'] = datetime.now().isoformat()
+    snapshot = get_cache_snapshot()
+    if snapshot is not None:
+        response.headers['X-Cache-Version'] = str(snapshot.version)
+    return response
+
+def snapshot_key(snapshot):
+    """Clé de rendu d'un instantané : change à chaque publication"""
+    return (snapshot.version, snapshot.last_update) if snapshot is not None else None
+
 @app.route('/api/rooms', methods=['GET'])
 def get_rooms():
     """Endpoint pour récupérer toutes les salles avec leurs emplois du temps (100% dynamique)"""
@@ -343,33 +326,7 @@ def get_rooms():
     init_cache_if_needed()
 
     try:
-        rooms_data = get_dynamic_rooms_data()
-        room_schedules = get_dynamic_room_schedules()
-        rooms = []
-
-        for room_number, room_info in rooms_data.items():
-            room_data = {
-                'number': room_number,
-                'schedule': room_schedules.get(room_number, []),  # Emploi du temps au lieu du statut
-                'name': room_info['name'],
-                'board': room_info['board'],
-                'capacity': room_info['capacity'],
-                'type': room_info['type'],
-                'epis': get_room_epis(room_number),
-                'floor': get_room_floor(room_number)
-            }
-            rooms.append(room_data)
-
-        return jsonify({
-            'success': True,
-            'rooms': rooms_data,
-            'room_schedules': room_schedules,  # Emplois du temps pour calcul côté client
-            'rooms_list': rooms,
-            'total_rooms': len(rooms_data),
-            'dynamic': True,
-            'client_status_calculation': True,  # Flag pour indiquer que le client doit calculer les statuts
-            'timestamp': datetime.now().isoformat()
-        })
+        return cached_json_response('rooms', snapshot_key(get_cache_snapshot()), build_rooms_payload)
 
     except Exception as e:
         return jsonify({
@@ -377,6 +334,35 @@ def get_rooms():
             'error': str(e)
         }), 500
 
+def build_rooms_payload():
+    """Corps de /api/rooms (rendu une fois par instantané)"""
+    rooms_data = get_dynamic_rooms_data()
+    room_schedules = get_dynamic_room_schedules()
+    rooms = []
+
+    for room_number, room_info in rooms_data.items():
+        room_data = {
+            'number': room_number,
+            'schedule': room_schedules.get(room_number, []),  # Emploi du temps au lieu du statut
+            'name': room_info['name'],
+            'board': room_info['board'],
+            'capacity': room_info['capacity'],
+            'type': room_info['type'],
+            'epis': get_room_epis(room_number),
+            'floor': get_room_floor(room_number)
+        }
+        rooms.append(room_data)
+
+    return {
+        'success': True,
+        'rooms': rooms_data,
+        'room_schedules': room_schedules,  # Emplois du temps pour calcul côté client
+        'rooms_list': rooms,
+        'total_rooms': len(rooms_data),
+        'dynamic': True,
+        'client_status_calculation': True  # Flag pour indiquer que le client doit calculer les statuts
+    }
+
 @app.route('/api/rooms/<room_number>', methods=['GET'])
 def get_room(room_number):
     """Endpoint pour récupérer les détails d'une salle spécifique (100% dynamique)"""
@@ -509,56 +495,10 @@ def get_room_availability(room_number):
 def get_stats():
     """Endpoint pour récupérer les statistiques des salles (100% dynamique)"""
     try:
-        rooms_data = get_dynamic_rooms_data()
-        room_schedules = get_dynamic_room_schedules()
-        
-        # Calculer les statuts en temps réel
-        now = datetime.now()
-        day_mapping = {
-            0: 'monday', 1: 'tuesday', 2: 'wednesday', 3: 'thursday',
-            4: 'friday', 5: 'saturday', 6: 'sunday'
-        }
-        current_day = day_mapping.get(now.weekday(), 'monday')
-        current_time = now.strftime('%H:%M')
-        
-        total_rooms = len(rooms_data)
-        free_rooms = 0
-        
-        for room_number in rooms_data.keys():
-            if is_room_available_at_time(room_number, current_day, current_time):
-                free_rooms += 1
-        
-        occupied_rooms = total_rooms - free_rooms
-
-        # Statistiques par type
-        types_stats = {}
-        for room_info in rooms_data.values():
-            room_type = room_info['type']
-            if room_type not in types_stats:
-                types_stats[room_type] = 0
-            types_stats[room_type] += 1
-
-        # Statistiques par Epis
-        epis_stats = {}
-        for room_number in rooms_data.keys():
-            epis = get_room_epis(room_number)
-            if epis not in epis_stats:
-                epis_stats[epis] = 0
-            epis_stats[epis] += 1
-
-        return jsonify({
-            'success': True,
-            'stats': {
-                'total_rooms': total_rooms,
-                'free_rooms': free_rooms,
-                'occupied_rooms': occupied_rooms,
-                'availability_rate': round((free_rooms / total_rooms) * 100, 1) if total_rooms > 0 else 0,
-                'types': types_stats,
-                'epis': epis_stats
-            },
-            'dynamic': True,
-            'timestamp': datetime.now().isoformat()
-        })
+        # Les statuts dépendent de la minute courante : un rendu par instantané et par minute
+        now = datetime.now().replace(second=0, microsecond=0)
+        key = (snapshot_key(get_cache_snapshot()), now)
+        return cached_json_response('stats', key, lambda: build_stats_payload(now))
 
     except Exception as e:
         return jsonify({
@@ -566,45 +506,79 @@ def get_stats():
             'error': str(e)
         }), 500
 
+def build_stats_payload(now):
+    """Corps de /api/stats pour une minute donnée"""
+    rooms_data = get_dynamic_rooms_data()
+    store = get_event_store()
+
+    # Calculer les statuts en temps réel (un seul masque vectorisé pour toutes les salles)
+    occupied = store.occupied_rooms(now) if store is not None else set()
+
+    total_rooms = len(rooms_data)
+    occupied_rooms = sum(1 for room_number in rooms_data if room_number in occupied)
+    free_rooms = total_rooms - occupied_rooms
+
+    # Taux d'occupation moyen de la journée (8h-20h)
+    day_start = now.replace(hour=8, minute=0)
+    rates = store.occupancy_rates(day_start, day_start + timedelta(hours=12)) if store is not None else {}
+    occupancy_rate_today = (sum(rates.get(room_number, 0.0) for room_number in rooms_data) / total_rooms
+                            if total_rooms > 0 else 0)
+
+    # Statistiques par type
+    types_stats = {}
+    for room_info in rooms_data.values():
+        room_type = room_info['type']
+        if room_type not in types_stats:
+            types_stats[room_type] = 0
+        types_stats[room_type] += 1
+
+    # Statistiques par Epis
+    epis_stats = {}
+    for room_number in rooms_data.keys():
+        epis = get_room_epis(room_number)
+        if epis not in epis_stats:
+            epis_stats[epis] = 0
+        epis_stats[epis] += 1
+
+    return {
+        'success': True,
+        'stats': {
+            'total_rooms': total_rooms,
+            'free_rooms': free_rooms,
+            'occupied_rooms': occupied_rooms,
+            'availability_rate': round((free_rooms / total_rooms) * 100, 1) if total_rooms > 0 else 0,
+            'occupancy_rate_today': round(occupancy_rate_today * 100, 1),
+            'types': types_stats,
+            'epis': epis_stats
+        },
+        'dynamic': True
+    }
+
 # Nouveaux endpoints pour les événements ESIEE
 
+def format_event(event):
+    """Forme JSON d'un événement pour les endpoints /api/events et /api/rooms"""
+    start_time = event.start_datetime
+    end_time = event.end_datetime
+
+    return {
+        'summary': event.summary,
+        'location': event.room_full,
+        'start_time': start_time.isoformat() if isinstance(start_time, datetime) else None,
+        'end_time': end_time.isoformat() if isinstance(end_time, datetime) else None,
+        'start_date': start_time.strftime('%Y-%m-%d') if isinstance(start_time, datetime) else None,
+        'start_hour': start_time.strftime('%H:%M') if isinstance(start_time, datetime) else None,
+        'end_hour': end_time.strftime('%H:%M') if isinstance(end_time, datetime) else None,
+        'day_of_week': start_time.strftime('%A') if isinstance(start_time, datetime) else None
+    }
+
 @app.route('/api/events/this-week', methods=['GET'])
 def get_events_this_week_endpoint():
     """Endpoint pour récupérer tous les événements de cette semaine (depuis le cache)"""
     try:
-        # Utiliser le cache au lieu de l'API directe
-        events = get_cached_events()
-
-        # Formater les événements pour l'API
-        formatted_events = []
-        for event in events:
-            start_time = event.get('start_datetime')
-            end_time = event.get('end_datetime')
-
-            formatted_event = {
-                'summary': event.get('summary', ''),
-                'location': event.get('room_full', ''),
-                'start_time': start_time.isoformat() if isinstance(start_time, datetime) else None,
-                'end_time': end_time.isoformat() if isinstance(end_time, datetime) else None,
-                'start_date': start_time.strftime('%Y-%m-%d') if isinstance(start_time, datetime) else None,
-                'start_hour': start_time.strftime('%H:%M') if isinstance(start_time, datetime) else None,
-                'end_hour': end_time.strftime('%H:%M') if isinstance(end_time, datetime) else None,
-                'day_of_week': start_time.strftime('%A') if isinstance(start_time, datetime) else None
-            }
-            formatted_events.append(formatted_event)
-
-        # Ajouter les infos du cache
-        cache_info = cache_manager.get_cache_info()
-
-        return jsonify({
-            'success': True,
-            'events': formatted_events,
-            'total_events': len(formatted_events),
-            'week': 'current',
-            'cached': True,
-            'cache_info': cache_info,
-            'timestamp': datetime.now().isoformat()
-        })
+        snapshot = get_cache_snapshot()
+        return cached_json_response('events_this_week', snapshot_key(snapshot),
+                                    lambda: build_events_this_week_payload(snapshot))
 
     except Exception as e:
         return jsonify({
@@ -612,29 +586,35 @@ def get_events_this_week_endpoint():
             'error': str(e)
         }), 500
 
+def build_events_this_week_payload(snapshot):
+    """Corps de /api/events/this-week (rendu une fois par instantané)"""
+    # Utiliser le cache au lieu de l'API directe
+    events = get_cached_events()
+
+    # Formater les événements pour l'API
+    formatted_events = [format_event(event) for event in events]
+
+    return {
+        'success': True,
+        'events': formatted_events,
+        'total_events': len(formatted_events),
+        'week': 'current',
+        'cached': True,
+        # Infos stables de l'instantané (l'état détaillé du cache est sur /api/cache/status)
+        'cache_info': {
+            'version': snapshot.version if snapshot else 0,
+            'last_update': snapshot.last_update.isoformat() if snapshot and snapshot.last_update else None
+        }
+    }
+
 @app.route('/api/events/next-week', methods=['GET'])
 def get_events_next_week_endpoint():
     """Endpoint pour récupérer tous les événements de la semaine prochaine"""
     try:
-        events = get_events_next_week()
+        events = get_cached_week_events(1)
 
         # Formater les événements pour l'API
-        formatted_events = []
-        for event in events:
-            start_time = event.get('start_datetime')
-            end_time = event.get('end_datetime')
-
-            formatted_event = {
-                'summary': event.get('summary', ''),
-                'location': event.get('room_full', ''),
-                'start_time': start_time.isoformat() if isinstance(start_time, datetime) else None,
-                'end_time': end_time.isoformat() if isinstance(end_time, datetime) else None,
-                'start_date': start_time.strftime('%Y-%m-%d') if isinstance(start_time, datetime) else None,
-                'start_hour': start_time.strftime('%H:%M') if isinstance(start_time, datetime) else None,
-                'end_hour': end_time.strftime('%H:%M') if isinstance(end_time, datetime) else None,
-                'day_of_week': start_time.strftime('%A') if isinstance(start_time, datetime) else None
-            }
-            formatted_events.append(formatted_event)
+        formatted_events = [format_event(event) for event in events]
 
         return jsonify({
             'success': True,
@@ -658,25 +638,10 @@ def get_room_events_endpoint(room_number):
         week_offset = request.args.get('week', 0, type=int)
 
         room_full_name = f"PER - {room_number}"
-        events = get_events_for_room(room_full_name, week_offset)
+        events = get_cached_room_events(room_full_name, week_offset)
 
         # Formater les événements pour l'API
-        formatted_events = []
-        for event in events:
-            start_time = event.get('start_datetime')
-            end_time = event.get('end_datetime')
-
-            formatted_event = {
-                'summary': event.get('summary', ''),
-                'location': event.get('room_full', ''),
-                'start_time': start_time.isoformat() if isinstance(start_time, datetime) else None,
-                'end_time': end_time.isoformat() if isinstance(end_time, datetime) else None,
-                'start_date': start_time.strftime('%Y-%m-%d') if isinstance(start_time, datetime) else None,
-                'start_hour': start_time.strftime('%H:%M') if isinstance(start_time, datetime) else None,
-                'end_hour': end_time.strftime('%H:%M') if isinstance(end_time, datetime) else None,
-                'day_of_week': start_time.strftime('%A') if isinstance(start_time, datetime) else None
-            }
-            formatted_events.append(formatted_event)
+        formatted_events = [format_event(event) for event in events]
 
         return jsonify({
             'success': True,
@@ -698,7 +663,7 @@ def get_room_events_endpoint(room_number):
 def get_available_rooms_endpoint():
     """Endpoint pour récupérer les salles disponibles maintenant"""
     try:
-        available_rooms = get_available_rooms_today()
+        available_rooms = get_cached_available_rooms()
 
         # Filtrer et formater les salles PER avec données dynamiques
         rooms_data = get_dynamic_rooms_data()
@@ -748,7 +713,7 @@ def search_room_endpoint(room_query):
             room_query = room_query.replace('PER - ', '')
 
         # Récupérer les événements de la salle
-        events = get_events_for_room(room_full_name, week_offset=0)
+        events = get_cached_room_events(room_full_name, week_offset=0)
 
         result = {
             'room_number': room_query,
@@ -764,13 +729,13 @@ def search_room_endpoint(room_query):
 
             found_event = None
             for event in events:
-                start_time = event.get('start_datetime')
-                end_time = event.get('end_datetime')
+                start_time = event.start_datetime
+                end_time = event.end_datetime
 
                 if isinstance(start_time, datetime) and isinstance(end_time, datetime):
                     if start_time <= query_datetime <= end_time:
                         found_event = {
-                            'summary': event.get('summary', ''),
+                            'summary': event.summary,
                             'start_time': start_time.isoformat(),
                             'end_time': end_time.isoformat(),
                             'start_hour': start_time.strftime('%H:%M'),
@@ -813,6 +778,7 @@ def get_cache_status():
     """Endpoint pour récupérer l'état du cache"""
     try:
         cache_info = cache_manager.get_cache_info()
+        cache_info['response_cache'] = response_cache.get_info()
         stats = get_cache_stats()
 
         return jsonify({
@@ -828,6 +794,60 @@ def get_cache_status():
             'error': str(e)
         }), 500
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Endpoint Prometheus : métriques du cache, des rafraîchissements et de l'amont"""
+    body = render_cache_metrics(cache_manager.get_cache_info(), response_cache.get_info(), request_metrics)
+    response = app.response_class(body, mimetype='text/plain')
+    response.headers['Content-Type'] = METRICS_CONTENT_TYPE
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/metrics/requests', methods=['GET'])
+def get_request_metrics():
+    """Endpoint pour récupérer la latence par route et les requêtes les plus lentes"""
+    # Arguments de route (identifiants de réservation, noms de profils...) réservés aux administrateurs
+    return jsonify({
+        'success': True,
+        'requests': request_metrics.get_info(include_args=is_admin_request()),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/cache/changes', methods=['GET'])
+def get_cache_changes():
+    """Endpoint pour récupérer les événements modifiés depuis une version du cache (?since=N)"""
+    try:
+        since_version = request.args.get('since', 0, type=int)
+        changes = cache_manager.get_changes_since(since_version)
+
+        def format_change(event):
+            start_time = event.start_datetime
+            end_time = event.end_datetime
+            return {
+                'uid': event.uid,
+                'summary': event.summary,
+                'location': event.room_full,
+                'start_time': start_time.isoformat() if isinstance(start_time, datetime) else None,
+                'end_time': end_time.isoformat() if isinstance(end_time, datetime) else None
+            }
+
+        return jsonify({
+            'success': True,
+            'version': changes['version'],
+            'since': changes['since'],
+            'full_resync': changes['full_resync'],
+            'added': [format_change(event) for event in changes['added']],
+            'changed': [format_change(event) for event in changes['changed']],
+            'removed': changes['removed'],
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 def csrf_protected(f):
     """
     Décorateur pour protéger les endpoints contre les attaques CSRF
@@ -909,32 +929,21 @@ def refresh_cache():
         }), 500
 
 
-# Variable globale pour le cache en mémoire (Vercel)
-_memory_cache = None
-_cache_timestamp = None
-
 def init_cache_if_needed():
-    """Initialise le cache si nécessaire (pour Vercel serverless)"""
-    global _memory_cache, _cache_timestamp
+    """
+    Initialise le cache si nécessaire (pour Vercel serverless)
 
+    L'instantané publié par cache_manager sert de cache mémoire : pas de
+    copie locale, qui survivrait aux rafraîchissements (et, avec plusieurs
+    workers, aux instantanés publiés par le worker élu).
+    """
     try:
-        # Vérifier si on a déjà un cache en mémoire valide
-        if _memory_cache and _cache_timestamp:
-            age = datetime.now() - _cache_timestamp
-            if age.total_seconds() < 3600:  # Cache valide 1 heure
-                return _memory_cache
-
-        # Tenter de charger depuis le fichier
         cache_data = cache_manager.get_cached_data()
         if not cache_data:
             print("⚠️ Cache vide, forçage du rafraîchissement...")
             cache_manager.force_refresh()
             cache_data = cache_manager.get_cached_data()
 
-        # Stocker en mémoire pour Vercel
-        _memory_cache = cache_data
-        _cache_timestamp = datetime.now()
-
         return cache_data
     except Exception as e:
         print(f"❌ Erreur lors de l'initialisation du cache: {e}")
@@ -975,6 +984,14 @@ def get_current_user_from_request():
     session_token = auth_header[7:]  # Retirer "Bearer "
     return user_manager.validate_session(session_token)
 
+def is_admin_request():
+    """Vrai si la requête vient d'un administrateur (session valide, rôle admin)"""
+    user = get_current_user_from_request()
+    return bool(user and user.get('role') == 'admin')
+
+# Profilage à la demande (X-ESIEE-Profile, administrateurs) et échantillonnage continu
+request_profiler.install(app, is_admin_request)
+
 @app.route('/api/auth/login', methods=['POST'])
 @rate_limit(max_requests=200, window_seconds=900)  # 200 requêtes / 15 min (NAT partagé ~200 users)
 def auth_login():
@@ -1252,6 +1269,75 @@ def admin_whitelist():
             'error': 'Erreur interne du serveur'
         }), 500
 
+@app.route('/api/admin/profiles', methods=['GET', 'POST'])
+@rate_limit(max_requests=100, window_seconds=3600)  # 100 requêtes / heure
+@csrf_protected
+def admin_profiles():
+    """
+    Profils de requêtes (admin uniquement)
+    GET : anneau des fichiers de profil ; POST {"sample_every": N} : échantillonnage continu (0 = arrêt)
+    """
+    try:
+        if not is_admin_request():
+            return jsonify({
+                'success': False,
+                'error': 'Accès administrateur requis'
+            }), 403
+
+        if request.method == 'POST':
+            data = request.get_json()
+            if not data or not isinstance(data.get('sample_every'), int) or data['sample_every'] < 0:
+                return jsonify({
+                    'success': False,
+                    'error': 'sample_every doit être un entier positif ou nul'
+                }), 400
+            request_profiler.sample_every = data['sample_every']
+
+        # Flamegraph cumulé à jour avant listing
+        request_profiler.flush()
+
+        return jsonify({
+            'success': True,
+            'profiler': request_profiler.get_info(),
+            'profiles': request_profiler.list_profiles()
+        })
+
+    except Exception as e:
+        print(f"Erreur lors de la gestion des profils: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erreur interne du serveur'
+        }), 500
+
+@app.route('/api/admin/profiles/<name>', methods=['GET'])
+@rate_limit(max_requests=100, window_seconds=3600)  # 100 requêtes / heure
+def admin_get_profile(name):
+    """
+    Téléchargement d'un fichier de profil (admin uniquement)
+    """
+    try:
+        if not is_admin_request():
+            return jsonify({
+                'success': False,
+                'error': 'Accès administrateur requis'
+            }), 403
+
+        path = request_profiler.profile_path(name)
+        if path is None:
+            return jsonify({
+                'success': False,
+                'error': 'Profil introuvable'
+            }), 404
+
+        return send_file(path, as_attachment=True, download_name=name)
+
+    except Exception as e:
+        print(f"Erreur lors du téléchargement du profil: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Erreur interne du serveur'
+        }), 500
+
 @app.route('/api/reservations', methods=['POST'])
 @rate_limit(max_requests=500, window_seconds=3600)  # 500 requêtes / heure (200 users × ~2-3 résa/h)
 @csrf_protected
@@ -1549,7 +1635,9 @@ if __name__ == '__main__':
     except Exception as e:
         print(f"❌ Erreur lors de l'initialisation du cache: {e}")
 
-    import os
+    # Rafraîchir le cache avant expiration, dès le démarrage
+    cache_manager.start_background_refresh()
+
     port = 3001
     debug = False
 
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark du pipeline d'ingestion iCal
+
+Mesure, sur des flux synthétiques de 1k / 10k / 100k événements :
+- parse    : ESIEEiCalExtractor._parse_ical_content
+- refresh  : ESIEECacheManager.refresh_cache complet (flux rejoué depuis une
+             archive temporaire, sans réseau, sauvegarde de l'instantané comprise)
+- schedules: construction des index de salles (stockage en colonnes et
+             matrice d'occupation) depuis les semaines du cache
+
+Chaque mesure rapporte le meilleur temps sur N répétitions, le débit en
+événements/s et le pic mémoire (tracemalloc, sur une exécution séparée).
+Les résultats sont écrits en JSON et peuvent être comparés à une référence :
+
+    python benchmarks/bench_ingestion.py -o bench.json
+    python benchmarks/bench_ingestion.py --baseline bench.json --fail-on-regression
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from cache_manager import ESIEECacheManager, _build_event_store, per_room_numbers, week_monday
+from feed_archive import ESIEEFeedArchive
+from ical_extractor_final import ESIEEiCalExtractor, ESIEEiCalFinalExtractor
+from occupancy import OccupancyGrid
+from synthetic_feed import feed_options_for_size, generate_feed
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def measure(run: Callable[[], int], repeat: int) -> Dict:
+    """Meilleur temps sur `repeat` exécutions puis pic mémoire sur une exécution tracée"""
+    best = None
+    events = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        events = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'events': events,
+        'seconds': round(best, 4),
+        'events_per_s': round(events / best, 1) if best else None,
+        'peak_mb': round(peak / (1024 * 1024), 2)
+    }
+
+
+class IngestionBench:
+    """Flux synthétique d'une taille donnée et fonctions mesurées"""
+
+    def __init__(self, size: int, workdir: str):
+        self.size = size
+        self.workdir = workdir
+        self.start = week_monday(0)
+        self.options = feed_options_for_size(size)
+        self.weeks = self.options['weeks']
+        self.feed = generate_feed(self.start, **self.options)
+
+        # Archive temporaire : refresh_cache ingère le flux en mode rejeu
+        self.archive = ESIEEFeedArchive(os.path.join(workdir, f'archive-{size}'), max_bytes=1 << 40, level=1)
+        body = self.feed.encode('utf-8')
+        urls = ESIEEiCalFinalExtractor(archive=self.archive, replay=True)._build_urls(self.start, self.weeks)
+        for url in urls:
+            self.archive.store(url, body)
+
+        self.cache_file = os.path.join(workdir, f'cache-{size}.snapshot')
+        self._manager = None
+
+    def parse(self) -> int:
+        extractor = ESIEEiCalExtractor()
+        extractor._parse_ical_content(self.feed)
+        return len(extractor.events_data)
+
+    def refresh(self) -> int:
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+        manager = ESIEECacheManager(cache_file=self.cache_file, prefetch_weeks=self.weeks,
+                                    archive=self.archive, replay=True)
+        if not manager.refresh_cache():
+            raise RuntimeError("refresh_cache a échoué")
+
+        self._manager = manager
+        return sum(len(shard) for shard in manager.cache_data['week_shards'].values())
+
+    def schedules(self) -> int:
+        if self._manager is None:
+            self.refresh()
+
+        week_shards = self._manager.cache_data['week_shards']
+        store = _build_event_store(week_shards)
+
+        room_events = {}
+        for shard in week_shards.values():
+            for event in shard:
+                for room in per_room_numbers(event):
+                    room_events.setdefault(room, []).append(event)
+        OccupancyGrid.from_room_events(room_events, self.start.date(), days=7 * self.weeks)
+
+        return len(store.events)
+
+
+def run_benchmarks(sizes: List[int], repeat: int, benches: List[str]) -> Dict:
+    workdir = tempfile.mkdtemp(prefix='esiee-bench-')
+    results = {name: {} for name in benches}
+
+    try:
+        for size in sizes:
+            print(f"📦 Génération d'un flux de {size} événements...")
+            bench = IngestionBench(size, workdir)
+            print(f"   {bench.options['rooms']} salles, {bench.weeks} semaines, "
+                  f"{len(bench.feed) / (1024 * 1024):.1f} Mo")
+
+            for name in benches:
+                result = measure(getattr(bench, name), repeat)
+                results[name][str(size)] = result
+                print(f"   ⏱️ {name:<10} {result['seconds']:>8.3f}s  "
+                      f"{result['events_per_s']:>10.0f} év/s  pic {result['peak_mb']:.1f} Mo")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Affiche les écarts de débit avec la référence et retourne les régressions"""
+    regressions = []
+    print(f"\n📊 Comparaison avec la référence du {baseline.get('meta', {}).get('date', '?')}")
+
+    for name, sizes in current['results'].items():
+        for size, result in sizes.items():
+            reference = baseline.get('results', {}).get(name, {}).get(size)
+            if not reference or not reference.get('events_per_s') or not result.get('events_per_s'):
+                continue
+
+            ratio = result['events_per_s'] / reference['events_per_s']
+            memory = (result['peak_mb'] / reference['peak_mb']) if reference.get('peak_mb') else None
+            marker = '✅'
+            if ratio < 1 - tolerance:
+                marker = '❌'
+                regressions.append(f"{name}/{size}: débit x{ratio:.2f}")
+
+            memory_str = f", mémoire x{memory:.2f}" if memory is not None else ''
+            print(f"   {marker} {name:<10} {size:>7}: débit x{ratio:.2f}{memory_str}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline d'ingestion iCal")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--bench', nargs='+', choices=['parse', 'refresh', 'schedules'],
+                        default=['parse', 'refresh', 'schedules'])
+    parser.add_argument('-o', '--output', default='bench_ingestion.json')
+    parser.add_argument('--baseline', help="Résultats de référence (JSON) à comparer")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Baisse de débit tolérée avant de signaler une régression (0.2 = 20%%)")
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    # Les modules de l'API configurent le logging en INFO à l'import
+    logging.getLogger().setLevel(logging.WARNING)
+
+    current = run_benchmarks(args.sizes, max(1, args.repeat), args.bench)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print(f"⚠️ {len(regressions)} régression(s): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark du surcoût de l'instrumentation des requêtes (request_metrics.py)
+
+- record : start() + finish() + end() seuls, par requête
+- hooks  : hooks before/after/teardown_request installés sur Flask, appelés
+           dans un contexte de requête (accès à request et à la réponse
+           compris)
+
+    python benchmarks/bench_request_metrics.py --requests 100000 -o bench_request_metrics.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+
+from request_metrics import ESIEERequestMetrics
+
+
+def bench_record(count: int) -> float:
+    """Microsecondes par requête enregistrée, hors Flask"""
+    metrics = ESIEERequestMetrics(slow_requests=10, slow_log_ms=float('inf'))
+    args = {'room_number': '5201'}
+    started = time.perf_counter()
+    for _ in range(count):
+        request_started = metrics.start()
+        metrics.finish(request_started, '/api/rooms/<room_number>/schedule', 'GET', 200, 512, args)
+        metrics.end()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def bench_hooks(count: int) -> float:
+    """
+    Microsecondes par requête pour les trois hooks installés sur Flask
+
+    Les hooks sont appelés directement dans un contexte de requête : le coût
+    du client de test (plusieurs centaines de µs, très bruité) est exclu.
+    """
+    app = Flask(__name__)
+    metrics = ESIEERequestMetrics(slow_requests=10, slow_log_ms=float('inf'))
+    metrics.install(app)
+
+    @app.route('/api/rooms/<room_number>')
+    def room(room_number):
+        return jsonify({'room': room_number})
+
+    before = app.before_request_funcs[None]
+    after = app.after_request_funcs[None]
+    teardown = app.teardown_request_funcs[None]
+
+    with app.test_request_context('/api/rooms/5201'):
+        response = app.make_response(room('5201'))
+        started = time.perf_counter()
+        for _ in range(count):
+            for hook in before:
+                hook()
+            for hook in after:
+                hook(response)
+            for hook in teardown:
+                hook(None)
+        return (time.perf_counter() - started) / count * 1e6
+
+
+def run_benchmarks(count: int, repeat: int) -> Dict:
+    results = {
+        'record_us': round(min(bench_record(count) for _ in range(repeat)), 2),
+        'hooks_us': round(min(bench_hooks(count) for _ in range(repeat)), 2)
+    }
+    print(f"⏱️ enregistrement seul : {results['record_us']:.2f} µs/requête")
+    print(f"⏱️ hooks Flask (before/after/teardown) : {results['hooks_us']:.2f} µs/requête")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du surcoût de l'instrumentation des requêtes")
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='bench_request_metrics.json')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = run_benchmarks(max(1, args.requests), max(1, args.repeat))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
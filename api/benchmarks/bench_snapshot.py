@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark du fichier de cache : ancien JSON contre instantané binaire
+
+Pour chaque taille de flux synthétique (1k / 10k / 100k événements), le
+cache est construit une fois par refresh_cache puis mesuré dans les deux
+formats :
+- save : écriture du fichier (json.dump indenté / write_snapshot)
+- load : relecture seule (json.load + fromisoformat / read_snapshot)
+- cold : démarrage à froid d'un ESIEECacheManager (load_cache, stockage en
+         colonnes compris) jusqu'au premier get_cached_data servi
+- size : taille du fichier sur disque
+
+    python benchmarks/bench_snapshot.py --sizes 1000 10000 -o bench_snapshot.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_ingestion import IngestionBench
+from cache_manager import ESIEECacheManager, _deserialize_cache_data, _serialize_cache_data
+from snapshot import read_snapshot, write_snapshot
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def best_of(run: Callable[[], None], repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 4)
+
+
+def bench_formats(bench: IngestionBench, repeat: int) -> Dict:
+    bench.refresh()
+    manager = bench._manager
+    json_file = os.path.join(bench.workdir, f'legacy-{bench.size}.json')
+    snapshot_file = os.path.join(bench.workdir, f'bench-{bench.size}.snapshot')
+
+    def cold_start(cache_file: str):
+        cold = ESIEECacheManager(cache_file=cache_file, prefetch_weeks=bench.weeks,
+                                 archive=bench.archive, replay=True)
+        if not cold.load_cache() or not cold.get_cached_data():
+            raise RuntimeError(f"cache non rechargé depuis {cache_file}")
+
+    # Ancien format : celui de save_cache avant l'instantané
+    def save_json():
+        cache_content = {
+            'data': _serialize_cache_data(manager.cache_data),
+            'last_update': manager.last_update.isoformat(),
+            'version': manager.version
+        }
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(cache_content, f, ensure_ascii=False, indent=2, default=str)
+
+    def load_json():
+        with open(json_file, 'r', encoding='utf-8') as f:
+            cache_content = json.load(f)
+        return _deserialize_cache_data(cache_content.get('data'))
+
+    def cold_json():
+        # Pas d'instantané à côté : load_cache relit l'ancien JSON
+        cold_start(os.path.splitext(json_file)[0] + '.snapshot')
+
+    def save_snapshot():
+        write_snapshot(snapshot_file, manager.cache_data, manager.version, manager.last_update,
+                       manager.event_store)
+
+    def load_snapshot():
+        return read_snapshot(snapshot_file)
+
+    def cold_snapshot():
+        cold_start(snapshot_file)
+
+    results = {}
+    for name, save, load, cold, path in (('json', save_json, load_json, cold_json, json_file),
+                                         ('snapshot', save_snapshot, load_snapshot, cold_snapshot, snapshot_file)):
+        results[name] = {
+            'save_s': best_of(save, repeat),
+            'load_s': best_of(load, repeat),
+            'cold_s': best_of(cold, repeat),
+            'size_mb': round(os.path.getsize(path) / (1024 * 1024), 2)
+        }
+    return results
+
+
+def run_benchmarks(sizes: List[int], repeat: int) -> Dict:
+    workdir = tempfile.mkdtemp(prefix='esiee-bench-')
+    results = {}
+
+    try:
+        for size in sizes:
+            print(f"📦 Flux de {size} événements...")
+            result = results[str(size)] = bench_formats(IngestionBench(size, workdir), repeat)
+            for name, values in result.items():
+                print(f"   ⏱️ {name:<9} save {values['save_s']:>7.3f}s  load {values['load_s']:>7.3f}s  "
+                      f"froid {values['cold_s']:>7.3f}s  {values['size_mb']:>7.2f} Mo")
+            speedup = result['json']['cold_s'] / result['snapshot']['cold_s'] if result['snapshot']['cold_s'] else 0
+            print(f"   🚀 démarrage à froid x{speedup:.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON / instantané binaire du cache")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='bench_snapshot.json')
+    args = parser.parse_args()
+
+    # Les modules de l'API configurent le logging en INFO à l'import
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = run_benchmarks(args.sizes, max(1, args.repeat))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Vérification du client HTTP partagé contre un serveur edt-consult local
+
+Un http.server local (HTTP/1.1 keep-alive) sert des flux synthétiques, un par
+ressource, avec une latence et des erreurs 503 injectées. Vérifie :
+- pool      : des téléchargements successifs réutilisent les connexions
+- rejeu     : des 503 transitoires sont rejoués, et comptés dans get_http_stats()
+- parallèle : plusieurs ressources sont téléchargées en même temps et fusionnées
+- échec     : un flux toujours en 503 fait échouer l'extraction sans instantané partiel
+
+    python benchmarks/check_http_client.py --resources 4 --delay-ms 200
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client
+from ical_extractor_final import ESIEEiCalFinalExtractor
+from synthetic_feed import generate_feed
+
+
+class StandInServer:
+    """Serveur edt-consult local : un flux par ressource, latence et 503 injectés"""
+
+    def __init__(self, delay_ms: float = 0):
+        self.delay = delay_ms / 1000
+        self.fail_first = 0  # 503 renvoyées avant chaque succès
+        self.always_fail = set()  # Ressources toujours en 503
+        self.requests = 0
+        self.connections = set()
+        self._failures: Dict[str, int] = {}
+        self._feeds: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive : une connexion pour plusieurs requêtes
+
+            def do_GET(self):
+                resource = parse_qs(urlparse(self.path).query).get('resources', ['0'])[0]
+                status, body = server.respond(self.client_address, resource)
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/anonymous_cal.jsp"
+
+    def feed(self, resource: str) -> bytes:
+        """Flux d'une ressource : une semaine propre à chaque ressource, pour que la fusion les additionne"""
+        with self._lock:
+            if resource not in self._feeds:
+                today = datetime.now()
+                monday = datetime(today.year, today.month, today.day) - timedelta(days=today.weekday())
+                offset = int(resource) % 10 if resource.isdigit() else 0
+                self._feeds[resource] = generate_feed(monday + timedelta(weeks=offset), rooms=20, weeks=1,
+                                                      dst_events=False).encode('utf-8')
+            return self._feeds[resource]
+
+    def respond(self, client_address, resource: str):
+        with self._lock:
+            self.requests += 1
+            self.connections.add(client_address)
+            failures = self._failures.get(resource, 0)
+            if resource in self.always_fail or failures < self.fail_first:
+                self._failures[resource] = failures + 1
+                return 503, b'Service Unavailable'
+            self._failures[resource] = 0
+
+        time.sleep(self.delay)
+        return 200, self.feed(resource)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.connections = set()
+            self._failures = {}
+
+    def shutdown(self):
+        self._server.shutdown()
+
+
+def make_extractor(server: StandInServer, resources: List[int]) -> ESIEEiCalFinalExtractor:
+    extractor = ESIEEiCalFinalExtractor(session=http_client.get_http_session(), resources=resources,
+                                        archive=None, replay=False)
+    extractor.base_ical_url = server.base_url
+    return extractor
+
+
+def check_pool(server: StandInServer, fetches: int) -> Dict:
+    server.reset()
+    extractor = make_extractor(server, [410])
+    for _ in range(fetches):
+        extractor.extract_from_ical_url(extractor._build_urls(datetime.now(), 1)[0])
+    # Une seule connexion suffit pour des téléchargements successifs
+    return {'ok': len(server.connections) == 1, 'requests': server.requests, 'connections': len(server.connections)}
+
+
+def check_retries(server: StandInServer) -> Dict:
+    server.reset()
+    server.fail_first = 2
+    retries_before = http_client.get_http_stats()['retries']
+    try:
+        ok = make_extractor(server, [410]).extract_for_week(0)
+    finally:
+        server.fail_first = 0
+    retries = http_client.get_http_stats()['retries'] - retries_before
+    return {'ok': ok and retries == 2, 'requests': server.requests, 'retries': retries}
+
+
+def check_parallel(server: StandInServer, resources: List[int]) -> Dict:
+    server.reset()
+    extractor = make_extractor(server, resources)
+    started = time.perf_counter()
+    ok = extractor.extract_for_week(0)
+    elapsed = time.perf_counter() - started
+
+    # Référence : chaque ressource extraite seule (après la mesure, pour ne pas la fausser)
+    expected = 0
+    for resource in resources:
+        single = make_extractor(server, [resource])
+        single.extract_for_week(0)
+        expected += len(single.events_data)
+
+    # Téléchargements simultanés : bien moins que la somme des latences
+    sequential = server.delay * len(resources)
+    parallel = elapsed < server.delay + (sequential - server.delay) / 2
+    return {'ok': ok and parallel and len(extractor.events_data) == expected, 'elapsed_s': round(elapsed, 3),
+            'sequential_s': round(sequential, 3), 'events': len(extractor.events_data), 'expected_events': expected}
+
+
+def check_failure(server: StandInServer, resources: List[int]) -> Dict:
+    server.reset()
+    server.always_fail = {str(resources[-1])}
+    try:
+        extractor = make_extractor(server, resources)
+        ok = extractor.extract_for_week(0)
+    finally:
+        server.always_fail = set()
+    # Une requête par ressource, plus MAX_RETRIES rejeux pour celle en échec
+    expected_requests = len(resources) + http_client.MAX_RETRIES
+    return {'ok': not ok and not extractor.events_data and server.requests == expected_requests,
+            'requests': server.requests, 'expected_requests': expected_requests}
+
+
+def run_checks(resources: int, delay_ms: float, fetches: int) -> Dict:
+    # Rejeu rapide pour la vérification (backoff lu à la création de la session)
+    http_client.BACKOFF_FACTOR = 0.01
+    resource_ids = [410 + index for index in range(max(2, resources))]
+
+    server = StandInServer(delay_ms)
+    try:
+        results = {
+            'pool': check_pool(server, fetches),
+            'rejeu': check_retries(server),
+            'parallèle': check_parallel(server, resource_ids),
+            'échec': check_failure(server, resource_ids)
+        }
+    finally:
+        server.shutdown()
+
+    for name, result in results.items():
+        details = ', '.join(f"{key}={value}" for key, value in result.items() if key != 'ok')
+        print(f"{'✅' if result['ok'] else '❌'} {name:<10} {details}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérifie le client HTTP partagé contre un serveur local")
+    parser.add_argument('--resources', type=int, default=4)
+    parser.add_argument('--delay-ms', type=float, default=200)
+    parser.add_argument('--fetches', type=int, default=5)
+    args = parser.parse_args()
+
+    # Les modules de l'API configurent le logging en INFO à l'import
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = run_checks(args.resources, args.delay_ms, args.fetches)
+    sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Générateur de flux iCal synthétiques au format edt-consult (ADE)
+
+Produit des flux réalistes pour les benchmarks d'ingestion : nombre de salles,
+de semaines et de cours par jour configurables, LOCATION multi-salles
+("PER - 113\\,112"), lignes repliées à 75 octets (RFC 5545), heures UTC
+et TZID=Europe/Paris, et cours placés autour des changements d'heure.
+
+Utilisation :
+    python benchmarks/synthetic_feed.py --rooms 40 --weeks 8 -o flux.ics
+"""
+
+import argparse
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+    PARIS_TZ = ZoneInfo('Europe/Paris')
+except Exception:
+    PARIS_TZ = None
+
+# Créneaux ESIEE (heure locale de Paris) : début, durée en minutes
+COURSE_SLOTS = [(8, 30, 120), (10, 45, 90), (12, 30, 60), (13, 45, 120), (16, 0, 120), (18, 15, 90)]
+
+COURSE_NAMES = [
+    'Algorithmique et programmation', 'Analyse', 'Anglais', 'Architecture des ordinateurs',
+    'Bases de données', 'Electronique numérique', 'Probabilités et statistiques',
+    'Réseaux', 'Signaux et systèmes', 'Systèmes d\'exploitation', 'Projet', 'Physique'
+]
+
+GROUPS = ['E1', 'E2', 'E3FI', 'E3FE', 'E4FI', 'E4FE', 'E5FI']
+
+
+def room_numbers(count: int) -> List[str]:
+    """Numéros de salles PER : amphis et salles rue (3 chiffres) puis salles des Epis (4 chiffres)"""
+    street = ['110', '112', '113', '115', '160', '164', '165', '210', '260']
+    epis = [f"{epi}{floor}{index:02d}" for epi in range(1, 8) for floor in range(1, 4) for index in range(1, 20)]
+    rooms = street + epis
+    if count > len(rooms):
+        raise ValueError(f"Au plus {len(rooms)} salles synthétiques")
+    return rooms[:count]
+
+
+def fold_line(line: str) -> str:
+    """Replie une ligne à 75 octets (continuation par CRLF + espace)"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # Ne pas couper au milieu d'un caractère UTF-8
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts)
+
+
+def _utc_stamp(local: datetime) -> str:
+    """Heure locale de Paris → horodatage UTC iCal (20251013T083000Z)"""
+    if PARIS_TZ is not None:
+        utc = local.replace(tzinfo=PARIS_TZ).astimezone(timezone.utc)
+    else:
+        utc = local - timedelta(hours=1)
+    return utc.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _last_sunday(year: int, month: int) -> datetime:
+    day = datetime(year, month, 31)
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def dst_probe_dates(start: datetime, end: datetime) -> List[datetime]:
+    """Changements d'heure (derniers dimanches de mars et d'octobre) dans la période"""
+    dates = []
+    for year in range(start.year, end.year + 1):
+        for month in (3, 10):
+            sunday = _last_sunday(year, month)
+            if start <= sunday < end:
+                dates.append(sunday)
+    return dates
+
+
+def iter_feed_lines(start: datetime, rooms: int = 40, weeks: int = 8, events_per_day: int = 4,
+                    multi_room_ratio: float = 0.05, tzid_ratio: float = 0.1, dst_events: bool = True,
+                    max_events: Optional[int] = None, seed: int = 42) -> Iterator[str]:
+    """
+    Lignes (repliées) d'un flux iCal synthétique
+
+    Args:
+        start: Premier jour du flux (un lundi, heure locale)
+        rooms: Nombre de salles PER
+        weeks: Nombre de semaines
+        events_per_day: Cours par salle et par jour ouvré (au plus len(COURSE_SLOTS))
+        multi_room_ratio: Part des cours sur plusieurs salles ("PER - 113\\,112")
+        tzid_ratio: Part des cours en DTSTART;TZID=Europe/Paris au lieu d'UTC
+        dst_events: Ajoute des cours autour des changements d'heure
+        max_events: Nombre maximal de VEVENT
+        seed: Graine du générateur aléatoire (flux reproductibles)
+    """
+    rng = random.Random(seed)
+    numbers = room_numbers(rooms)
+    exported = datetime(2025, 10, 10, 12, 0).strftime('%d/%m/%Y %H:%M')
+    dtstamp = _utc_stamp(datetime(2025, 10, 10, 12, 0))
+    start = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(weeks=weeks)
+    slots = COURSE_SLOTS[:max(1, min(events_per_day, len(COURSE_SLOTS)))]
+    dst_sundays = dst_probe_dates(start, end) if dst_events else []
+    dst_rooms = numbers[:min(len(numbers), 5)]
+
+    # Les cours des changements d'heure sont réservés dans le budget max_events
+    weekly_budget = None
+    if max_events is not None:
+        weekly_budget = max(0, max_events - len(dst_sundays) * len(dst_rooms))
+    count = 0
+
+    yield 'BEGIN:VCALENDAR'
+    yield 'METHOD:REQUEST'
+    yield 'PRODID:-//ADE/version 6.0'
+    yield 'VERSION:2.0'
+    yield 'CALSCALE:GREGORIAN'
+
+    def vevent(local_start: datetime, minutes: int, location: str) -> List[str]:
+        local_end = local_start + timedelta(minutes=minutes)
+        course = rng.choice(COURSE_NAMES)
+        group = rng.choice(GROUPS)
+
+        if rng.random() < tzid_ratio:
+            dates = [f"DTSTART;TZID=Europe/Paris:{local_start.strftime('%Y%m%dT%H%M%S')}",
+                     f"DTEND;TZID=Europe/Paris:{local_end.strftime('%Y%m%dT%H%M%S')}"]
+        else:
+            dates = [f"DTSTART:{_utc_stamp(local_start)}", f"DTEND:{_utc_stamp(local_end)}"]
+
+        return [
+            'BEGIN:VEVENT',
+            f'DTSTAMP:{dtstamp}',
+            *dates,
+            f'SUMMARY:{group} - {course}',
+            f'LOCATION:{location}',
+            fold_line(f'DESCRIPTION:\\n\\n{group}\\n{course}\\nEnseignant {rng.randint(1, 300)}\\n'
+                      f'(Exporté le:{exported})\\n'),
+            f'UID:ADE60{rng.getrandbits(64):016x}{count:08d}',
+            'CREATED:19700101T000000Z',
+            f'LAST-MODIFIED:{dtstamp}',
+            'SEQUENCE:2141',
+            'END:VEVENT'
+        ]
+
+    day = start
+    while day < end:
+        if day.weekday() < 5:
+            for number in numbers:
+                for hour, minute, minutes in slots:
+                    if weekly_budget is not None and count >= weekly_budget:
+                        break
+
+                    if rng.random() < multi_room_ratio:
+                        extra = rng.sample(numbers, k=min(len(numbers), rng.randint(1, 3)))
+                        location = 'PER - ' + '\\,'.join([number] + [room for room in extra if room != number])
+                    else:
+                        location = f'PER - {number}'
+
+                    yield from vevent(day.replace(hour=hour, minute=minute), minutes, location)
+                    count += 1
+        day += timedelta(days=1)
+
+    # Cours le dimanche des changements d'heure : 01h30-04h00 traverse 02h00/03h00
+    for sunday in dst_sundays:
+        for number in dst_rooms:
+            if max_events is not None and count >= max_events:
+                break
+            yield from vevent(sunday.replace(hour=1, minute=30), 150, f'PER - {number}')
+            count += 1
+
+    yield 'END:VCALENDAR'
+
+
+def generate_feed(start: datetime, **options) -> str:
+    """Flux iCal complet (CRLF) en texte"""
+    return '\r\n'.join(iter_feed_lines(start, **options)) + '\r\n'
+
+
+def feed_options_for_size(events: int) -> dict:
+    """Paramètres (salles, semaines) pour un flux d'environ `events` cours"""
+    events_per_day = 4
+    rooms = min(120, max(8, events // 160))
+    weeks = max(1, -(-events // (rooms * 5 * events_per_day)))
+    return {'rooms': rooms, 'weeks': weeks, 'events_per_day': events_per_day, 'max_events': events}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un flux iCal synthétique au format edt-consult")
+    parser.add_argument('--start', help="Premier lundi (YYYY-MM-DD), lundi courant par défaut")
+    parser.add_argument('--rooms', type=int, default=40)
+    parser.add_argument('--weeks', type=int, default=8)
+    parser.add_argument('--events-per-day', type=int, default=4)
+    parser.add_argument('--events', type=int, help="Taille cible (choisit salles et semaines)")
+    parser.add_argument('--multi-room-ratio', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-o', '--output', default='-')
+    args = parser.parse_args()
+
+    if args.start:
+        start = datetime.strptime(args.start, '%Y-%m-%d')
+    else:
+        today = datetime.now()
+        start = today - timedelta(days=today.weekday())
+
+    if args.events:
+        options = feed_options_for_size(args.events)
+    else:
+        options = {'rooms': args.rooms, 'weeks': args.weeks, 'events_per_day': args.events_per_day}
+
+    feed = generate_feed(start, multi_room_ratio=args.multi_room_ratio, seed=args.seed, **options)
+
+    if args.output == '-':
+        print(feed, end='')
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            f.write(feed)
+        print(f"✅ Flux écrit dans {args.output} ({feed.count('BEGIN:VEVENT')} événements)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,134 @@
 #!/usr/bin/env python3
 """
 Gestionnaire de cache pour l'API ESIEE
-Récupère les données une fois par heure et les stocke en JSON
+Récupère les données une fois par heure et les stocke dans un instantané binaire
 """
 
 import json
 import os
-import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
-from events_api import get_events_this_week, get_available_rooms_today
+from cache_snapshot import CacheSnapshot
+from event_model import Event
+from event_store import ESIEEEventStore
+from ical_extractor_final import ESIEEiCalExtractor, ESIEEiCalFinalExtractor
+from feed_archive import DEFAULT_ARCHIVE, ESIEEFeedArchive, FEED_REPLAY, feed_archive
+from http_client import get_http_stats
+from leader_lock import ESIEELeaderLock
+from schedule_index import RoomScheduleIndex
+from snapshot import close_mapping, read_snapshot, schedule_entry, write_snapshot
+from week_cache import ESIEEWeekCache
 
 logger = logging.getLogger(__name__)
 
+# Nombre de semaines récupérées en un seul appel amont à chaque rafraîchissement
+PREFETCH_WEEKS = int(os.environ.get('ESIEE_PREFETCH_WEEKS', '8'))
+
+# Rafraîchissement en arrière-plan : anticipation avant expiration, et âge
+# maximal d'un cache servi sans attendre (au-delà, rafraîchissement synchrone)
+REFRESH_AHEAD_MINUTES = int(os.environ.get('ESIEE_CACHE_REFRESH_AHEAD_MINUTES', '5'))
+MAX_STALE_HOURS = float(os.environ.get('ESIEE_CACHE_MAX_STALE_HOURS', '6'))
+
+# Mode multi-workers : un seul worker élu (verrou fcntl) rafraîchit et écrit
+# l'instantané ; les autres le relisent quand il change (vérification au plus
+# toutes les ESIEE_CACHE_SYNC_SECONDS), et l'attendent au démarrage
+SHARED_CACHE = os.environ.get('ESIEE_CACHE_SHARED', '0') == '1'
+SHARED_SYNC_SECONDS = float(os.environ.get('ESIEE_CACHE_SYNC_SECONDS', '5'))
+FOLLOWER_WAIT_SECONDS = float(os.environ.get('ESIEE_CACHE_FOLLOWER_WAIT_SECONDS', '30'))
+
+# Nouvelle tentative après un échec : 1 min, puis doublement jusqu'à 15 min
+REFRESH_RETRY_SECONDS = 60
+REFRESH_RETRY_MAX_SECONDS = 900
+
+def iso_week_key(dt: datetime) -> str:
+    """Clé de semaine ISO (ex: '2025-W41') utilisée pour découper le cache"""
+    iso_year, iso_week, _ = dt.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+def week_monday(week_offset: int = 0) -> datetime:
+    """Lundi (minuit) de la semaine à l'offset donné par rapport à aujourd'hui"""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)
+
+def _serialize_cache_data(data: Optional[Dict]) -> Optional[Dict]:
+    """Forme JSON du cache (ancien format, conservé pour les benchmarks) : les Event sont convertis en dict"""
+    if not data:
+        return data
+
+    serialized = dict(data)
+    serialized.pop('room_schedule_index', None)
+    serialized['events'] = [event.to_dict() for event in data.get('events', [])]
+    serialized['week_shards'] = {week: [event.to_dict() for event in events]
+                                 for week, events in data.get('week_shards', {}).items()}
+    serialized['room_events'] = {room: [event.to_dict() for event in events]
+                                 for room, events in data.get('room_events', {}).items()}
+    return serialized
+
+def _deserialize_cache_data(data: Optional[Dict]) -> Optional[Dict]:
+    """Reconstruit les Event depuis l'ancien cache JSON (une seule instance par événement)"""
+    if not data:
+        return data
+
+    instances = {}
+
+    def load(events: List[Dict]) -> List[Event]:
+        loaded = []
+        for raw in events:
+            event = Event.from_dict(raw)
+            loaded.append(instances.setdefault(event, event))
+        return loaded
+
+    data['week_shards'] = {week: load(events) for week, events in data.get('week_shards', {}).items()}
+    data['events'] = load(data.get('events', []))
+    data['room_events'] = {room: load(events) for room, events in data.get('room_events', {}).items()}
+    data['room_schedule_index'] = RoomScheduleIndex.from_room_events(data['room_events'])
+    return data
+
+# Nombre de différentiels conservés pour get_changes_since()
+CHANGE_LOG_SIZE = 48
+
+# Instantanés figés pour la requête en cours (id du gestionnaire -> instantané),
+# voir begin_request_snapshot()
+_request_snapshots: ContextVar[Optional[Dict[int, CacheSnapshot]]] = ContextVar('esiee_request_snapshots',
+                                                                                default=None)
+
+def begin_request_snapshot():
+    """Début de requête : le premier instantané lu reste celui de toute la requête"""
+    _request_snapshots.set({})
+
+def end_request_snapshot():
+    _request_snapshots.set(None)
+
+@contextmanager
+def _timed_stage(timings: Dict[str, float], name: str):
+    """Chronomètre une étape du rafraîchissement (en ms)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+def _event_signature(event: Event) -> tuple:
+    """Contenu comparé pour détecter la modification d'un événement"""
+    return (event.summary, event.room_full, event.start_datetime, event.end_datetime)
+
+def per_room_numbers(event: Event) -> List[str]:
+    """Numéros des salles PER d'un événement (LOCATION déjà découpé au parsing)"""
+    return [room for building, room in event.rooms if building == 'PER']
+
+def _build_event_store(week_shards: Dict[str, List[Event]]) -> ESIEEEventStore:
+    """Stockage en colonnes de tout l'horizon préchargé"""
+    return ESIEEEventStore.from_events(
+        (event for shard in week_shards.values() for event in shard),
+        per_room_numbers
+    )
+
 class ESIEECacheManager:
     # Liste des salles connues de l'ESIEE (salles PER)
     # Ces salles sont toujours affichées, même sans cours programmés
@@ -68,47 +183,182 @@ class ESIEECacheManager:
         '5203': {'name': 'Salle 5203', 'board': 'Tableau blanc', 'capacity': '30', 'type': 'Salle classique'},
     }
 
-    def __init__(self, cache_file: str = "esiee_cache.json", cache_duration_hours: int = 1):
+    def __init__(self, cache_file: str = "esiee_cache.snapshot", cache_duration_hours: int = 1,
+                 prefetch_weeks: int = PREFETCH_WEEKS, archive: Optional[ESIEEFeedArchive] = DEFAULT_ARCHIVE,
+                 replay: Optional[bool] = None, refresh_ahead_minutes: int = REFRESH_AHEAD_MINUTES,
+                 max_stale_hours: float = MAX_STALE_HOURS, week_cache: Optional[ESIEEWeekCache] = None,
+                 shared: bool = SHARED_CACHE):
         self.cache_file = cache_file
+        # Ancien cache JSON, relu une fois si l'instantané n'existe pas encore
+        legacy_cache_file = os.path.splitext(cache_file)[0] + '.json'
+        self.legacy_cache_file = legacy_cache_file if legacy_cache_file != cache_file else None
         self.cache_duration = timedelta(hours=cache_duration_hours)
-        self.cache_data = None
-        self.last_update = None
+        self.prefetch_weeks = max(1, prefetch_weeks)
+        self.refresh_ahead = timedelta(minutes=refresh_ahead_minutes)
+        self.max_stale = max(timedelta(hours=max_stale_hours), self.cache_duration)
+
+        # Archive des flux bruts et mode rejeu (hors réseau), par défaut selon l'environnement
+        self.archive = feed_archive if archive is DEFAULT_ARCHIVE else archive
+        self.replay = FEED_REPLAY if replay is None else replay
+
+        # Instantané publié (remplacé d'un bloc à chaque rafraîchissement)
+        self._snapshot: Optional[CacheSnapshot] = None
+
+        # Cache partagé entre workers : élection du rafraîchisseur et suivi du fichier
+        self.leader_lock = ESIEELeaderLock(f"{cache_file}.lock") if shared else None
+        self._file_stamp = None  # (inode, mtime) de l'instantané chargé ou écrit
+        self._next_sync = 0.0
+        self._sync_lock = threading.Lock()
+        # Projections des instantanés remplacés, pas encore refermées
+        self._retired_mappings = []
+        self._retired_lock = threading.Lock()
+
+        # Semaines hors horizon (passées ou lointaines), en LRU borné
+        self.week_cache = week_cache if week_cache is not None else ESIEEWeekCache()
+
+        # Historique des différentiels entre rafraîchissements
+        self.change_log = deque(maxlen=CHANGE_LOG_SIZE)
+
+        # Un seul rafraîchissement à la fois ; les appels concurrents attendent son résultat
+        self._refresh_lock = threading.Lock()
+        self._last_refresh_ok = False
+        self.last_refresh: Optional[Dict] = None  # Chronométrage par étape du dernier rafraîchissement
+
+        # Compteurs cumulés (lectures et rafraîchissements), exposés par get_metrics()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'reads_fresh': 0,        # Cache valide
+            'reads_stale': 0,        # Cache expiré servi pendant la revalidation
+            'reads_empty': 0,        # Aucune donnée : rafraîchissement synchrone
+            'reads_too_old': 0,      # Au-delà de max_stale : rafraîchissement synchrone
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'consecutive_failures': 0,
+            'save_failures': 0,
+            'snapshot_reloads': 0,   # Instantanés du worker élu relus (cache partagé)
+            'events_fetched': 0,
+            'duplicates_removed': 0,
+            'upstream_bytes': 0,
+            'refresh_ms_total': 0.0,
+            'stage_ms_total': {},
+            'last_success_at': None,
+            'last_failure_at': None,
+            'last_error': None
+        }
+
+        # Thread de rafraîchissement en arrière-plan (démarré à la demande)
+        self._refresher = None
+        self._refresher_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
 
         # Charger le cache existant s'il existe
         self.load_cache()
 
+    # Vues sur l'instantané publié (lecture seule)
+    @property
+    def cache_data(self) -> Optional[Dict]:
+        snapshot = self._snapshot
+        return snapshot.data if snapshot else None
+
+    @property
+    def last_update(self) -> Optional[datetime]:
+        snapshot = self._snapshot
+        return snapshot.last_update if snapshot else None
+
+    @property
+    def version(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.version if snapshot else 0
+
+    @property
+    def event_store(self) -> Optional[ESIEEEventStore]:
+        snapshot = self._snapshot
+        return snapshot.event_store if snapshot else None
+
+    def _publish(self, snapshot: CacheSnapshot):
+        """Publie un instantané : une seule affectation, atomique pour les lecteurs"""
+        previous = self._snapshot
+        self._snapshot = snapshot
+
+        if previous is not None and previous.mapping is not None and previous.mapping is not snapshot.mapping:
+            with self._retired_lock:
+                self._retired_mappings.append(previous.mapping)
+        del previous
+        self._close_retired_mappings()
+
+    def _close_retired_mappings(self):
+        """
+        Ferme les fichiers projetés des instantanés remplacés
+
+        Une requête qui a figé un ancien instantané utilise encore ses
+        colonnes : sa projection est alors gardée et refermée à l'essai suivant
+        (prochaine publication ou prochaine synchronisation).
+        """
+        with self._retired_lock:
+            if self._retired_mappings:
+                self._retired_mappings = [mapping for mapping in self._retired_mappings
+                                          if not close_mapping(mapping)]
+
     def load_cache(self) -> bool:
-        """Charge le cache depuis le fichier JSON"""
+        """Charge le cache depuis l'instantané binaire (ou l'ancien fichier JSON)"""
         try:
             if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    cache_content = json.load(f)
+                started = time.perf_counter()
+                stamp = self._read_file_stamp()
+                cache_data, version, last_update, event_store, mapping = read_snapshot(self.cache_file)
+                self._file_stamp = stamp
+
+                self._publish(CacheSnapshot.create(
+                    version, last_update, cache_data,
+                    event_store or _build_event_store(cache_data.get('week_shards', {})),
+                    mapping
+                ))
 
-                self.cache_data = cache_content.get('data')
-                last_update_str = cache_content.get('last_update')
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                logger.info(f"📁 Cache chargé depuis {self.cache_file} en {elapsed_ms:.0f} ms, dernière MAJ: {last_update}")
+                return last_update is not None
 
-                if last_update_str:
-                    self.last_update = datetime.fromisoformat(last_update_str)
-                    logger.info(f"📁 Cache chargé depuis {self.cache_file}, dernière MAJ: {self.last_update}")
-                    return True
+            if self.legacy_cache_file and os.path.exists(self.legacy_cache_file):
+                return self._load_legacy_cache()
 
         except Exception as e:
             logger.warning(f"⚠️ Erreur lors du chargement du cache: {e}")
 
         return False
 
-    def save_cache(self) -> bool:
-        """Sauvegarde le cache dans le fichier JSON"""
-        try:
-            cache_content = {
-                'last_update': self.last_update.isoformat() if self.last_update else None,
-                'data': self.cache_data
-            }
+    def _load_legacy_cache(self) -> bool:
+        """Charge l'ancien cache JSON (migration : le prochain enregistrement écrit l'instantané)"""
+        with open(self.legacy_cache_file, 'r', encoding='utf-8') as f:
+            cache_content = json.load(f)
 
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_content, f, ensure_ascii=False, indent=2, default=str)
+        cache_data = _deserialize_cache_data(cache_content.get('data'))
+        last_update_str = cache_content.get('last_update')
+        if not cache_data or not last_update_str:
+            return False
+
+        last_update = datetime.fromisoformat(last_update_str)
+        self._publish(CacheSnapshot.create(
+            cache_content.get('version', 0), last_update, cache_data,
+            _build_event_store(cache_data.get('week_shards', {}))
+        ))
+        logger.info(f"📁 Ancien cache JSON chargé depuis {self.legacy_cache_file}, dernière MAJ: {last_update}")
+        return True
+
+    def save_cache(self, snapshot: Optional[CacheSnapshot] = None) -> bool:
+        """Sauvegarde un instantané (par défaut le courant) dans le fichier binaire (écriture atomique)"""
+        snapshot = snapshot or self._snapshot
+        if snapshot is None:
+            return False
+
+        try:
+            started = time.perf_counter()
+            size = write_snapshot(self.cache_file, snapshot.data, snapshot.version, snapshot.last_update,
+                                  snapshot.event_store)
+            self._file_stamp = self._read_file_stamp()
 
-            logger.info(f"💾 Cache sauvegardé dans {self.cache_file}")
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"💾 Cache sauvegardé dans {self.cache_file} ({size} octets, {elapsed_ms:.0f} ms)")
             return True
 
         except Exception as e:
@@ -117,222 +367,633 @@ class ESIEECacheManager:
 
     def is_cache_valid(self) -> bool:
         """Vérifie si le cache est encore valide"""
-        if not self.cache_data or not self.last_update:
-            return False
+        age = self.cache_age()
+        return age is not None and age < self.cache_duration
 
-        now = datetime.now()
-        return (now - self.last_update) < self.cache_duration
+    def cache_age(self) -> Optional[timedelta]:
+        """Âge de l'instantané courant (None si aucune donnée)"""
+        snapshot = self._snapshot
+        if not snapshot or not snapshot.data:
+            return None
+        return snapshot.age()
 
     def refresh_cache(self) -> bool:
-        """Rafraîchit le cache avec de nouvelles données"""
-        logger.info("🔄 Rafraîchissement du cache ESIEE...")
+        """
+        Rafraîchit le cache avec de nouvelles données
+
+        Single-flight : si un rafraîchissement est déjà en cours, on attend
+        sa fin et on retourne son résultat au lieu d'en lancer un second.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("⏳ Rafraîchissement déjà en cours, attente de son résultat")
+            with self._refresh_lock:
+                return self._last_refresh_ok
 
         try:
-            # Récupérer toutes les données ESIEE
-            logger.info("📡 Récupération des événements...")
-            events = get_events_this_week()
-
-            logger.info("🏢 Récupération des salles disponibles...")
-            available_rooms = get_available_rooms_today()
-
-            # Fonction de déduplication des événements
-            def deduplicate_events(events_list):
-                """Supprime les événements en doublons basés sur les propriétés clés"""
-                seen_events = set()
-                unique_events = []
-
-                for event in events_list:
-                    # Créer une clé unique basée sur les propriétés importantes de l'événement
-                    event_key = (
-                        event.get('summary', ''),
-                        event.get('room_full', ''),
-                        str(event.get('start_datetime', '')),
-                        str(event.get('end_datetime', ''))
-                    )
-
-                    if event_key not in seen_events:
-                        seen_events.add(event_key)
-                        unique_events.append(event)
-                    else:
-                        logger.debug(f"🔄 Doublon supprimé: {event.get('summary')} en {event.get('room_full')}")
-
-                return unique_events
-
-            # Dédupliquer les événements avant traitement
-            original_count = len(events)
-            events = deduplicate_events(events)
-            deduplicated_count = len(events)
-
-            if original_count != deduplicated_count:
-                logger.info(f"🧹 Déduplication: {original_count} → {deduplicated_count} événements ({original_count - deduplicated_count} doublons supprimés)")
-
-            # Extraire les salles PER avec nettoyage
-            all_per_rooms = set()
-            room_events = {}
+            if self.leader_lock is None or self.leader_lock.try_acquire():
+                self._last_refresh_ok = self._refresh_cache()
+            else:
+                self._last_refresh_ok = self._follow_leader()
+            return self._last_refresh_ok
+        finally:
+            self._refresh_lock.release()
+            self._close_retired_mappings()
+
+    def _read_file_stamp(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.cache_file)
+        except OSError:
+            return None
+        # os.replace crée un nouvel inode à chaque publication
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _follow_leader(self) -> bool:
+        """
+        Worker non élu : relit l'instantané publié par le worker élu au lieu d'interroger l'amont
+
+        Sans aucune donnée (démarrage), attend que le worker élu ait écrit un
+        premier instantané, au plus FOLLOWER_WAIT_SECONDS.
+        """
+        deadline = time.monotonic() + (FOLLOWER_WAIT_SECONDS if self._snapshot is None else 0)
+        while True:
+            self._sync_from_file(force=True)
+            if self._snapshot is not None or time.monotonic() >= deadline:
+                break
+            time.sleep(0.2)
+
+        return self._snapshot is not None
+
+    def _sync_from_file(self, force: bool = False) -> bool:
+        """Recharge l'instantané si le worker élu en a publié un nouveau (vrai si rechargé)"""
+        if self.leader_lock is None or self.leader_lock.is_leader:
+            return False
 
-            for event in events:
-                location = event.get('room_full', '')
-                if 'PER - ' in location:
-                    room_numbers_raw = location.replace('PER - ', '').strip()
-                    # Nettoyer et valider
-                    import re
-
-                    # Gérer les salles multiples (ex: "113\,112\,165\,160\,164\,115")
-                    room_numbers = []
-                    if '\\,' in room_numbers_raw or ',' in room_numbers_raw:
-                        # Séparer les salles multiples
-                        room_list = room_numbers_raw.replace('\\,', ',').split(',')
-                        for room_num in room_list:
-                            room_num = room_num.strip()
-                            if re.match(r'^[0-9]{3,4}$', room_num):
-                                room_numbers.append(room_num)
-                    else:
-                        # Salle unique
-                        if re.match(r'^[0-9]{3,4}$', room_numbers_raw):
-                            room_numbers.append(room_numbers_raw)
-
-                    # Traiter chaque salle
-                    for room_number in room_numbers:
-                        all_per_rooms.add(room_number)
-
-                        # Organiser les événements par salle
-                        if room_number not in room_events:
-                            room_events[room_number] = []
-
-                        # Convertir les datetime en strings pour la sérialisation JSON
-                        serializable_event = event.copy()
-                        for key in ['start_datetime', 'end_datetime']:
-                            if key in serializable_event and isinstance(serializable_event[key], datetime):
-                                serializable_event[key] = serializable_event[key].isoformat()
-
-                        room_events[room_number].append(serializable_event)
-
-            # Organiser les emplois du temps par salle pour le calcul côté client
-            room_schedules = {}
+        now = time.monotonic()
+        if not force and now < self._next_sync:
+            return False
 
-            for event in events:
-                location = event.get('room_full', '')
-                if 'PER - ' in location:
-                    room_numbers_raw = location.replace('PER - ', '').strip()
-                    start_time = event.get('start_datetime')
-                    end_time = event.get('end_datetime')
-
-                    # Convertir les datetime en strings pour JSON
-                    if isinstance(start_time, datetime):
-                        start_time_str = start_time.isoformat()
-                    else:
-                        start_time_str = str(start_time)
-
-                    if isinstance(end_time, datetime):
-                        end_time_str = end_time.isoformat()
-                    else:
-                        end_time_str = str(end_time)
-
-                    # Créer l'événement simplifié pour le client
-                    schedule_event = {
-                        'start': start_time_str,
-                        'end': end_time_str,
-                        'summary': event.get('summary', 'Cours')
-                    }
-
-                    # Gérer les salles multiples
-                    room_numbers = []
-                    if '\\,' in room_numbers_raw or ',' in room_numbers_raw:
-                        room_list = room_numbers_raw.replace('\\,', ',').split(',')
-                        for room_num in room_list:
-                            room_num = room_num.strip()
-                            if re.match(r'^[0-9]{3,4}$', room_num):
-                                room_numbers.append(room_num)
-                    else:
-                        if re.match(r'^[0-9]{3,4}$', room_numbers_raw):
-                            room_numbers.append(room_numbers_raw)
-
-                    # Ajouter l'événement à chaque salle concernée
-                    for room_number in room_numbers:
-                        if room_number not in room_schedules:
-                            room_schedules[room_number] = []
-                        room_schedules[room_number].append(schedule_event)
-
-            # Trier les emplois du temps par heure de début
-            for room_number in room_schedules:
-                room_schedules[room_number].sort(key=lambda x: x['start'])
-
-            logger.info(f"📊 Emplois du temps générés pour {len(room_schedules)} salles")
-
-            # Créer les données de salles en utilisant les salles connues comme base
-            # Toutes les salles connues sont toujours incluses, même sans cours
-            rooms_data = {}
-            
-            # D'abord, ajouter toutes les salles connues
-            for room, room_info in self.KNOWN_ROOMS.items():
-                rooms_data[room] = room_info.copy()
-            
-            # Ensuite, ajouter les salles découvertes dans les événements (si nouvelles)
-            for room in all_per_rooms:
-                if room not in rooms_data:
-                    # Déterminer le type selon le numéro (les 4 amphithéâtres spécifiques)
-                    if room in ['110', '160']:
-                        room_type = 'Amphithéâtre'
-                        capacity = '116'
-                        board = 'Tableau à craie'
-                    elif room in ['210', '260']:
-                        room_type = 'Amphithéâtre'
-                        capacity = '156'
-                        board = 'Tableau à craie'
-                    else:
-                        room_type = 'Salle classique'
-                        capacity = '30'
-                        board = 'Tableau blanc'
-
-                    rooms_data[room] = {
-                        'name': f'Salle {room}',
-                        'board': board,
-                        'capacity': capacity,
-                        'type': room_type
-                    }
-            
-            # Nombre total de salles (connues + découvertes)
-            total_rooms = len(rooms_data)
+        # Une seule relecture à la fois ; les autres lecteurs gardent l'instantané courant
+        if not self._sync_lock.acquire(blocking=force):
+            return False
+        try:
+            self._next_sync = now + SHARED_SYNC_SECONDS
+            return self._reload_if_changed()
+        finally:
+            self._sync_lock.release()
+            self._close_retired_mappings()
+
+    def _reload_if_changed(self) -> bool:
+        stamp = self._read_file_stamp()
+        if stamp is None or stamp == self._file_stamp:
+            return False
 
-            # Structurer les données du cache
-            self.cache_data = {
-                'events': events,
-                'available_rooms': list(available_rooms),
-                'room_schedules': room_schedules,  # Emplois du temps par salle pour le client
-                'rooms_data': rooms_data,
-                'room_events': room_events,
-                'stats': {
+        previous = self._snapshot
+        if not self.load_cache():
+            return False
+
+        # Historique local des différentiels, pour /api/cache/changes sur ce worker
+        current = self._snapshot
+        if previous is None or current.version != previous.version:
+            diff = self._diff_events(self._snapshot_events(previous.data if previous else None),
+                                     self._snapshot_events(current.data) or [])
+            self._record_changes(diff, current.version)
+            logger.info(f"🔃 Instantané v{current.version} du worker élu rechargé")
+        self._count('snapshot_reloads')
+        return True
+
+    def _refresh_cache(self) -> bool:
+        """
+        Rafraîchissement effectif (appelé sous _refresh_lock)
+
+        Pipeline en étapes, chacune en une seule passe et chronométrée :
+        fetch_parse → dedupe → room_split → schedules → available_now → stats → save.
+        Un seul appel amont ; le téléchargement et le parsing sont simultanés
+        (parsing en flux), d'où une étape commune.
+        """
+        logger.info("🔄 Rafraîchissement du cache ESIEE...")
+        timings = {}
+        started = time.perf_counter()
+
+        try:
+            with _timed_stage(timings, 'fetch_parse'):
+                fetched_events, upstream_bytes = self._stage_fetch()
+
+            with _timed_stage(timings, 'dedupe'):
+                all_events = self._stage_dedupe(fetched_events)
+
+            first_monday = week_monday(0)
+            current_week = iso_week_key(first_monday)
+
+            with _timed_stage(timings, 'room_split'):
+                week_shards, event_rooms, all_per_rooms = self._stage_room_split(all_events, first_monday)
+            events = week_shards[current_week]
+
+            with _timed_stage(timings, 'schedules'):
+                previous = self._snapshot
+                previous_data = previous.data if previous else {}
+                diff = self._diff_events(self._snapshot_events(previous_data), all_events)
+                room_events, room_schedules, room_schedule_index = self._stage_schedules(
+                    previous_data, diff, event_rooms, current_week
+                )
+
+            with _timed_stage(timings, 'available_now'):
+                event_store = _build_event_store(week_shards)
+                available_rooms = event_store.available_locations(
+                    datetime.now(), first_monday, first_monday + timedelta(weeks=1)
+                )
+
+            with _timed_stage(timings, 'stats'):
+                rooms_data = self._stage_rooms_data(all_per_rooms)
+                stats = {
                     'total_events': len(events),
-                    'total_rooms': total_rooms,
+                    'total_rooms': len(rooms_data),
                     'rooms_with_schedules': len(room_schedules),
                     'known_rooms': len(self.KNOWN_ROOMS),
                     'discovered_rooms': len(all_per_rooms)
                 }
+
+            # Structurer les données du cache
+            cache_data = {
+                'events': events,
+                'available_rooms': available_rooms,
+                'room_schedules': room_schedules,  # Emplois du temps par salle pour le client
+                'rooms_data': rooms_data,
+                'room_events': room_events,
+                'room_schedule_index': room_schedule_index,  # Salle -> jour -> créneaux triés
+                'week_shards': week_shards,  # Événements par semaine ISO sur tout l'horizon
+                'prefetch': {
+                    'first_week': current_week,
+                    'weeks': self.prefetch_weeks
+                },
+                'stats': stats
             }
 
-            self.last_update = datetime.now()
+            # Publication d'un bloc : les lecteurs voient l'ancien ou le nouvel instantané, jamais un mélange
+            previous_version = previous.version if previous else 0
+            version = previous_version if self._is_unchanged(diff) else previous_version + 1
+            snapshot = CacheSnapshot.create(version, datetime.now(), cache_data, event_store)
+            self._publish(snapshot)
+            self._record_changes(diff, version)
 
             # Sauvegarder le cache
-            self.save_cache()
+            with _timed_stage(timings, 'save'):
+                saved = self.save_cache(snapshot)
 
-            logger.info(f"✅ Cache rafraîchi: {len(events)} événements, {total_rooms} salles ({len(self.KNOWN_ROOMS)} connues)")
+            self._record_refresh(started, timings, True, len(fetched_events), len(fetched_events) - len(all_events),
+                                 upstream_bytes, len(events), saved)
+            logger.info(f"✅ Cache rafraîchi: {len(events)} événements, {stats['total_rooms']} salles "
+                        f"({len(self.KNOWN_ROOMS)} connues) en {self.last_refresh['total_ms']} ms {timings}")
             return True
 
         except Exception as e:
+            self._record_refresh(started, timings, False, error=str(e))
             logger.error(f"❌ Erreur lors du rafraîchissement du cache: {e}")
             return False
 
+    def _stage_fetch(self) -> Tuple[List[Event], int]:
+        """
+        Toutes les semaines de l'horizon en un seul appel amont
+
+        Returns:
+            Événements reçus et octets téléchargés par ce seul rafraîchissement
+            (le compteur global inclut aussi les semaines chargées à la demande)
+        """
+        logger.info(f"📡 Récupération des événements ({self.prefetch_weeks} semaines)...")
+        extractor = ESIEEiCalFinalExtractor(archive=self.archive, replay=self.replay)
+        if not extractor.extract_for_week(week_offset=0, nb_weeks=self.prefetch_weeks):
+            raise RuntimeError("échec de la récupération des événements")
+        return extractor.events_data, extractor.bytes_received
+
+    def _stage_dedupe(self, events: List[Event]) -> List[Event]:
+        """Supprime les événements en doublons basés sur les propriétés clés"""
+        seen_events = set()
+        unique_events = []
+
+        for event in events:
+            event_key = _event_signature(event)
+            if event_key not in seen_events:
+                seen_events.add(event_key)
+                unique_events.append(event)
+            else:
+                logger.debug(f"🔄 Doublon supprimé: {event.summary} en {event.room_full}")
+
+        if len(unique_events) != len(events):
+            logger.info(f"🧹 Déduplication: {len(events)} → {len(unique_events)} événements "
+                        f"({len(events) - len(unique_events)} doublons supprimés)")
+        return unique_events
+
+    def _stage_room_split(self, events: List[Event], first_monday: datetime):
+        """
+        Découpe l'horizon en semaines ISO et relève les salles PER de la semaine courante
+
+        Returns:
+            (week_shards, event_rooms, all_per_rooms) : une entrée par semaine
+            (même vide), couples (événement, numéros de salles) de la semaine
+            courante, et l'ensemble des salles rencontrées
+        """
+        week_shards = {
+            iso_week_key(first_monday + timedelta(weeks=offset)): []
+            for offset in range(self.prefetch_weeks)
+        }
+        current_week = iso_week_key(first_monday)
+        all_per_rooms = set()
+        event_rooms = []
+
+        for event in events:
+            start_time = event.start_datetime
+            if isinstance(start_time, datetime):
+                week_key = iso_week_key(start_time)
+                shard = week_shards.get(week_key)
+                if shard is not None:
+                    shard.append(event)
+
+                    if week_key == current_week:
+                        room_numbers = per_room_numbers(event)
+                        all_per_rooms.update(room_numbers)
+                        event_rooms.append((event, room_numbers))
+
+        logger.info(f"🗂️ {len(week_shards)} semaines en cache ({len(events)} événements)")
+        return week_shards, event_rooms, all_per_rooms
+
+    def _stage_schedules(self, previous_data: Dict, diff: Optional[Dict], event_rooms: List,
+                         current_week: str):
+        """Index par salle (événements, emplois du temps client et par jour), reconstruits pour les seules salles modifiées"""
+        rebuild_rooms = self._rooms_to_rebuild(previous_data, diff, event_rooms, current_week)
+
+        if rebuild_rooms is None:
+            room_events = {}
+            room_schedules = {}
+        else:
+            # Les index des salles non touchées sont repris tels quels
+            room_events = {room: room_list for room, room_list in previous_data.get('room_events', {}).items()
+                           if room not in rebuild_rooms}
+            room_schedules = {room: room_list for room, room_list in previous_data.get('room_schedules', {}).items()
+                              if room not in rebuild_rooms}
+            logger.info(f"🧩 Reconstruction incrémentale: {len(rebuild_rooms)} salle(s) modifiée(s)")
+
+        for event, room_numbers in event_rooms:
+            target_rooms = [room for room in room_numbers if rebuild_rooms is None or room in rebuild_rooms]
+            if not target_rooms:
+                continue
+
+            # Créer l'événement simplifié pour le client
+            schedule_event = schedule_entry(event)
+
+            # Ajouter l'événement (par référence) à chaque salle concernée
+            for room_number in target_rooms:
+                room_events.setdefault(room_number, []).append(event)
+                room_schedules.setdefault(room_number, []).append(schedule_event)
+
+        # Trier les emplois du temps (reconstruits) par heure de début
+        for room_number in room_schedules:
+            if rebuild_rooms is None or room_number in rebuild_rooms:
+                room_schedules[room_number].sort(key=lambda x: str(x['start']))
+
+        room_schedule_index = RoomScheduleIndex.from_room_events(
+            room_events, previous_data.get('room_schedule_index'), rebuild_rooms
+        )
+
+        logger.info(f"📊 Emplois du temps générés pour {len(room_schedules)} salles")
+        return room_events, room_schedules, room_schedule_index
+
+    def _stage_rooms_data(self, all_per_rooms: set) -> Dict:
+        """
+        Données des salles : toutes les salles connues (même sans cours),
+        puis les salles découvertes dans les événements
+        """
+        rooms_data = {room: room_info.copy() for room, room_info in self.KNOWN_ROOMS.items()}
+
+        for room in all_per_rooms:
+            if room not in rooms_data:
+                # Déterminer le type selon le numéro (les 4 amphithéâtres spécifiques)
+                if room in ['110', '160']:
+                    room_type = 'Amphithéâtre'
+                    capacity = '116'
+                    board = 'Tableau à craie'
+                elif room in ['210', '260']:
+                    room_type = 'Amphithéâtre'
+                    capacity = '156'
+                    board = 'Tableau à craie'
+                else:
+                    room_type = 'Salle classique'
+                    capacity = '30'
+                    board = 'Tableau blanc'
+
+                rooms_data[room] = {
+                    'name': f'Salle {room}',
+                    'board': board,
+                    'capacity': capacity,
+                    'type': room_type
+                }
+
+        return rooms_data
+
+    def _record_refresh(self, started: float, timings: Dict, success: bool,
+                        fetched: int = 0, duplicates: int = 0, upstream_bytes: int = 0,
+                        events: int = 0, saved: bool = True, error: Optional[str] = None):
+        """Conserve le chronométrage du dernier rafraîchissement et met à jour les compteurs cumulés"""
+        now = datetime.now().isoformat()
+        total_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.last_refresh = {
+            'at': now,
+            'success': success,
+            'total_ms': total_ms,
+            'stages_ms': timings,
+            'events_fetched': fetched,
+            'duplicates': duplicates,
+            'events': events,
+            'upstream_bytes': upstream_bytes,
+            'saved': saved,
+            'error': error
+        }
+
+        with self._metrics_lock:
+            metrics = self._metrics
+            metrics['refreshes'] += 1
+            metrics['refresh_ms_total'] += total_ms
+            for stage, elapsed_ms in timings.items():
+                metrics['stage_ms_total'][stage] = metrics['stage_ms_total'].get(stage, 0.0) + elapsed_ms
+
+            if success:
+                metrics['consecutive_failures'] = 0
+                metrics['last_success_at'] = now
+                metrics['events_fetched'] += fetched
+                metrics['duplicates_removed'] += duplicates
+                metrics['upstream_bytes'] += upstream_bytes
+                metrics['save_failures'] += 0 if saved else 1
+            else:
+                metrics['refresh_failures'] += 1
+                metrics['consecutive_failures'] += 1
+                metrics['last_failure_at'] = now
+                metrics['last_error'] = error
+
+    def _count(self, counter: str):
+        with self._metrics_lock:
+            self._metrics[counter] += 1
+
+    def get_metrics(self) -> Dict:
+        """Compteurs cumulés des lectures et des rafraîchissements, et fraîcheur du cache"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            metrics['stage_ms_total'] = {stage: round(value, 1) for stage, value in metrics['stage_ms_total'].items()}
+        metrics['refresh_ms_total'] = round(metrics['refresh_ms_total'], 1)
+
+        reads = metrics['reads_fresh'] + metrics['reads_stale'] + metrics['reads_empty'] + metrics['reads_too_old']
+        metrics['reads'] = reads
+        # Lectures servies sans attendre l'amont
+        metrics['hit_rate'] = round((metrics['reads_fresh'] + metrics['reads_stale']) / reads, 3) if reads else None
+
+        age = self.cache_age()
+        metrics['age_seconds'] = round(age.total_seconds(), 1) if age is not None else None
+        metrics['staleness_seconds'] = (round(max(0.0, (age - self.cache_duration).total_seconds()), 1)
+                                        if age is not None else None)
+        return metrics
+
+    def _snapshot_events(self, data: Dict) -> Optional[List[Event]]:
+        """Tous les événements de l'horizon d'un instantané (None si cache antérieur au découpage)"""
+        if not data or 'week_shards' not in data:
+            return None
+
+        return [event for shard in data['week_shards'].values() for event in shard]
+
+    def _diff_events(self, previous_events: Optional[List[Event]], new_events: List[Event]) -> Optional[Dict]:
+        """
+        Calcule les ajouts / suppressions / modifications entre deux instantanés
+
+        Returns:
+            Les listes d'uid, ou None si l'instantané précédent est inexploitable
+        """
+        if previous_events is None:
+            return None
+
+        previous = {event.uid: event for event in previous_events}
+        current = {event.uid: event for event in new_events}
+
+        return {
+            'added': [uid for uid in current if uid not in previous],
+            'removed': [uid for uid in previous if uid not in current],
+            'changed': [uid for uid, event in current.items()
+                        if uid in previous and _event_signature(previous[uid]) != _event_signature(event)]
+        }
+
+    def _rooms_to_rebuild(self, previous_data: Dict, diff: Optional[Dict],
+                          event_rooms: List, first_week: str) -> Optional[set]:
+        """Salles dont l'index doit être reconstruit (None = reconstruction complète)"""
+        if diff is None or previous_data.get('prefetch', {}).get('first_week') != first_week:
+            return None
+
+        touched = set(diff['added']) | set(diff['removed']) | set(diff['changed'])
+        rooms = set()
+
+        # Côté ancien instantané : salles qui référençaient un événement touché
+        for room, room_list in previous_data.get('room_events', {}).items():
+            if any(event.uid in touched for event in room_list):
+                rooms.add(room)
+
+        # Côté nouvel instantané : salles des événements ajoutés ou modifiés
+        for event, room_numbers in event_rooms:
+            if event.uid in touched:
+                rooms.update(room_numbers)
+
+        return rooms
+
+    @staticmethod
+    def _is_unchanged(diff: Optional[Dict]) -> bool:
+        return diff is not None and not (diff['added'] or diff['removed'] or diff['changed'])
+
+    def _record_changes(self, diff: Optional[Dict], version: int):
+        """Archive le différentiel de la version publiée (rien si les données n'ont pas changé)"""
+        if self._is_unchanged(diff):
+            logger.info(f"🟰 Aucun changement, version {version} conservée")
+            return
+
+        entry = {'version': version, 'timestamp': datetime.now().isoformat()}
+        if diff is None:
+            entry['full'] = True
+        else:
+            entry.update(diff)
+            logger.info(f"🆕 Version {version}: +{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])}")
+        self.change_log.append(entry)
+
+    def get_changes_since(self, since_version: int) -> Dict:
+        """
+        Retourne ce qui a changé depuis une version donnée
+
+        Si l'historique ne couvre pas la version demandée, 'full_resync' vaut
+        True et le client doit recharger l'ensemble des événements.
+        """
+        snapshot = self.get_snapshot()
+        version = snapshot.version if snapshot else 0
+        data = snapshot.data if snapshot else None
+        result = {'version': version, 'since': since_version, 'full_resync': False,
+                  'added': [], 'changed': [], 'removed': []}
+
+        if since_version >= version:
+            return result
+
+        entries = [entry for entry in list(self.change_log) if since_version < entry['version'] <= version]
+        if (not entries or entries[0]['version'] != since_version + 1
+                or any(entry.get('full') for entry in entries)):
+            result['full_resync'] = True
+            return result
+
+        # Composer les différentiels successifs (un ajout puis une suppression s'annulent)
+        states = {}
+        for entry in entries:
+            for uid in entry['added']:
+                states[uid] = 'changed' if states.get(uid) == 'removed' else 'added'
+            for uid in entry['changed']:
+                states[uid] = 'added' if states.get(uid) == 'added' else 'changed'
+            for uid in entry['removed']:
+                if states.get(uid) == 'added':
+                    del states[uid]
+                else:
+                    states[uid] = 'removed'
+
+        current = {event.uid: event for event in (self._snapshot_events(data) or [])}
+        for uid, state in states.items():
+            if state == 'removed':
+                result['removed'].append(uid)
+            elif uid in current:
+                result[state].append(current[uid])
+
+        return result
+
     def get_cached_data(self) -> Optional[Dict]:
-        """Récupère les données du cache, les rafraîchit si nécessaire"""
-        if not self.is_cache_valid():
-            logger.info("⏰ Cache expiré, rafraîchissement nécessaire")
+        """Récupère les données de l'instantané courant (voir get_snapshot)"""
+        snapshot = self.get_snapshot()
+        return snapshot.data if snapshot else None
+
+    def get_snapshot(self) -> Optional[CacheSnapshot]:
+        """
+        Récupère l'instantané courant (stale-while-revalidate)
+
+        Un cache expiré est servi tel quel pendant que le rafraîchissement
+        tourne en arrière-plan. On n'attend l'amont que si aucune donnée
+        n'existe encore, ou si le cache dépasse l'âge maximal (max_stale).
+
+        Pendant une requête (begin_request_snapshot), le premier instantané
+        lu est conservé : toutes les lectures de la requête sont cohérentes.
+        """
+        pinned = _request_snapshots.get()
+        if pinned is not None and id(self) in pinned:
+            return pinned[id(self)]
+
+        snapshot = self._revalidate()
+        if pinned is not None and snapshot is not None:
+            pinned[id(self)] = snapshot
+        return snapshot
+
+    def _revalidate(self) -> Optional[CacheSnapshot]:
+        self._sync_from_file()
+        age = self.cache_age()
+
+        if age is None:
+            self._count('reads_empty')
+            logger.info("📭 Cache vide, rafraîchissement synchrone")
+            self.refresh_cache()
+        elif age > self.max_stale:
+            self._count('reads_too_old')
+            logger.warning(f"⚠️ Cache trop ancien ({age}), rafraîchissement synchrone")
             if not self.refresh_cache():
                 logger.warning("⚠️ Échec du rafraîchissement, utilisation du cache existant")
+        elif age >= self.cache_duration:
+            self._count('reads_stale')
+            logger.info(f"⏰ Cache expiré depuis {age - self.cache_duration}, revalidation en arrière-plan")
+            self.trigger_background_refresh()
         else:
-            time_left = self.cache_duration - (datetime.now() - self.last_update)
-            logger.info(f"✅ Cache valide, prochaine MAJ dans {time_left}")
-
-        return self.cache_data
+            self._count('reads_fresh')
+            logger.debug(f"✅ Cache valide, prochaine MAJ dans {self.cache_duration - age}")
+
+        return self._snapshot
+
+    def start_background_refresh(self):
+        """Démarre le thread qui rafraîchit le cache avant son expiration"""
+        with self._refresher_lock:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name='esiee-cache-refresher', daemon=True)
+            self._refresher.start()
+            logger.info(f"🔁 Rafraîchissement en arrière-plan démarré (anticipation {self.refresh_ahead})")
+
+    def stop_background_refresh(self):
+        """Arrête le thread de rafraîchissement"""
+        self._stop.set()
+        self._wake.set()
+
+    def trigger_background_refresh(self):
+        """Demande un rafraîchissement en arrière-plan (sans bloquer l'appelant)"""
+        if self._refresh_lock.locked():
+            return  # Déjà en cours
+
+        self.start_background_refresh()
+        self._wake.set()
+
+    def _seconds_until_refresh(self) -> float:
+        """Délai avant le prochain rafraîchissement anticipé"""
+        snapshot = self._snapshot
+        if not snapshot or not snapshot.data or not snapshot.last_update:
+            return 0
+        due = snapshot.last_update + self.cache_duration - self.refresh_ahead
+        return (due - datetime.now()).total_seconds()
+
+    def _refresh_loop(self):
+        retry_delay = REFRESH_RETRY_SECONDS
+
+        while not self._stop.is_set():
+            self._wake.wait(timeout=max(0, self._seconds_until_refresh()))
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+
+            # Réveil anticipé alors que le cache vient d'être rafraîchi ailleurs
+            if self._seconds_until_refresh() > 0:
+                continue
+
+            if self.refresh_cache():
+                retry_delay = REFRESH_RETRY_SECONDS
+                if self.leader_lock is not None and not self.leader_lock.is_leader:
+                    # Worker non élu : l'instantané suivant n'est peut-être pas encore publié
+                    self._stop.wait(SHARED_SYNC_SECONDS)
+            else:
+                logger.warning(f"⚠️ Rafraîchissement en arrière-plan échoué, nouvel essai dans {retry_delay}s")
+                self._stop.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, REFRESH_RETRY_MAX_SECONDS)
+
+    def get_week_events(self, week_offset: int = 0) -> List[Event]:
+        """
+        Retourne les événements d'une semaine
+
+        Les semaines de l'horizon préchargé viennent du cache principal ; les
+        autres du cache LRU des semaines (une récupération amont par semaine
+        et par durée de vie).
+        """
+        monday = week_monday(week_offset)
+        week_key = iso_week_key(monday)
+
+        snapshot = self.get_snapshot()
+        if snapshot:
+            events = snapshot.week_shards.get(week_key)
+            if events is not None:
+                return events
+
+        ttl = self.week_cache.ttl_for(monday, week_monday(0))
+        return self.week_cache.get(week_key, ttl, lambda: self._fetch_week(week_offset))
+
+    def _fetch_week(self, week_offset: int) -> Optional[List[Event]]:
+        """Une semaine hors horizon, récupérée en amont (None en cas d'échec)"""
+        logger.info(f"🌐 Semaine {week_offset} hors horizon, récupération amont")
+        extractor = ESIEEiCalFinalExtractor(archive=self.archive, replay=self.replay)
+        if not extractor.extract_for_week(week_offset=week_offset):
+            return None
+        return extractor.events_data
+
+    def get_event_store(self) -> Optional[ESIEEEventStore]:
+        """Retourne le stockage en colonnes (rafraîchi si nécessaire)"""
+        snapshot = self.get_snapshot()
+        return snapshot.event_store if snapshot else None
 
     def force_refresh(self) -> bool:
         """Force le rafraîchissement du cache"""
@@ -340,12 +1001,27 @@ class ESIEECacheManager:
 
     def get_cache_info(self) -> Dict:
         """Retourne les informations sur le cache"""
+        snapshot = self._snapshot
+        age = self.cache_age()
         return {
             'cache_file': self.cache_file,
-            'last_update': self.last_update.isoformat() if self.last_update else None,
+            'last_update': snapshot.last_update.isoformat() if snapshot and snapshot.last_update else None,
             'is_valid': self.is_cache_valid(),
             'cache_duration_hours': self.cache_duration.total_seconds() / 3600,
-            'data_available': self.cache_data is not None
+            'age_seconds': round(age.total_seconds()) if age is not None else None,
+            'max_stale_hours': self.max_stale.total_seconds() / 3600,
+            'refresh_in_progress': self._refresh_lock.locked(),
+            'last_refresh': self.last_refresh,
+            'metrics': self.get_metrics(),
+            'background_refresh': self._refresher is not None and self._refresher.is_alive(),
+            'data_available': snapshot is not None,
+            'version': snapshot.version if snapshot else 0,
+            'upstream_fetch': ESIEEiCalExtractor.get_fetch_stats(),
+            'http_client': get_http_stats(),
+            'feed_archive': dict(self.archive.get_info(), replay=self.replay) if self.archive else None,
+            'event_store': snapshot.event_store.get_info() if snapshot and snapshot.event_store else None,
+            'week_cache': self.week_cache.get_info(),
+            'shared': self.leader_lock.get_info() if self.leader_lock else None
         }
 
 # Instance globale du gestionnaire de cache
@@ -357,34 +1033,53 @@ def get_cached_events():
     if not data:
         return []
 
-    events = data.get('events', [])
+    return data.get('events', [])
 
-    # Convertir les strings ISO en objets datetime
-    for event in events:
-        for key in ['start_datetime', 'end_datetime']:
-            if key in event and isinstance(event[key], str):
-                try:
-                    from datetime import datetime
-                    event[key] = datetime.fromisoformat(event[key])
-                except ValueError:
-                    pass
+def get_cached_week_events(week_offset: int = 0) -> List[Event]:
+    """
+    Récupère les événements d'une semaine depuis le cache
 
-    return events
+    Horizon préchargé (ESIEE_PREFETCH_WEEKS) ou, au-delà, cache LRU des semaines.
+    """
+    return cache_manager.get_week_events(week_offset)
+
+def get_cached_room_events(room_name: str, week_offset: int = 0) -> List[Event]:
+    """Récupère les événements d'une salle (ex: "PER - 210") pour une semaine, triés par début"""
+    events = cache_manager.get_week_events(week_offset)
+    room_events = [event for event in events if event.in_room(room_name)]
+    return sorted(room_events, key=lambda x: x.start_datetime or datetime.min)
 
 def get_cached_room_schedules():
     """Récupère les emplois du temps des salles depuis le cache"""
     data = cache_manager.get_cached_data()
     return data.get('room_schedules', {}) if data else {}
 
+def get_cached_room_schedule_index() -> Optional[RoomScheduleIndex]:
+    """Récupère l'index salle -> jour -> créneaux de la semaine courante"""
+    data = cache_manager.get_cached_data()
+    return data.get('room_schedule_index') if data else None
+
 def get_cached_rooms_data():
     """Récupère les données des salles depuis le cache"""
     data = cache_manager.get_cached_data()
     return data.get('rooms_data', {}) if data else {}
 
 def get_cached_available_rooms():
-    """Récupère les salles disponibles depuis le cache"""
-    data = cache_manager.get_cached_data()
-    return data.get('available_rooms', []) if data else []
+    """Récupère les salles (LOCATION bruts) disponibles maintenant depuis le cache"""
+    store = cache_manager.get_event_store()
+    if store is None:
+        return []
+
+    first_monday = week_monday(0)
+    return store.available_locations(datetime.now(), first_monday, first_monday + timedelta(weeks=1))
+
+def get_cache_snapshot() -> Optional[CacheSnapshot]:
+    """Récupère l'instantané courant du cache (le même pendant toute une requête)"""
+    return cache_manager.get_snapshot()
+
+def get_event_store() -> Optional[ESIEEEventStore]:
+    """Récupère le stockage en colonnes des événements du cache"""
+    return cache_manager.get_event_store()
 
 def get_cache_stats():
     """Récupère les statistiques du cache"""
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Instantané immuable du cache ESIEE
+
+Chaque rafraîchissement (ou chargement depuis le disque) produit un nouvel
+instantané : version, date de mise à jour, données et stockage en colonnes
+forment un tout cohérent. Le gestionnaire de cache le publie par une seule
+affectation de référence ; un lecteur qui a pris l'instantané le garde
+intact même si un rafraîchissement en publie un autre entre-temps.
+
+Les collections contenues (listes d'événements, index par salle) ne sont
+jamais modifiées après publication : un rafraîchissement construit de
+nouvelles listes, et ne reprend telles quelles que celles qui n'ont pas
+changé.
+"""
+
+import mmap
+from datetime import datetime, timedelta
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from event_model import Event
+from event_store import ESIEEEventStore
+
+
+class CacheSnapshot(NamedTuple):
+    """Version publiée du cache (données en lecture seule)"""
+    version: int
+    last_update: Optional[datetime]
+    data: Mapping[str, Any]
+    event_store: Optional[ESIEEEventStore]
+    # Fichier projeté sous les colonnes de event_store (instantané relu depuis le disque)
+    mapping: Optional[mmap.mmap] = None
+
+    @classmethod
+    def create(cls, version: int, last_update: Optional[datetime], data: Dict,
+               event_store: Optional[ESIEEEventStore], mapping: Optional[mmap.mmap] = None) -> 'CacheSnapshot':
+        return cls(version, last_update, MappingProxyType(dict(data)), event_store, mapping)
+
+    def age(self, now: Optional[datetime] = None) -> Optional[timedelta]:
+        """Âge de l'instantané (None si jamais mis à jour)"""
+        if self.last_update is None:
+            return None
+        return (now or datetime.now()) - self.last_update
+
+    @property
+    def events(self) -> List[Event]:
+        return self.data.get('events', [])
+
+    @property
+    def week_shards(self) -> Mapping[str, List[Event]]:
+        return self.data.get('week_shards', {})
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Type compact des événements ESIEE
+
+Un événement est un NamedTuple immuable (pas de dict par instance) dont les
+chaînes de salle et d'intitulé sont internées : les milliers de cours d'un
+semestre partagent quelques centaines de chaînes distinctes. LOCATION est
+découpé une seule fois en couples (bâtiment, numéro) au parsing. La forme
+dict / JSON n'est construite qu'en bordure d'API (to_dict).
+"""
+
+import hashlib
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Élément de LOCATION : "PER - 113", ou "112" (même bâtiment que le précédent)
+_ROOM_TOKEN = re.compile(r'^\s*(?:(?P<building>[A-Za-z][A-Za-z0-9]*)\s*-\s*)?(?P<room>[0-9]{3,4})\s*$')
+_LOCATION_SEPARATOR = re.compile(r'\\?,')
+
+
+class Event(NamedTuple):
+    """Événement d'emploi du temps (heures locales de Paris, naïves)"""
+    uid: str
+    start_datetime: Optional[datetime]
+    end_datetime: Optional[datetime]
+    summary: str
+    room_full: str
+    rooms: Tuple[Tuple[str, str], ...] = ()  # (bâtiment, numéro) extraits de LOCATION
+
+    @property
+    def location(self) -> str:
+        """LOCATION brut (identique à room_full)"""
+        return self.room_full
+
+    def in_room(self, room_full: str) -> bool:
+        """Vrai si l'événement occupe la salle (ex: "PER - 210"), y compris en multi-salles"""
+        targets = parse_location(room_full)
+        if not targets:
+            return self.room_full == room_full
+        return all(room in self.rooms for room in targets)
+
+    def to_dict(self) -> Dict:
+        """Forme sérialisable JSON (dates ISO)"""
+        return {
+            'uid': self.uid,
+            'start_datetime': self.start_datetime.isoformat() if self.start_datetime else None,
+            'end_datetime': self.end_datetime.isoformat() if self.end_datetime else None,
+            'summary': self.summary,
+            'location': self.room_full,
+            'room_full': self.room_full
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Event':
+        """Reconstruit un événement depuis sa forme JSON (cache sur disque)"""
+        return make_event(
+            uid=data.get('uid'),
+            start_datetime=_parse_iso(data.get('start_datetime')),
+            end_datetime=_parse_iso(data.get('end_datetime')),
+            summary=data.get('summary') or '',
+            room_full=data.get('room_full') or data.get('location') or ''
+        )
+
+
+@lru_cache(maxsize=4096)
+def parse_location(location: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Salles d'un LOCATION iCal, en couples (bâtiment, numéro)
+
+    Exemples : "PER - 113" → (('PER', '113'),)
+               "PER - 113\\,112" → (('PER', '113'), ('PER', '112'))
+               "PER - 113\\, NOI - 210" → (('PER', '113'), ('NOI', '210'))
+    Les éléments non reconnus sont ignorés.
+    """
+    rooms = []
+    building = None
+
+    for token in _LOCATION_SEPARATOR.split(location):
+        match = _ROOM_TOKEN.match(token)
+        if not match:
+            continue
+        building = sys.intern(match.group('building') or building or '')
+        if building:
+            rooms.append((building, sys.intern(match.group('room'))))
+
+    return tuple(rooms)
+
+
+def _parse_iso(value) -> Optional[datetime]:
+    if isinstance(value, datetime) or value is None:
+        return value
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def event_content_uid(summary: str, room_full: str, start: Optional[datetime], end: Optional[datetime]) -> str:
+    """Identifiant dérivé du contenu pour les événements sans UID amont"""
+    content = '|'.join([
+        summary,
+        room_full,
+        start.isoformat() if start else '',
+        end.isoformat() if end else ''
+    ])
+    return 'sha1-' + hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def make_event(uid: Optional[str], start_datetime: Optional[datetime], end_datetime: Optional[datetime],
+               summary: str = '', room_full: str = '') -> Event:
+    """Construit un Event en internant les chaînes répétées et en découpant LOCATION en salles"""
+    summary = sys.intern(summary)
+    room_full = sys.intern(room_full)
+
+    # Identité stable : l'UID amont, sinon un hash du contenu
+    if not uid:
+        uid = event_content_uid(summary, room_full, start_datetime, end_datetime)
+
+    return Event(uid, start_datetime, end_datetime, summary, room_full, parse_location(room_full))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Stockage en colonnes des événements ESIEE
+
+Construit à chaque rafraîchissement du cache, il remplace les boucles Python
+sur les événements par des masques et des recherches dichotomiques NumPy :
+salles occupées à un instant, salles libres sur un créneau, taux
+d'occupation par salle.
+
+Une ligne par couple (événement, salle PER), triée par salle puis par début.
+Les événements hors PER gardent une ligne avec room_id = -1 pour les requêtes
+par LOCATION brut. Les heures sont des minutes depuis l'epoch, en heure
+locale de Paris (naïve) comme les Event.
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from event_model import Event
+
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+def to_epoch_minutes(dt: datetime) -> int:
+    """Minutes depuis l'epoch d'une date naïve (heure locale)"""
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 1440 + dt.hour * 60 + dt.minute
+
+
+def _minutes_column(values: List[datetime]) -> np.ndarray:
+    # Plus rapide que np.array(values, dtype='datetime64[m]') sur des datetime Python
+    return np.fromiter((to_epoch_minutes(value) for value in values), dtype=np.int32, count=len(values))
+
+
+class ESIEEEventStore:
+    """Colonnes d'événements : salle, LOCATION, intitulé, début et fin"""
+
+    def __init__(self, events: List[Event], room_names: List[str], location_names: List[str],
+                 summary_names: List[str], room_ids: np.ndarray, location_ids: np.ndarray,
+                 summary_ids: np.ndarray, event_ids: np.ndarray, starts: np.ndarray, ends: np.ndarray):
+        self.events = events
+        self.room_names = room_names
+        self.location_names = location_names
+        self.summary_names = summary_names
+
+        self.room_ids = room_ids
+        self.location_ids = location_ids
+        self.summary_ids = summary_ids
+        self.event_ids = event_ids
+        self.starts = starts
+        self.ends = ends
+
+        self._room_index = {name: index for index, name in enumerate(room_names)}
+        # Lignes de la salle r : bounds[r]:bounds[r + 1] (les lignes -1 sont en tête)
+        self._bounds = np.searchsorted(room_ids, np.arange(len(room_names) + 1))
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event],
+                    room_numbers: Callable[[Event], List[str]]) -> 'ESIEEEventStore':
+        """
+        Construit le stockage depuis les événements du cache
+
+        Args:
+            events: Événements (les événements sans dates sont ignorés)
+            room_numbers: Numéros de salles PER d'un événement
+        """
+        rooms: Dict[str, int] = {}
+        locations: Dict[str, int] = {}
+        summaries: Dict[str, int] = {}
+
+        kept = []
+        room_ids, location_ids, summary_ids, event_ids = [], [], [], []
+        starts, ends = [], []
+
+        for event in events:
+            if not isinstance(event.start_datetime, datetime) or not isinstance(event.end_datetime, datetime):
+                continue
+
+            event_id = len(kept)
+            kept.append(event)
+            location_id = locations.setdefault(event.room_full, len(locations)) if event.room_full else -1
+            summary_id = summaries.setdefault(event.summary, len(summaries))
+
+            for number in room_numbers(event) or [None]:
+                room_ids.append(rooms.setdefault(number, len(rooms)) if number else -1)
+                location_ids.append(location_id)
+                summary_ids.append(summary_id)
+                event_ids.append(event_id)
+                starts.append(event.start_datetime)
+                ends.append(event.end_datetime)
+
+        room_col = np.array(room_ids, dtype=np.int32)
+        start_col = _minutes_column(starts)
+        order = np.lexsort((start_col, room_col))
+
+        return cls(
+            events=kept,
+            room_names=list(rooms),
+            location_names=list(locations),
+            summary_names=list(summaries),
+            room_ids=room_col[order],
+            location_ids=np.array(location_ids, dtype=np.int32)[order],
+            summary_ids=np.array(summary_ids, dtype=np.int32)[order],
+            event_ids=np.array(event_ids, dtype=np.int32)[order],
+            starts=start_col[order],
+            ends=_minutes_column(ends)[order]
+        )
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _room_slice(self, room_number: str) -> Optional[slice]:
+        room_id = self._room_index.get(room_number)
+        if room_id is None:
+            return None
+        return slice(self._bounds[room_id], self._bounds[room_id + 1])
+
+    def is_room_free(self, room_number: str, at: datetime) -> bool:
+        """Vrai si aucun cours de la salle ne couvre l'instant (créneau [début, fin[)"""
+        rows = self._room_slice(room_number)
+        if rows is None:
+            return True
+
+        minute = to_epoch_minutes(at)
+        starts = self.starts[rows]
+        # Seuls les cours commencés avant l'instant peuvent le couvrir
+        started = np.searchsorted(starts, minute, side='right')
+        return not bool((self.ends[rows][:started] > minute).any())
+
+    def occupied_rooms(self, at: datetime) -> Set[str]:
+        """Salles PER occupées à un instant"""
+        minute = to_epoch_minutes(at)
+        mask = (self.starts <= minute) & (self.ends > minute) & (self.room_ids >= 0)
+        return {self.room_names[room_id] for room_id in np.unique(self.room_ids[mask])}
+
+    def free_rooms(self, room_numbers: Iterable[str], start: datetime, end: datetime) -> List[str]:
+        """Salles (parmi room_numbers) sans aucun cours entre start et end"""
+        start_minute, end_minute = to_epoch_minutes(start), to_epoch_minutes(end)
+        mask = (self.starts < end_minute) & (self.ends > start_minute) & (self.room_ids >= 0)
+        busy = {self.room_names[room_id] for room_id in np.unique(self.room_ids[mask])}
+        return sorted(room for room in room_numbers if room not in busy)
+
+    def available_locations(self, at: datetime, window_start: datetime, window_end: datetime) -> List[str]:
+        """
+        LOCATION bruts libres à un instant, parmi ceux ayant un cours dans la fenêtre
+
+        Même sémantique que events_api.get_available_rooms_today (bornes incluses).
+        """
+        minute = to_epoch_minutes(at)
+        in_window = ((self.starts >= to_epoch_minutes(window_start)) &
+                     (self.starts < to_epoch_minutes(window_end)) & (self.location_ids >= 0))
+        busy = in_window & (self.starts <= minute) & (self.ends >= minute)
+
+        all_ids = set(np.unique(self.location_ids[in_window]).tolist())
+        busy_ids = set(np.unique(self.location_ids[busy]).tolist())
+        return sorted(self.location_names[location_id] for location_id in all_ids - busy_ids)
+
+    def occupancy_rates(self, start: datetime, end: datetime) -> Dict[str, float]:
+        """Taux d'occupation (0 à 1) de chaque salle PER sur [start, end["""
+        start_minute, end_minute = to_epoch_minutes(start), to_epoch_minutes(end)
+        span = end_minute - start_minute
+        if span <= 0 or not self.room_names:
+            return {}
+
+        covered = np.minimum(self.ends, end_minute) - np.maximum(self.starts, start_minute)
+        covered = np.where(self.room_ids >= 0, np.clip(covered, 0, None), 0)
+        per_room = np.bincount(np.clip(self.room_ids, 0, None), weights=covered,
+                               minlength=len(self.room_names))
+        rates = np.minimum(per_room / span, 1.0)
+        return {name: float(rates[room_id]) for room_id, name in enumerate(self.room_names)}
+
+    def get_info(self) -> Dict:
+        return {
+            'rows': len(self),
+            'events': len(self.events),
+            'rooms': len(self.room_names),
+            'locations': len(self.location_names),
+            'summaries': len(self.summary_names),
+            'bytes': int(sum(column.nbytes for column in (self.room_ids, self.location_ids, self.summary_ids,
+                                                         self.event_ids, self.starts, self.ends)))
+        }
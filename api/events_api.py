@@ -5,22 +5,23 @@ Fonction principale : get_events_this_week()
 """
 
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Optional
+from event_model import Event
 from ical_extractor_final import ESIEEiCalFinalExtractor
 
-def get_events_this_week() -> List[Dict]:
+def get_events_this_week() -> List[Event]:
     """
     Fonction principale pour récupérer les événements de cette semaine
 
     Returns:
-        List[Dict]: Liste des événements avec leurs informations
+        List[Event]: Liste des événements avec leurs informations
 
     Exemple d'utilisation:
         events = get_events_this_week()
         print(f"Il y a {len(events)} événements cette semaine")
 
         for event in events:
-            print(f"- {event['summary']} à {event['location']}")
+            print(f"- {event.summary} à {event.room_full}")
     """
     try:
         extractor = ESIEEiCalFinalExtractor()
@@ -34,7 +35,7 @@ def get_events_this_week() -> List[Dict]:
         print(f"Erreur lors de la récupération des événements: {e}")
         return []
 
-def get_events_next_week() -> List[Dict]:
+def get_events_next_week() -> List[Event]:
     """Récupère les événements de la semaine prochaine"""
     try:
         extractor = ESIEEiCalFinalExtractor()
@@ -48,7 +49,7 @@ def get_events_next_week() -> List[Dict]:
         print(f"Erreur lors de la récupération des événements: {e}")
         return []
 
-def get_events_for_room(room_name: str, week_offset: int = 0) -> List[Dict]:
+def get_events_for_room(room_name: str, week_offset: int = 0) -> List[Event]:
     """
     Récupère les événements pour une salle spécifique
 
@@ -57,7 +58,7 @@ def get_events_for_room(room_name: str, week_offset: int = 0) -> List[Dict]:
         week_offset: 0=cette semaine, 1=semaine prochaine, etc.
 
     Returns:
-        List[Dict]: Événements de cette salle
+        List[Event]: Événements de cette salle
     """
     try:
         extractor = ESIEEiCalFinalExtractor()
@@ -66,10 +67,10 @@ def get_events_for_room(room_name: str, week_offset: int = 0) -> List[Dict]:
             # Filtrer les événements pour cette salle
             room_events = []
             for event in extractor.events_data:
-                if event.get('room_full') == room_name:
+                if event.in_room(room_name):
                     room_events.append(event)
 
-            return sorted(room_events, key=lambda x: x.get('start_datetime', datetime.min))
+            return sorted(room_events, key=lambda x: x.start_datetime or datetime.min)
         else:
             return []
 
@@ -93,9 +94,9 @@ def get_available_rooms_today() -> List[str]:
         occupied_rooms = set()
 
         for event in events:
-            room = event.get('room_full')
-            start_time = event.get('start_datetime')
-            end_time = event.get('end_datetime')
+            room = event.room_full
+            start_time = event.start_datetime
+            end_time = event.end_datetime
 
             if room:
                 all_rooms.add(room)
@@ -128,9 +129,9 @@ def test_api():
         # Afficher quelques exemples
         print("   📋 Premiers événements:")
         for i, event in enumerate(events[:3]):
-            summary = event.get('summary', 'Sans titre')
-            location = event.get('room_full', 'Lieu non spécifié')
-            start = event.get('start_datetime')
+            summary = event.summary or 'Sans titre'
+            location = event.room_full or 'Lieu non spécifié'
+            start = event.start_datetime
 
             if isinstance(start, datetime):
                 time_str = start.strftime('%d/%m à %H:%M')
@@ -157,7 +158,7 @@ def test_api():
     # Test 4: Événements d'une salle spécifique
     if events:
         # Prendre la première salle trouvée
-        first_room = events[0].get('room_full')
+        first_room = events[0].room_full
         if first_room:
             print(f"\n4️⃣ Événements de la salle {first_room}:")
             room_events = get_events_for_room(first_room)
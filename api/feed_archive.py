@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Archive compressée des flux iCal bruts
+
+Chaque flux téléchargé peut être conservé compressé (gzip, ou zstd si la lib
+`zstandard` est installée), indexé par date de récupération et URL, avec une
+rétention bornée en taille. Le mode rejeu permet ensuite d'ingérer depuis
+l'archive au lieu du réseau (reproduction d'un rafraîchissement lent,
+régression de parsing, benchmarks sur des flux de production).
+
+Configuration via variables d'environnement :
+- ESIEE_FEED_ARCHIVE_DIR    : dossier de l'archive (désactivée si absent)
+- ESIEE_FEED_ARCHIVE_MAX_MB : taille maximale de l'archive (200 Mo par défaut)
+- ESIEE_FEED_REPLAY         : "1" pour ingérer depuis l'archive au lieu du réseau
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FEED_REPLAY = os.environ.get('ESIEE_FEED_REPLAY', '') == '1'
+
+# Valeur par défaut des paramètres `archive` : l'archive globale (None la désactive)
+DEFAULT_ARCHIVE = object()
+
+
+def _replay_key(url: str) -> str:
+    """URL sans firstDate : permet de rejouer un flux archivé un autre jour"""
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != 'firstDate']
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class FeedArchiveWriter:
+    """Écriture compressée d'un flux au fil du téléchargement"""
+
+    def __init__(self, archive: 'ESIEEFeedArchive', url: str, fetched_at: datetime):
+        self.archive = archive
+        self.url = url
+        self.fetched_at = fetched_at
+        self.raw_bytes = 0
+
+        stem = f"{fetched_at.strftime('%Y%m%dT%H%M%S%f')}_{hashlib.sha1(url.encode()).hexdigest()[:12]}"
+        self.path = os.path.join(archive.directory, f"{stem}.ics.{archive.extension}")
+        self.tmp_path = self.path + '.tmp'
+
+        self._file = open(self.tmp_path, 'wb')
+        if archive.extension == 'zst':
+            self._stream = zstandard.ZstdCompressor(level=archive.level).stream_writer(self._file)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._file, mode='wb', compresslevel=archive.level)
+
+    def write(self, chunk: bytes):
+        self.raw_bytes += len(chunk)
+        self._stream.write(chunk)
+
+    def commit(self, sha256: Optional[str] = None) -> Dict:
+        """Finalise l'entrée (renommage atomique) puis applique la rétention"""
+        self._close()
+        os.replace(self.tmp_path, self.path)
+
+        entry = {
+            'url': self.url,
+            'replay_key': _replay_key(self.url),
+            'fetched_at': self.fetched_at.isoformat(),
+            'raw_bytes': self.raw_bytes,
+            'stored_bytes': os.path.getsize(self.path),
+            'sha256': sha256,
+            'file': os.path.basename(self.path)
+        }
+        with open(self.path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+
+        logger.info(f"🗄️ Flux archivé: {entry['file']} ({self.raw_bytes} → {entry['stored_bytes']} octets)")
+        self.archive._add_entry(entry)
+        self.archive.enforce_retention()
+        return entry
+
+    def discard(self):
+        """Abandonne l'entrée (flux inchangé ou téléchargement en échec)"""
+        self._close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+    def _close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+        if not self._file.closed:
+            self._file.close()
+
+
+class ESIEEFeedArchive:
+    """
+    Archive des flux iCal bruts, compressés et indexés par date et URL
+
+    L'index des entrées est lu une fois sur disque (fichiers .json), puis tenu
+    à jour en mémoire par commit() et enforce_retention() : un seul processus
+    (le worker élu en cache partagé) doit écrire dans un même dossier.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024,
+                 compression: Optional[str] = None, level: Optional[int] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        if compression is None:
+            compression = 'zstd' if zstandard is not None else 'gzip'
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("⚠️ zstandard non installé, archive en gzip")
+            compression = 'gzip'
+
+        self.extension = 'zst' if compression == 'zstd' else 'gz'
+        self.level = level if level is not None else (10 if self.extension == 'zst' else 6)
+        self._lock = threading.Lock()
+        self._index: Optional[List[Dict]] = None  # Entrées, de la plus ancienne à la plus récente
+
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['ESIEEFeedArchive']:
+        """Instancie l'archive si ESIEE_FEED_ARCHIVE_DIR est défini"""
+        directory = os.environ.get('ESIEE_FEED_ARCHIVE_DIR')
+        if not directory:
+            return None
+
+        max_mb = int(os.environ.get('ESIEE_FEED_ARCHIVE_MAX_MB', '200'))
+        return cls(directory, max_bytes=max_mb * 1024 * 1024)
+
+    def writer(self, url: str, fetched_at: Optional[datetime] = None) -> FeedArchiveWriter:
+        """Ouvre une nouvelle entrée à remplir au fil du téléchargement"""
+        return FeedArchiveWriter(self, url, fetched_at or datetime.now())
+
+    def store(self, url: str, body: bytes, fetched_at: Optional[datetime] = None) -> Dict:
+        """Archive un flux déjà en mémoire"""
+        writer = self.writer(url, fetched_at)
+        writer.write(body)
+        return writer.commit(hashlib.sha256(body).hexdigest())
+
+    def _scan(self) -> List[Dict]:
+        """Relit les fichiers .json du dossier (construction de l'index)"""
+        entries = []
+
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    entries.append(json.load(f))
+            except (json.JSONDecodeError, IOError):
+                continue
+
+        return entries
+
+    def _entries_locked(self) -> List[Dict]:
+        """Index en mémoire, construit au premier accès (appelé sous self._lock)"""
+        if self._index is None:
+            self._index = self._scan()
+        return self._index
+
+    def _add_entry(self, entry: Dict):
+        with self._lock:
+            if self._index is None:
+                self._index = self._scan()  # Le fichier .json de l'entrée est déjà écrit
+                return
+            index = self._index
+            index.append(entry)
+            # Les noms de fichiers commencent par la date de récupération
+            index.sort(key=lambda item: item['file'])
+
+    def entries(self, url: Optional[str] = None) -> List[Dict]:
+        """Entrées de l'archive, de la plus ancienne à la plus récente"""
+        with self._lock:
+            return [entry for entry in self._entries_locked() if url is None or entry.get('url') == url]
+
+    def find(self, url: str, before: Optional[datetime] = None) -> Optional[Dict]:
+        """
+        Entrée la plus récente pour une URL (optionnellement avant une date)
+
+        À défaut de correspondance exacte, on prend le même flux (mêmes
+        ressources, même nombre de semaines) archivé un autre jour.
+        """
+        entries = self.entries()
+        if before is not None:
+            entries = [entry for entry in entries if entry['fetched_at'] <= before.isoformat()]
+
+        exact = [entry for entry in entries if entry['url'] == url]
+        if exact:
+            return exact[-1]
+
+        key = _replay_key(url)
+        similar = [entry for entry in entries if entry.get('replay_key') == key]
+        return similar[-1] if similar else None
+
+    def open_entry(self, entry: Dict) -> io.BufferedIOBase:
+        """Ouvre le flux décompressé d'une entrée"""
+        path = os.path.join(self.directory, entry['file'])
+
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError("zstandard requis pour relire cette entrée")
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+        return gzip.open(path, 'rb')
+
+    def iter_lines(self, entry: Dict) -> Iterator[bytes]:
+        """Relit une entrée ligne par ligne sans la décompresser entièrement en mémoire"""
+        with self.open_entry(entry) as stream:
+            yield from stream
+
+    def total_bytes(self) -> int:
+        return sum(entry.get('stored_bytes', 0) for entry in self.entries())
+
+    def enforce_retention(self) -> int:
+        """Supprime les entrées les plus anciennes au-delà de max_bytes (la plus récente est gardée)"""
+        removed = 0
+
+        with self._lock:
+            entries = self._entries_locked()
+            total = sum(entry.get('stored_bytes', 0) for entry in entries)
+
+            while len(entries) > 1 and total > self.max_bytes:
+                entry = entries.pop(0)
+                total -= entry.get('stored_bytes', 0)
+                path = os.path.join(self.directory, entry['file'])
+                for stale in (path, path + '.json'):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+                removed += 1
+
+        if removed:
+            logger.info(f"🧹 Archive: {removed} flux supprimé(s) (rétention {self.max_bytes} octets)")
+        return removed
+
+    def get_info(self) -> Dict:
+        entries = self.entries()
+        return {
+            'directory': self.directory,
+            'compression': self.extension,
+            'entries': len(entries),
+            'stored_bytes': sum(entry.get('stored_bytes', 0) for entry in entries),
+            'raw_bytes': sum(entry.get('raw_bytes', 0) for entry in entries),
+            'max_bytes': self.max_bytes
+        }
+
+
+# Instance globale (None si l'archive n'est pas configurée)
+feed_archive = ESIEEFeedArchive.from_env()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Client HTTP partagé pour les appels à edt-consult
+
+Une seule requests.Session (pool de connexions keep-alive) est partagée par
+tous les extracteurs : on ne repaie plus la poignée de main TCP + TLS à chaque
+récupération. Les erreurs 5xx et les connexions coupées sont rejouées avec un
+backoff exponentiel borné.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Timeouts séparés : (connexion, lecture) en secondes
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
+# Pool : un hôte amont, mais plusieurs threads peuvent télécharger en parallèle
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+# Rejeu : 3 tentatives max, attente 0.5s, 1s, 2s
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'retries': 0,
+    'failures': 0,
+    'latency_total_ms': 0.0,
+    'latency_max_ms': 0.0,
+    'last_latency_ms': None
+}
+
+
+def create_session() -> requests.Session:
+    """Crée une session avec pool de connexions et rejeu automatique"""
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Retourne la session partagée (créée au premier appel)"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def http_get(url: str, session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+    """
+    GET via la session partagée, avec mesure de latence et comptage des rejeux
+
+    La latence mesurée est le temps jusqu'aux en-têtes de réponse (rejeux
+    compris) : avec stream=True le corps est lu ensuite par l'appelant.
+    """
+    session = session or get_http_session()
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+
+    started = time.perf_counter()
+    try:
+        response = session.get(url, **kwargs)
+    except requests.RequestException as e:
+        _record(time.perf_counter() - started, retries=_failed_retry_count(e), failed=True)
+        raise
+
+    retries = getattr(response.raw, 'retries', None)
+    retry_count = len(retries.history) if retries is not None else 0
+    _record(time.perf_counter() - started, retries=retry_count, failed=response.status_code >= 500)
+
+    if retry_count:
+        logger.info(f"🔁 {retry_count} nouvelle(s) tentative(s) pour {url}")
+
+    return response
+
+
+def _failed_retry_count(error: requests.RequestException) -> int:
+    """
+    Rejeux effectués avant une exception
+
+    urllib3 ne lève MaxRetryError (enveloppée par requests) qu'une fois le
+    budget de rejeux épuisé, sans joindre son historique : tous les rejeux ont
+    donc eu lieu. Pour les autres erreurs (URL invalide, TooManyRedirects,
+    erreur non rejouable), on ne peut pas le savoir : 0.
+    """
+    reason = error.args[0] if error.args else None
+    return MAX_RETRIES if isinstance(reason, MaxRetryError) else 0
+
+
+def _record(elapsed: float, retries: int, failed: bool):
+    elapsed_ms = elapsed * 1000
+    with _stats_lock:
+        _stats['requests'] += 1
+        _stats['retries'] += retries
+        _stats['failures'] += 1 if failed else 0
+        _stats['latency_total_ms'] += elapsed_ms
+        _stats['latency_max_ms'] = max(_stats['latency_max_ms'], elapsed_ms)
+        _stats['last_latency_ms'] = round(elapsed_ms, 1)
+
+
+def get_http_stats() -> Dict:
+    """Compteurs de rejeux et de latence du client amont"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    requests_count = stats['requests']
+    stats['latency_avg_ms'] = round(stats['latency_total_ms'] / requests_count, 1) if requests_count else None
+    stats['latency_total_ms'] = round(stats['latency_total_ms'], 1)
+    stats['latency_max_ms'] = round(stats['latency_max_ms'], 1)
+    stats['connect_timeout_s'] = CONNECT_TIMEOUT
+    stats['read_timeout_s'] = READ_TIMEOUT
+    return stats
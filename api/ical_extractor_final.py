@@ -5,70 +5,492 @@ Utilise les paramètres de date découverts pour extraire les données de n'impo
 """
 
 import requests
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import bisect
+import hashlib
+import io
 import json
 import logging
+import os
 import re
+import tempfile
+import threading
+
+from event_model import Event, make_event
+from feed_archive import DEFAULT_ARCHIVE, ESIEEFeedArchive, FEED_REPLAY, feed_archive
+from http_client import get_http_session, http_get
+from occupancy import OccupancyGrid
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+try:
+    from zoneinfo import ZoneInfo
+    PARIS_TZ = ZoneInfo('Europe/Paris')
+except Exception as e:  # base tz absente (image slim sans tzdata)
+    logger.warning(f"⚠️ zoneinfo indisponible, règle UE utilisée pour Europe/Paris: {e}")
+    ZoneInfo = None
+    PARIS_TZ = None
+
+_UTC = timezone.utc
+
+# Flux edt-consult (surchargeable pour pointer vers un serveur local de test)
+ICAL_BASE_URL = os.environ.get(
+    'ESIEE_ICAL_BASE_URL',
+    'https://edt-consult.univ-eiffel.fr/jsp/custom/modules/plannings/anonymous_cal.jsp'
+)
+
+# Ressources edt-consult ingérées (ex: "410,412") et découpage en fenêtres de N semaines (0 = aucune)
+ICAL_RESOURCES = [int(r) for r in os.environ.get('ESIEE_ICAL_RESOURCES', '410').split(',') if r.strip()]
+ICAL_WINDOW_WEEKS = int(os.environ.get('ESIEE_ICAL_WINDOW_WEEKS', '0'))
+
+# Téléchargements simultanés maximum (≤ taille du pool HTTP)
+MAX_FETCH_WORKERS = 4
+
+PARIS_TZIDS = {'Europe/Paris', 'Romance Standard Time'}
+
+_HOUR_DELTAS = {}
+
+def _offset_delta(seconds: int) -> timedelta:
+    """Retourne (et mémorise) le timedelta correspondant à un décalage UTC"""
+    delta = _HOUR_DELTAS.get(seconds)
+    if delta is None:
+        delta = _HOUR_DELTAS[seconds] = timedelta(seconds=seconds)
+    return delta
+
+def _transition_key(dt: datetime) -> int:
+    """Clé MMDDHHMMSS comparable aux chiffres bruts d'un horodatage iCal"""
+    return (((dt.month * 100 + dt.day) * 100 + dt.hour) * 100 + dt.minute) * 100 + dt.second
+
+@lru_cache(maxsize=None)
+def _paris_transitions(year: int) -> Tuple[List[int], List[int]]:
+    """
+    Table des changements d'heure de Paris pour une année, construite une seule fois
+
+    Returns:
+        (clés UTC MMDDHHMMSS des transitions, décalages en secondes) : le décalage
+        offsets[i] s'applique à partir de keys[i - 1] (offsets[0] avant la première transition)
+    """
+    if PARIS_TZ is None:
+        # Règle UE : dernier dimanche de mars et d'octobre à 01:00 UTC
+        def last_sunday(month: int) -> datetime:
+            day = datetime(year, month, 31, 1)
+            return day - timedelta(days=(day.weekday() + 1) % 7)
+
+        return [_transition_key(last_sunday(3)), _transition_key(last_sunday(10))], [3600, 7200, 3600]
+
+    def offset_at(utc_dt: datetime) -> int:
+        aware = utc_dt.replace(tzinfo=_UTC).astimezone(PARIS_TZ)
+        return int(aware.utcoffset().total_seconds())
+
+    keys = []
+    offsets = [offset_at(datetime(year, 1, 1))]
+    day = datetime(year, 1, 1)
+
+    # Balayage jour par jour puis heure par heure : ~400 appels une fois par an
+    while day.year == year:
+        next_day = day + timedelta(days=1)
+        if next_day.year == year and offset_at(next_day) != offsets[-1]:
+            hour = day
+            while offset_at(hour) == offsets[-1]:
+                hour += timedelta(hours=1)
+            keys.append(_transition_key(hour))
+            offsets.append(offset_at(hour))
+        day = next_day
+
+    return keys, offsets
+
+def _paris_offset(year: int, key: int) -> timedelta:
+    """Décalage Paris (en vigueur à l'instant UTC donné par sa clé MMDDHHMMSS)"""
+    keys, offsets = _paris_transitions(year)
+    return _offset_delta(offsets[bisect.bisect_right(keys, key)])
+
+def _split_property_params(key: str) -> Tuple[str, Dict[str, str]]:
+    """Sépare le nom d'une propriété iCal de ses paramètres (DTSTART;TZID=Europe/Paris)"""
+    if ';' not in key:
+        return key, {}
+
+    name, *raw_params = key.split(';')
+    params = {}
+    for raw in raw_params:
+        param_name, _, param_value = raw.partition('=')
+        params[param_name.upper()] = param_value.strip('"')
+    return name, params
+
+def parse_ical_datetime(value: str, params: Optional[Dict[str, str]] = None) -> Optional[datetime]:
+    """
+    Convertit une valeur DATE-TIME / DATE iCal en datetime naïf à l'heure de Paris
+
+    Formats gérés :
+        20251009T080000Z                  -> UTC, converti via la table de transitions
+        DTSTART;TZID=Europe/Paris:...     -> déjà à l'heure locale
+        DTSTART;TZID=<autre zone>:...     -> converti vers Europe/Paris
+        DTSTART;VALUE=DATE:20251009       -> journée entière (minuit local)
+    """
+    try:
+        value = value.strip()
+        length = len(value)
+
+        if length == 8:
+            return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+
+        if length < 15 or value[8] != 'T':
+            return None
+
+        year = int(value[0:4])
+        local = datetime(year, int(value[4:6]), int(value[6:8]),
+                         int(value[9:11]), int(value[11:13]), int(value[13:15]))
+
+        if length == 16 and value[15] == 'Z':
+            return local + _paris_offset(year, int(value[4:8] + value[9:15]))
+
+        tzid = (params or {}).get('TZID')
+        if tzid and tzid not in PARIS_TZIDS and ZoneInfo is not None:
+            aware = local.replace(tzinfo=ZoneInfo(tzid))
+            return aware.astimezone(PARIS_TZ).replace(tzinfo=None)
+
+        # Heure "flottante" ou déjà exprimée à Paris
+        return local
+    except Exception:
+        return None
+
+def _unfold_ical_lines(lines: Iterable) -> Iterator[str]:
+    """
+    Déplie les lignes de contenu iCal (RFC 5545 §3.1)
+
+    Une ligne qui commence par un espace ou une tabulation continue la ligne
+    précédente. Le dépliage se fait avant le décodage pour ne pas couper un
+    caractère UTF-8 réparti sur deux lignes physiques.
+    """
+    pending = None
+
+    for raw in lines:
+        if isinstance(raw, str):
+            raw = raw.encode('utf-8')
+        raw = raw.rstrip(b'\r\n')
+
+        if not raw:
+            # iter_lines() peut produire des lignes vides parasites
+            continue
+
+        if raw[:1] in (b' ', b'\t'):
+            if pending is not None:
+                pending += raw[1:]
+            continue
+
+        if pending is not None:
+            yield pending.decode('utf-8', errors='replace')
+        pending = raw
+
+    if pending is not None:
+        yield pending.decode('utf-8', errors='replace')
+
+def _tee_chunks(chunks: Iterable[bytes], hasher, archive_writer=None, on_bytes=None) -> Iterator[bytes]:
+    """Hache (et archive si demandé) les octets bruts au fil du téléchargement"""
+    for chunk in chunks:
+        hasher.update(chunk)
+        if on_bytes is not None:
+            on_bytes(len(chunk))
+        if archive_writer is not None:
+            archive_writer.write(chunk)
+        yield chunk
+
+def _iter_chunk_lines(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Découpe un flux de blocs d'octets en lignes"""
+    pending = b''
+
+    for chunk in chunks:
+        pending += chunk
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        yield from lines
+
+    if pending:
+        yield pending
+
 class ESIEEiCalExtractor:
     """Extracteur de base pour iCal ESIEE"""
 
-    def __init__(self):
-        self.base_ical_url = "https://edt-consult.univ-eiffel.fr/jsp/custom/modules/plannings/anonymous_cal.jsp"
+    CHUNK_SIZE = 64 * 1024
+
+    # Corps gardé en mémoire (au-delà : fichier temporaire) le temps de comparer son hash
+    SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+    # Nombre d'URLs dont on garde la validation (ETag, hash) et le résultat parsé
+    MAX_FETCH_STATES = 32
+
+    # État partagé entre instances : events_api crée un extracteur par appel
+    _fetch_states = OrderedDict()
+    _fetch_lock = threading.Lock()
+    _fetch_stats = {
+        'requests': 0,
+        'not_modified': 0,   # 304 renvoyés par edt-consult
+        'hash_hits': 0,      # 200 mais corps identique octet pour octet
+        'full_parses': 0,
+        'bytes': 0           # Octets téléchargés (corps des réponses 200)
+    }
+
+    def __init__(self, session: Optional[requests.Session] = None,
+                 archive: Optional[ESIEEFeedArchive] = DEFAULT_ARCHIVE, replay: Optional[bool] = None):
+        self.base_ical_url = ICAL_BASE_URL
+        self.session = session or get_http_session()
+        self.archive = feed_archive if archive is DEFAULT_ARCHIVE else archive
+        self.replay = FEED_REPLAY if replay is None else replay
         self.events_data = []
         self.rooms_data = {}
+        self.bytes_received = 0  # Octets téléchargés par cet extracteur (et ses flux parallèles)
 
     def extract_from_ical_url(self, url: str) -> bool:
-        """Extrait les données depuis une URL iCal"""
+        """
+        Extrait les données depuis une URL iCal
+
+        La requête est conditionnelle (If-None-Match / If-Modified-Since). Sans
+        résultat précédent, le corps est parsé au fil de l'eau pendant son
+        hachage. Sinon il est d'abord recopié dans un fichier temporaire
+        (en mémoire jusqu'à SPOOL_MAX_BYTES, sur disque au-delà) : si son
+        SHA-256 est celui du précédent, le résultat précédent est réutilisé
+        sans parser le flux ; sinon le flux est parsé depuis cette copie.
+        """
+        if self.replay:
+            return self._extract_from_archive(url)
+
+        archive_writer = None
         try:
             logger.info(f"📡 Récupération depuis: {url}")
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-
-            ical_content = response.text
-            logger.info(f"📄 {len(ical_content)} caractères reçus")
+            state = self._get_fetch_state(url)
+
+            headers = {}
+            if state:
+                if state.get('etag'):
+                    headers['If-None-Match'] = state['etag']
+                if state.get('last_modified'):
+                    headers['If-Modified-Since'] = state['last_modified']
+
+            self._count('requests')
+            with http_get(url, self.session, stream=True, headers=headers) as response:
+                if response.status_code == 304 and state:
+                    self._count('not_modified')
+                    logger.info("♻️ Flux inchangé (304), réutilisation du résultat précédent")
+                    return self._reuse_fetch_state(state)
+
+                response.raise_for_status()
+                hasher = hashlib.sha256()
+                if self.archive is not None:
+                    archive_writer = self.archive.writer(url)
+                chunks = _tee_chunks(response.iter_content(chunk_size=self.CHUNK_SIZE), hasher, archive_writer,
+                                     self._count_bytes)
+
+                if state:
+                    # Un résultat précédent existe : on compare le hash avant de parser
+                    with tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_BYTES) as body:
+                        for chunk in chunks:
+                            body.write(chunk)
+                        sha256 = hasher.hexdigest()
+
+                        if sha256 == state['sha256']:
+                            self._count('hash_hits')
+                            logger.info("♻️ Flux identique (SHA-256), réutilisation du résultat précédent")
+                            if archive_writer is not None:
+                                archive_writer.discard()  # Déjà archivé lors du précédent téléchargement
+                            self._reuse_fetch_state(state)
+                            self._remember_fetch_state(url, response, sha256)
+                            return True
+
+                        body.seek(0)
+                        self._store_events(self.iter_ical_events(body))
+                else:
+                    self._store_events(self.iter_ical_events(_iter_chunk_lines(chunks)))
+                    for _ in chunks:  # Reste éventuel après END:VCALENDAR, pour le hash et l'archive
+                        pass
+                    sha256 = hasher.hexdigest()
 
-            return self._parse_ical_content(ical_content)
+                self._count('full_parses')
+                self._remember_fetch_state(url, response, sha256)
+                if archive_writer is not None:
+                    archive_writer.commit(sha256)
+                return True
 
         except Exception as e:
             logger.error(f"❌ Erreur lors de l'extraction: {e}")
+            if archive_writer is not None:
+                archive_writer.discard()
             return False
 
+    def _extract_from_archive(self, url: str) -> bool:
+        """Mode rejeu : ingère le flux archivé correspondant à l'URL, sans réseau"""
+        if self.archive is None:
+            logger.error("❌ Mode rejeu sans archive (ESIEE_FEED_ARCHIVE_DIR non défini)")
+            return False
+
+        entry = self.archive.find(url)
+        if entry is None:
+            logger.error(f"❌ Aucun flux archivé pour: {url}")
+            return False
+
+        try:
+            logger.info(f"🗄️ Rejeu du flux archivé {entry['file']} ({entry['fetched_at']})")
+            return self._store_events(self.iter_ical_events(self.archive.iter_lines(entry)))
+        except Exception as e:
+            logger.error(f"❌ Erreur lors du rejeu: {e}")
+            return False
+
+    def extract_from_ical_urls(self, urls: List[str], max_workers: int = MAX_FETCH_WORKERS) -> bool:
+        """
+        Extrait plusieurs flux iCal en parallèle et les fusionne en un seul résultat
+
+        Chaque flux est téléchargé et parsé dans son propre thread ; les
+        résultats sont fusionnés (et dédoublonnés) au fur et à mesure de leur
+        arrivée. La durée totale est donc celle du flux le plus lent.
+        """
+        if len(urls) == 1:
+            return self.extract_from_ical_url(urls[0])
+
+        def fetch(url: str) -> Tuple[ESIEEiCalExtractor, bool]:
+            extractor = ESIEEiCalExtractor(self.session, self.archive, self.replay)
+            return extractor, extractor.extract_from_ical_url(url)
+
+        merged = []
+        seen_events = set()
+        failed_urls = []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            futures = {executor.submit(fetch, url): url for url in urls}
+
+            for future in as_completed(futures):
+                extractor, success = future.result()
+                self.bytes_received += extractor.bytes_received
+                if not success:
+                    failed_urls.append(futures[future])
+                    continue
+
+                for event in extractor.events_data:
+                    event_key = (event.summary, event.room_full, event.start_datetime, event.end_datetime)
+                    if event_key not in seen_events:
+                        seen_events.add(event_key)
+                        merged.append(event)
+
+        if failed_urls:
+            # Un instantané partiel ferait apparaître des salles libres à tort
+            logger.error(f"❌ {len(failed_urls)}/{len(urls)} flux en échec, extraction abandonnée")
+            return False
+
+        logger.info(f"🔀 {len(urls)} flux fusionnés")
+        return self._store_events(merged)
+
+    def _get_fetch_state(self, url: str) -> Optional[Dict]:
+        """Retourne l'état de validation mémorisé pour une URL"""
+        with self._fetch_lock:
+            state = self._fetch_states.get(url)
+            if state is not None:
+                self._fetch_states.move_to_end(url)
+            return state
+
+    def _remember_fetch_state(self, url: str, response, sha256: str):
+        """Mémorise les validateurs HTTP, le hash du corps et le résultat parsé"""
+        state = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': sha256,
+            'events': self.events_data,
+            'rooms_data': self.rooms_data
+        }
+
+        with self._fetch_lock:
+            self._fetch_states[url] = state
+            self._fetch_states.move_to_end(url)
+            while len(self._fetch_states) > self.MAX_FETCH_STATES:
+                self._fetch_states.popitem(last=False)
+
+    def _reuse_fetch_state(self, state: Dict) -> bool:
+        """Recharge le résultat parsé lors d'un précédent téléchargement"""
+        self.events_data = list(state['events'])
+        self.rooms_data = state['rooms_data']
+        logger.info(f"✅ {len(self.events_data)} événements réutilisés")
+        return True
+
+    @classmethod
+    def _count(cls, counter: str):
+        with cls._fetch_lock:
+            cls._fetch_stats[counter] += 1
+
+    def _count_bytes(self, size: int):
+        self.bytes_received += size
+        with self._fetch_lock:
+            self._fetch_stats['bytes'] += size
+
+    @classmethod
+    def get_fetch_stats(cls) -> Dict:
+        """Compteurs des requêtes amont (304, hash identiques, parsing complets, octets reçus)"""
+        with cls._fetch_lock:
+            stats = dict(cls._fetch_stats)
+            stats['tracked_urls'] = len(cls._fetch_states)
+        return stats
+
+    def iter_events_from_url(self, url: str) -> Iterator[Event]:
+        """
+        Génère les événements au fil du téléchargement
+
+        Le flux n'est jamais matérialisé en entier : le premier événement est
+        disponible avant la fin du téléchargement et la mémoire reste stable
+        quel que soit le nombre de semaines demandées.
+        """
+        with http_get(url, self.session, stream=True) as response:
+            response.raise_for_status()
+            chunks = response.iter_content(chunk_size=self.CHUNK_SIZE)
+            yield from self.iter_ical_events(_iter_chunk_lines(chunks))
+
+    def iter_ical_events(self, lines: Iterable) -> Iterator[Event]:
+        """
+        Parse un flux de lignes iCal (str ou bytes) et génère les événements un par un
+
+        Args:
+            lines: N'importe quel itérable de lignes (response.iter_lines(), fichier ouvert...)
+        """
+        block = None
+
+        for line in _unfold_ical_lines(lines):
+            if line == 'BEGIN:VEVENT':
+                block = []
+            elif line == 'END:VEVENT':
+                if block is not None:
+                    event_data = self._parse_event_block(block)
+                    if event_data:
+                        yield event_data
+                block = None
+            elif block is not None:
+                block.append(line)
+
     def _parse_ical_content(self, content: str) -> bool:
         """Parse le contenu iCal"""
+        return self._store_events(self.iter_ical_events(io.StringIO(content)))
+
+    def _store_events(self, events_iter: Iterable[Event]) -> bool:
+        """Consomme un flux d'événements et construit le résumé par salle"""
         events = []
         rooms_summary = {}
 
-        # Diviser le contenu en événements
-        event_blocks = content.split('BEGIN:VEVENT')[1:]
-
-        for block in event_blocks:
-            event_data = self._parse_event_block(block)
-            if event_data:
-                events.append(event_data)
-
-                # Traiter les données de salle
-                room_full = event_data.get('room_full')
-                if room_full:
-                    if room_full not in rooms_summary:
-                        building, room_number = self._extract_room_info(room_full)
-                        rooms_summary[room_full] = {
-                            'building': building,
-                            'room_number': room_number,
-                            'events_count': 0,
-                            'time_slots_used': []
-                        }
-
-                    rooms_summary[room_full]['events_count'] += 1
-                    rooms_summary[room_full]['time_slots_used'].append({
-                        'start': event_data.get('start_datetime'),
-                        'end': event_data.get('end_datetime'),
-                        'summary': event_data.get('summary', '')
-                    })
+        for event_data in events_iter:
+            events.append(event_data)
+
+            # Traiter les données de salle
+            room_full = event_data.room_full
+            if room_full:
+                if room_full not in rooms_summary:
+                    # (bâtiment, numéro) déjà extraits de LOCATION au parsing
+                    rooms = event_data.rooms
+                    rooms_summary[room_full] = {
+                        'building': rooms[0][0] if rooms else room_full,
+                        'room_number': ','.join(number for _, number in rooms),
+                        'events_count': 0,
+                        'time_slots_used': []  # Références aux Event, sans copie
+                    }
+
+                rooms_summary[room_full]['events_count'] += 1
+                rooms_summary[room_full]['time_slots_used'].append(event_data)
 
         # Stocker les résultats
         self.events_data = events
@@ -81,97 +503,80 @@ class ESIEEiCalExtractor:
         logger.info(f"✅ {len(events)} événements et {len(rooms_summary)} salles extraits")
         return True
 
-    def _parse_event_block(self, block: str) -> Optional[Dict]:
-        """Parse un bloc d'événement iCal"""
+    def _parse_event_block(self, lines: List[str]) -> Optional[Event]:
+        """Parse les lignes (déjà dépliées) d'un bloc d'événement iCal"""
         try:
-            lines = block.split('\n')
-            event = {}
+            uid = None
+            start_datetime = None
+            end_datetime = None
+            summary = None
+            location = None
 
             for line in lines:
-                line = line.strip()
                 if ':' in line:
                     key, value = line.split(':', 1)
+                    key, params = _split_property_params(key)
 
                     if key == 'DTSTART':
-                        event['start_datetime'] = self._parse_ical_datetime(value)
+                        start_datetime = self._parse_ical_datetime(value, params)
                     elif key == 'DTEND':
-                        event['end_datetime'] = self._parse_ical_datetime(value)
+                        end_datetime = self._parse_ical_datetime(value, params)
                     elif key == 'SUMMARY':
-                        event['summary'] = value
+                        summary = value
                     elif key == 'LOCATION':
-                        event['location'] = value
-                        event['room_full'] = value
+                        location = value
+                    elif key == 'UID':
+                        uid = value
 
-            return event if event else None
+            if start_datetime is None and end_datetime is None and summary is None and location is None:
+                return None
+
+            return make_event(uid, start_datetime, end_datetime, summary or '', location or '')
 
         except Exception as e:
             logger.warning(f"⚠️ Erreur lors du parsing d'un événement: {e}")
             return None
 
-    def _parse_ical_datetime(self, datetime_str: str) -> Optional[datetime]:
+    def _parse_ical_datetime(self, datetime_str: str, params: Optional[Dict[str, str]] = None) -> Optional[datetime]:
         """Parse une date/heure iCal en prenant en compte le fuseau horaire français"""
-        try:
-            # Format iCal standard: 20251009T080000Z ou 20251009T080000
-            from datetime import timedelta
-
-            datetime_str = datetime_str.replace('Z', '').replace('T', '')
-            if len(datetime_str) == 14:  # YYYYMMDDHHMMSS
-                # Parse comme UTC d'abord
-                utc_dt = datetime.strptime(datetime_str, '%Y%m%d%H%M%S')
-
-                # Convertir en heure française (UTC+1 en hiver, UTC+2 en été)
-                # Déterminer si on est en heure d'été ou d'hiver
-                if self._is_dst(utc_dt):
-                    # Heure d'été (CEST) = UTC + 2 heures
-                    local_dt = utc_dt + timedelta(hours=2)
-                else:
-                    # Heure d'hiver (CET) = UTC + 1 heure
-                    local_dt = utc_dt + timedelta(hours=1)
-
-                return local_dt
-            return None
-        except Exception:
-            return None
-
-    def _is_dst(self, dt: datetime) -> bool:
-        """Détermine si une date est en période d'heure d'été en France"""
-        # Heure d'été en France: dernier dimanche de mars au dernier dimanche d'octobre
-        year = dt.year
-
-        # Dernier dimanche de mars
-        march_last_sunday = datetime(year, 3, 31)
-        while march_last_sunday.weekday() != 6:  # 6 = dimanche
-            march_last_sunday = march_last_sunday.replace(day=march_last_sunday.day - 1)
-
-        # Dernier dimanche d'octobre
-        october_last_sunday = datetime(year, 10, 31)
-        while october_last_sunday.weekday() != 6:
-            october_last_sunday = october_last_sunday.replace(day=october_last_sunday.day - 1)
-
-        return march_last_sunday <= dt <= october_last_sunday
-
-    def _extract_room_info(self, room_full: str) -> tuple:
-        """Extrait le bâtiment et numéro de salle"""
-        # Format attendu: "BâtimentXXX - NuméroSalle"
-        if ' - ' in room_full:
-            parts = room_full.split(' - ')
-            return parts[0].strip(), parts[1].strip()
-        return room_full, ''
+        return parse_ical_datetime(datetime_str, params)
 
     def save_data(self, filename: str):
         """Sauvegarde les données dans un fichier JSON"""
         with open(filename, 'w', encoding='utf-8') as f:
+            # Les créneaux référencent des Event : on reconstruit leur forme dict
+            rooms_summary = {
+                room_full: {**summary, 'time_slots_used': [
+                    {'start': event.start_datetime, 'end': event.end_datetime, 'summary': event.summary}
+                    for event in summary['time_slots_used']
+                ]}
+                for room_full, summary in self.rooms_data.get('rooms_summary', {}).items()
+            }
+
             json.dump({
-                'events': self.events_data,
-                'rooms': self.rooms_data
+                'events': [event.to_dict() for event in self.events_data],
+                'rooms': {**self.rooms_data, 'rooms_summary': rooms_summary}
             }, f, ensure_ascii=False, indent=2, default=str)
         logger.info(f"💾 Données sauvegardées dans {filename}")
 
 class ESIEEiCalFinalExtractor(ESIEEiCalExtractor):
     """Extracteur iCal final avec gestion complète des dates"""
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, session: Optional[requests.Session] = None,
+                 resources: Optional[List[int]] = None, window_weeks: Optional[int] = None,
+                 archive: Optional[ESIEEFeedArchive] = DEFAULT_ARCHIVE, replay: Optional[bool] = None):
+        """
+        Args:
+            session: Session HTTP (la session partagée par défaut)
+            archive: Archive des flux bruts (ESIEE_FEED_ARCHIVE_DIR par défaut, None pour ne rien archiver)
+            replay: Ingère depuis l'archive au lieu du réseau (ESIEE_FEED_REPLAY par défaut)
+            resources: Identifiants de ressources edt-consult à ingérer
+            window_weeks: Découpe chaque extraction en fenêtres de N semaines
+                          téléchargées en parallèle (0 = une seule requête)
+        """
+        super().__init__(session, archive, replay)
+        self.resources = list(resources or ICAL_RESOURCES)
+        self.window_weeks = ICAL_WINDOW_WEEKS if window_weeks is None else window_weeks
 
     def extract_for_week(self, week_offset: int = 0, nb_weeks: int = 1) -> bool:
         """
@@ -228,17 +633,28 @@ class ESIEEiCalFinalExtractor(ESIEEiCalExtractor):
 
     def _extract_for_date(self, start_date: datetime, nb_weeks: int) -> bool:
         """Extrait les données pour une date et durée spécifiques"""
-        # Utiliser firstDate qui donne le plus de résultats
-        date_str = start_date.strftime('%Y-%m-%d')
+        urls = self._build_urls(start_date, nb_weeks)
 
-        url = (f"{self.base_ical_url}?"
-               f"resources=410&projectId=1&calType=ical&"
-               f"nbWeeks={nb_weeks}&displayConfigId=8&"
-               f"firstDate={date_str}")
+        for url in urls:
+            logger.info(f"🔗 URL: {url}")
 
-        logger.info(f"🔗 URL: {url}")
+        return self.extract_from_ical_urls(urls)
 
-        return self.extract_from_ical_url(url)
+    def _build_urls(self, start_date: datetime, nb_weeks: int) -> List[str]:
+        """Construit une URL par ressource et par fenêtre de semaines"""
+        window = self.window_weeks if self.window_weeks > 0 else nb_weeks
+        urls = []
+
+        for resource in self.resources:
+            for first_week in range(0, nb_weeks, window):
+                # Utiliser firstDate qui donne le plus de résultats
+                date_str = (start_date + timedelta(weeks=first_week)).strftime('%Y-%m-%d')
+                urls.append(f"{self.base_ical_url}?"
+                            f"resources={resource}&projectId=1&calType=ical&"
+                            f"nbWeeks={min(window, nb_weeks - first_week)}&displayConfigId=8&"
+                            f"firstDate={date_str}")
+
+        return urls
 
     def _get_week_name(self, week_offset: int) -> str:
         """Retourne le nom de la semaine selon l'offset"""
@@ -253,74 +669,59 @@ class ESIEEiCalFinalExtractor(ESIEEiCalExtractor):
         else:
             return f"il y a {abs(week_offset)} semaines"
 
-    def get_room_availability_for_week(self, week_offset: int = 1) -> Dict:
+    def get_room_occupancy_for_week(self, week_offset: int = 1, days: int = 5,
+                                    day_start_hour: int = 8, day_end_hour: int = 18,
+                                    slot_minutes: int = 30) -> Optional[OccupancyGrid]:
+        """
+        Matrice d'occupation salles × jours × créneaux d'une semaine
+
+        Args:
+            week_offset: Offset en semaines (0=cette semaine, 1=semaine prochaine)
+            days: Nombre de jours à partir du lundi (5 = lundi-vendredi)
+            day_start_hour, day_end_hour: Plage horaire couverte
+            slot_minutes: Granularité des créneaux
+        """
+        nb_weeks = max(1, -(-days // 7))
+        if not self.extract_for_week(week_offset, nb_weeks=nb_weeks):
+            return None
+
+        today = datetime.now()
+        target_monday = (today - timedelta(days=today.weekday()) + timedelta(weeks=week_offset)).date()
+
+        rooms_summary = self.rooms_data.get('rooms_summary', {})
+        return OccupancyGrid.from_room_events(
+            {room_name: room_data.get('time_slots_used', []) for room_name, room_data in rooms_summary.items()},
+            target_monday,
+            days=days,
+            day_start_minutes=day_start_hour * 60,
+            day_end_minutes=day_end_hour * 60,
+            slot_minutes=slot_minutes
+        )
+
+    def get_room_availability_for_week(self, week_offset: int = 1, **grid_options) -> Dict:
         """
         Retourne la disponibilité des salles pour une semaine spécifique
-        avec calcul des créneaux libres
+        avec calcul des créneaux libres (forme texte, pour l'affichage)
         """
-        if not self.extract_for_week(week_offset):
+        grid = self.get_room_occupancy_for_week(week_offset, **grid_options)
+        if grid is None:
             return {}
 
         rooms_summary = self.rooms_data.get('rooms_summary', {})
+        rates = grid.occupancy_rates()
         availability = {}
 
-        # Définir les créneaux horaires standards (8h-18h par tranches de 30min)
-        time_slots = []
-        for hour in range(8, 18):
-            time_slots.append(f"{hour:02d}h00")
-            time_slots.append(f"{hour:02d}h30")
-
-        # Jours de la semaine
-        weekdays = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi']
-
-        for room_name, room_data in rooms_summary.items():
-            # Initialiser tous les créneaux comme libres
-            room_schedule = {}
-            for day in weekdays:
-                room_schedule[day] = {slot: 'libre' for slot in time_slots}
-
-            # Marquer les créneaux occupés
-            for event in room_data.get('time_slots_used', []):
-                event_date = event.get('start')
-                if isinstance(event_date, datetime):
-                    day_name = event_date.strftime('%A')
-                    # Traduire en français
-                    day_mapping = {
-                        'Monday': 'Lundi', 'Tuesday': 'Mardi', 'Wednesday': 'Mercredi',
-                        'Thursday': 'Jeudi', 'Friday': 'Vendredi'
-                    }
-                    day_fr = day_mapping.get(day_name)
-
-                    if day_fr and day_fr in room_schedule:
-                        hour = event_date.hour
-                        minute = event_date.minute
-                        time_slot = f"{hour:02d}h{minute:02d}"
-
-                        if time_slot in room_schedule[day_fr]:
-                            room_schedule[day_fr][time_slot] = 'occupé'
-
+        for index, room_name in enumerate(grid.rooms):
+            room_data = rooms_summary[room_name]
             availability[room_name] = {
                 'building': room_data.get('building'),
                 'room_number': room_data.get('room_number'),
-                'schedule': room_schedule,
-                'occupation_rate': self._calculate_occupation_rate(room_schedule)
+                'schedule': grid.to_schedule(room_name),
+                'occupation_rate': float(rates[index])
             }
 
         return availability
 
-    def _calculate_occupation_rate(self, schedule: Dict) -> float:
-        """Calcule le taux d'occupation d'une salle"""
-        total_slots = 0
-        occupied_slots = 0
-
-        for day_schedule in schedule.values():
-            for status in day_schedule.values():
-                total_slots += 1
-                if status == 'occupé':
-                    occupied_slots += 1
-
-        return (occupied_slots / total_slots * 100) if total_slots > 0 else 0
-
 def demo_usage():
     """Démonstration d'utilisation de l'extracteur final"""
     print("🚀 Démonstration de l'extracteur iCal final")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Élection du worker chargé de rafraîchir le cache partagé
+
+Avec plusieurs workers (gunicorn), un seul interroge l'amont et écrit
+l'instantané : celui qui obtient le verrou exclusif (fcntl.flock) sur le
+fichier de verrou. Il le garde tant que son processus vit ; à sa mort, le
+système libère le verrou et le prochain worker qui tente sa chance prend
+le relais. Les autres workers relisent l'instantané publié.
+"""
+
+import os
+from typing import Dict, Optional
+import logging
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus, chaque worker se croit élu
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ESIEELeaderLock:
+    """Verrou exclusif non bloquant, conservé jusqu'à release() ou la fin du processus"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._fd is not None or fcntl is None
+
+    def try_acquire(self) -> bool:
+        """Tente de devenir le worker élu (sans attendre)"""
+        if self.is_leader:
+            return True
+
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # PID du worker élu, pour le diagnostic
+        os.ftruncate(fd, 0)
+        os.write(fd, f"{os.getpid()}\n".encode())
+        self._fd = fd
+        logger.info(f"👑 Worker {os.getpid()} élu pour rafraîchir le cache partagé")
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def leader_pid(self) -> Optional[int]:
+        """PID du worker élu (d'après le fichier de verrou), None si inconnu"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+    def get_info(self) -> Dict:
+        return {
+            'lock_file': self.path,
+            'is_leader': self.is_leader,
+            'leader_pid': os.getpid() if self._fd is not None else self.leader_pid(),
+            'pid': os.getpid()
+        }
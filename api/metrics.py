@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Export des métriques du cache et des requêtes au format texte Prometheus (/api/metrics)
+
+Reprend les informations de ESIEECacheManager.get_cache_info() (lectures,
+rafraîchissements, étapes, amont, fraîcheur) et du cache des réponses
+pré-rendues. Exemples d'alertes :
+
+    esiee_cache_refresh_consecutive_failures > 2
+    esiee_cache_staleness_seconds > 1800
+    esiee_cache_last_refresh_duration_seconds > 30
+    histogram_quantile(0.95, rate(esiee_http_request_duration_seconds_bucket[5m])) > 0.5
+"""
+
+from numbers import Integral
+from typing import Dict, List, Optional
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    """Entiers tels quels, flottants en précision complète (':g' arrondit à 6 chiffres et fige les compteurs)"""
+    if isinstance(value, Integral):
+        return str(int(value))
+    return repr(float(value))
+
+
+class PrometheusWriter:
+    """Accumule les séries au format d'exposition texte (une déclaration HELP/TYPE par métrique)"""
+
+    def __init__(self, prefix: str = 'esiee_'):
+        self.prefix = prefix
+        self._lines: List[str] = []
+        self._declared = set()
+
+    def add(self, name: str, value, help_text: str, metric_type: str = 'gauge',
+            labels: Optional[Dict[str, str]] = None):
+        if value is None:
+            return
+
+        name = self.prefix + name
+        if name not in self._declared:
+            self._declared.add(name)
+            self._lines.append(f"# HELP {name} {help_text}")
+            self._lines.append(f"# TYPE {name} {metric_type}")
+
+        label_str = ''
+        if labels:
+            label_str = '{' + ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items()) + '}'
+        self._lines.append(f"{name}{label_str} {_format_value(value)}")
+
+    def add_histogram(self, name: str, bounds, bucket_counts: List[int], total: float, help_text: str,
+                      labels: Optional[Dict[str, str]] = None):
+        """Histogramme : bucket_counts par seuil (non cumulés), le dernier pour +Inf"""
+        full_name = self.prefix + name
+        if full_name not in self._declared:
+            self._declared.add(full_name)
+            self._lines.append(f"# HELP {full_name} {help_text}")
+            self._lines.append(f"# TYPE {full_name} histogram")
+
+        labels = labels or {}
+        label_str = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        prefix = label_str + ',' if label_str else ''
+        cumulative = 0
+        for bound, count in zip([f"{bound:g}" for bound in bounds] + ['+Inf'], bucket_counts):
+            cumulative += count
+            self._lines.append(f'{full_name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        suffix = '{' + label_str + '}' if label_str else ''
+        self._lines.append(f"{full_name}_sum{suffix} {_format_value(total)}")
+        self._lines.append(f"{full_name}_count{suffix} {cumulative}")
+
+    def render(self) -> str:
+        return '\n'.join(self._lines) + '\n'
+
+
+def render_cache_metrics(cache_info: Dict, response_info: Optional[Dict] = None, request_metrics=None) -> str:
+    """
+    Texte Prometheus des métriques du cache (cache_info : ESIEECacheManager.get_cache_info())
+
+    request_metrics (ESIEERequestMetrics, optionnel) ajoute la latence, les
+    codes HTTP et les octets envoyés par route.
+    """
+    out = PrometheusWriter()
+    metrics = cache_info.get('metrics') or {}
+
+    # Lectures
+    for outcome in ('fresh', 'stale', 'empty', 'too_old'):
+        out.add('cache_reads_total', metrics.get(f'reads_{outcome}', 0),
+                "Lectures du cache par état (fresh/stale servies sans attendre l'amont)", 'counter',
+                {'outcome': outcome})
+    out.add('cache_hit_ratio', metrics.get('hit_rate'), "Part des lectures servies sans attendre l'amont")
+
+    # Fraîcheur et version
+    out.add('cache_data_available', 1 if cache_info.get('data_available') else 0, "Données en cache disponibles")
+    out.add('cache_version', cache_info.get('version'), "Version de l'instantané publié")
+    out.add('cache_age_seconds', metrics.get('age_seconds'), "Âge de l'instantané publié")
+    out.add('cache_staleness_seconds', metrics.get('staleness_seconds'), "Dépassement de la durée de validité")
+    out.add('cache_refresh_in_progress', 1 if cache_info.get('refresh_in_progress') else 0,
+            "Rafraîchissement en cours")
+
+    # Rafraîchissements cumulés
+    out.add('cache_refreshes_total', metrics.get('refreshes', 0), "Rafraîchissements tentés", 'counter')
+    out.add('cache_refresh_failures_total', metrics.get('refresh_failures', 0), "Rafraîchissements en échec",
+            'counter')
+    out.add('cache_refresh_consecutive_failures', metrics.get('consecutive_failures', 0),
+            "Échecs consécutifs depuis le dernier succès")
+    out.add('cache_save_failures_total', metrics.get('save_failures', 0), "Échecs d'écriture de l'instantané",
+            'counter')
+    out.add('cache_snapshot_reloads_total', metrics.get('snapshot_reloads', 0),
+            "Instantanés du worker élu relus (cache partagé)", 'counter')
+    out.add('cache_refresh_seconds_total', metrics.get('refresh_ms_total', 0) / 1000,
+            "Durée cumulée des rafraîchissements", 'counter')
+    for stage, elapsed_ms in (metrics.get('stage_ms_total') or {}).items():
+        out.add('cache_refresh_stage_seconds_total', elapsed_ms / 1000, "Durée cumulée par étape du rafraîchissement",
+                'counter', {'stage': stage})
+    out.add('cache_events_fetched_total', metrics.get('events_fetched', 0), "Événements reçus de l'amont", 'counter')
+    out.add('cache_duplicates_removed_total', metrics.get('duplicates_removed', 0), "Doublons supprimés", 'counter')
+    out.add('cache_upstream_bytes_total', metrics.get('upstream_bytes', 0), "Octets téléchargés depuis l'amont",
+            'counter')
+
+    # Dernier rafraîchissement
+    last_refresh = cache_info.get('last_refresh')
+    if last_refresh:
+        out.add('cache_last_refresh_success', 1 if last_refresh.get('success') else 0,
+                "Succès du dernier rafraîchissement")
+        out.add('cache_last_refresh_duration_seconds', last_refresh.get('total_ms', 0) / 1000,
+                "Durée du dernier rafraîchissement")
+        for stage, elapsed_ms in (last_refresh.get('stages_ms') or {}).items():
+            out.add('cache_last_refresh_stage_seconds', elapsed_ms / 1000,
+                    "Durée par étape du dernier rafraîchissement", labels={'stage': stage})
+        out.add('cache_last_refresh_events', last_refresh.get('events'), "Événements de la semaine courante")
+        out.add('cache_last_refresh_upstream_bytes', last_refresh.get('upstream_bytes'),
+                "Octets téléchargés lors du dernier rafraîchissement")
+
+    # Client amont
+    http = cache_info.get('http_client') or {}
+    out.add('upstream_requests_total', http.get('requests'), "Requêtes HTTP amont", 'counter')
+    out.add('upstream_retries_total', http.get('retries'), "Nouvelles tentatives HTTP amont", 'counter')
+    out.add('upstream_failures_total', http.get('failures'), "Requêtes HTTP amont en échec", 'counter')
+    out.add('upstream_latency_max_seconds', (http.get('latency_max_ms') or 0) / 1000,
+            "Latence HTTP amont maximale")
+    fetch = cache_info.get('upstream_fetch') or {}
+    out.add('upstream_not_modified_total', fetch.get('not_modified'), "Flux inchangés (304)", 'counter')
+    out.add('upstream_hash_hits_total', fetch.get('hash_hits'), "Flux identiques (SHA-256)", 'counter')
+    out.add('upstream_full_parses_total', fetch.get('full_parses'), "Flux parsés en entier", 'counter')
+
+    # Semaines hors horizon
+    week_cache = cache_info.get('week_cache') or {}
+    for counter in ('hits', 'misses', 'coalesced', 'loads', 'load_failures', 'evictions', 'expirations'):
+        out.add(f'week_cache_{counter}_total', week_cache.get(counter), f"Cache LRU des semaines : {counter}",
+                'counter')
+    out.add('week_cache_weeks', len(week_cache.get('weeks', [])), "Semaines en cache LRU")
+
+    # Stockage en colonnes
+    event_store = cache_info.get('event_store') or {}
+    out.add('event_store_rows', event_store.get('rows'), "Lignes du stockage en colonnes")
+    out.add('event_store_bytes', event_store.get('bytes'), "Mémoire des colonnes NumPy")
+
+    # Réponses pré-rendues
+    if response_info:
+        for counter in ('hits', 'renders', 'not_modified'):
+            out.add(f'response_cache_{counter}_total', response_info.get(counter),
+                    f"Réponses pré-rendues : {counter}", 'counter')
+        for encoding, values in (response_info.get('encodings') or {}).items():
+            labels = {'encoding': encoding}
+            out.add('response_cache_responses_total', values.get('responses'), "Réponses servies par encodage",
+                    'counter', labels)
+            out.add('response_cache_bytes_sent_total', values.get('bytes_sent'), "Octets envoyés par encodage",
+                    'counter', labels)
+            out.add('response_cache_bytes_saved_total', values.get('bytes_saved'),
+                    "Octets économisés par la compression", 'counter', labels)
+
+    # Requêtes HTTP par route
+    if request_metrics is not None:
+        request_metrics.write_prometheus(out)
+
+    return out.render()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Occupation des salles par créneaux
+
+Une matrice booléenne salles × jours × créneaux marque chaque créneau couvert
+(même partiellement) par un cours : un cours de 2h occupe 4 créneaux de 30
+min, pas seulement celui de son début. Le marquage est vectorisé (tableau de
+différences + somme cumulée) et les taux d'occupation sont des réductions
+NumPy. La forme texte {jour: {créneau: 'libre'/'occupé'}} n'est produite qu'à
+la demande, pour l'affichage.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from event_model import Event
+
+WEEKDAYS_FR = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
+
+
+class OccupancyGrid:
+    """Matrice d'occupation salles × jours × créneaux"""
+
+    def __init__(self, rooms: List[str], first_day: date, days: int = 5,
+                 day_start_minutes: int = 8 * 60, day_end_minutes: int = 18 * 60, slot_minutes: int = 30):
+        if slot_minutes <= 0 or day_end_minutes <= day_start_minutes:
+            raise ValueError("Créneaux invalides")
+
+        self.rooms = list(rooms)
+        self.first_day = first_day.date() if isinstance(first_day, datetime) else first_day
+        self.days = days
+        self.day_start_minutes = day_start_minutes
+        self.day_end_minutes = day_end_minutes
+        self.slot_minutes = slot_minutes
+        self.slots_per_day = -(-(day_end_minutes - day_start_minutes) // slot_minutes)
+
+        self._room_index = {room: index for index, room in enumerate(self.rooms)}
+        self.grid = np.zeros((len(self.rooms), days, self.slots_per_day), dtype=bool)
+
+    @classmethod
+    def from_room_events(cls, room_events: Dict[str, Iterable[Event]], first_day: date,
+                         **kwargs) -> 'OccupancyGrid':
+        """Construit la matrice depuis les événements de chaque salle"""
+        grid = cls(list(room_events), first_day, **kwargs)
+        grid.mark_events((room, event) for room, events in room_events.items() for event in events)
+        return grid
+
+    def mark_events(self, room_events: Iterable[Tuple[str, Event]]):
+        """Marque tous les créneaux couverts par des couples (salle, événement)"""
+        rows, days, first_slots, last_slots = [], [], [], []
+
+        for room, event in room_events:
+            room_index = self._room_index.get(room)
+            start, end = event.start_datetime, event.end_datetime
+            if room_index is None or not isinstance(start, datetime) or not isinstance(end, datetime):
+                continue
+
+            day = (start.date() - self.first_day).days
+            if not 0 <= day < self.days:
+                continue
+
+            start_minutes = start.hour * 60 + start.minute
+            # Un cours qui déborde sur le lendemain est coupé à la fin de journée
+            end_minutes = end.hour * 60 + end.minute if end.date() == start.date() else self.day_end_minutes
+
+            rows.append(room_index)
+            days.append(day)
+            first_slots.append(start_minutes)
+            last_slots.append(end_minutes)
+
+        if not rows:
+            return
+
+        offset = self.day_start_minutes
+        first = np.clip((np.array(first_slots) - offset) // self.slot_minutes, 0, self.slots_per_day)
+        # Créneau partiellement couvert = occupé : arrondi supérieur de la fin
+        last = np.clip(-(-(np.array(last_slots) - offset) // self.slot_minutes), 0, self.slots_per_day)
+        valid = last > first
+        rows, days = np.array(rows)[valid], np.array(days)[valid]
+        first, last = first[valid], last[valid]
+
+        # +1 au premier créneau, -1 après le dernier, puis somme cumulée par jour
+        delta = np.zeros((len(self.rooms), self.days, self.slots_per_day + 1), dtype=np.int32)
+        np.add.at(delta, (rows, days, first), 1)
+        np.add.at(delta, (rows, days, last), -1)
+        self.grid |= np.cumsum(delta, axis=2)[:, :, :-1] > 0
+
+    def slot_labels(self) -> List[str]:
+        """Libellés des créneaux (ex: "08h30")"""
+        labels = []
+        for slot in range(self.slots_per_day):
+            minutes = self.day_start_minutes + slot * self.slot_minutes
+            labels.append(f"{minutes // 60:02d}h{minutes % 60:02d}")
+        return labels
+
+    def day_labels(self) -> List[str]:
+        """Noms des jours en français (datés si la plage dépasse une semaine)"""
+        labels = []
+        for offset in range(self.days):
+            day = self.first_day + timedelta(days=offset)
+            name = WEEKDAYS_FR[day.weekday()]
+            labels.append(f"{name} {day.strftime('%d/%m')}" if self.days > 7 else name)
+        return labels
+
+    def occupancy_rates(self) -> np.ndarray:
+        """Taux d'occupation (en %) de chaque salle, dans l'ordre de self.rooms"""
+        if self.grid.size == 0:
+            return np.zeros(len(self.rooms))
+        return self.grid.mean(axis=(1, 2)) * 100
+
+    def room_occupancy_rate(self, room: str) -> float:
+        room_index = self._room_index.get(room)
+        if room_index is None or self.grid[room_index].size == 0:
+            return 0.0
+        return float(self.grid[room_index].mean() * 100)
+
+    def free_rooms(self, day: int, slot: int) -> List[str]:
+        """Salles libres sur un créneau donné"""
+        free = ~self.grid[:, day, slot]
+        return [self.rooms[index] for index in np.flatnonzero(free)]
+
+    def to_schedule(self, room: str) -> Dict[str, Dict[str, str]]:
+        """Forme texte pour l'affichage : {jour: {créneau: 'libre' / 'occupé'}}"""
+        room_grid = self.grid[self._room_index[room]]
+        slot_labels = self.slot_labels()
+
+        return {
+            day_label: {label: 'occupé' if occupied else 'libre'
+                        for label, occupied in zip(slot_labels, room_grid[day].tolist())}
+            for day, day_label in enumerate(self.day_labels())
+        }
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Instrumentation des requêtes Flask : latence, statuts, tailles, requêtes en cours
+
+Chaque thread accumule ses mesures dans son propre compartiment (aucun
+verrou sur le chemin des requêtes) ; l'export fusionne les compartiments et
+replie ceux des threads terminés (le serveur de développement crée un
+thread par requête). Par route (règle Flask, ex: /api/rooms/<room_number>) :
+histogramme de latence à seuils fixes, compteurs par code HTTP, octets
+envoyés. Les N requêtes les plus lentes sont gardées avec leurs arguments de
+route, et journalisées au-delà de ESIEE_SLOW_REQUEST_LOG_MS.
+"""
+
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seuils de l'histogramme de latence (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SLOW_REQUESTS = int(os.environ.get('ESIEE_SLOW_REQUESTS', '10'))
+SLOW_REQUEST_LOG_MS = float(os.environ.get('ESIEE_SLOW_REQUEST_LOG_MS', '500'))
+
+_START_KEY = 'esiee.request_started'
+
+
+class _RouteStats:
+    """Mesures d'une route (route, méthode) dans un compartiment"""
+    __slots__ = ('count', 'seconds', 'buckets', 'bytes', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Dernier seuil : +Inf
+        self.bytes = 0
+        self.statuses: Dict[int, int] = {}
+
+    def merge(self, other: '_RouteStats'):
+        self.count += other.count
+        self.seconds += other.seconds
+        self.bytes += other.bytes
+        for index, value in enumerate(other.buckets):
+            self.buckets[index] += value
+        for status, value in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + value
+
+
+class _Shard:
+    """Compartiment d'un thread : seul ce thread y écrit"""
+    __slots__ = ('routes', 'started', 'finished', 'thread')
+
+    def __init__(self, thread: threading.Thread):
+        self.routes: Dict[Tuple[str, str], _RouteStats] = {}
+        self.started = 0
+        self.finished = 0
+        self.thread = thread
+
+
+class ESIEERequestMetrics:
+    """Mesures des requêtes, accumulées par thread et fusionnées à l'export"""
+
+    def __init__(self, slow_requests: int = SLOW_REQUESTS, slow_log_ms: float = SLOW_REQUEST_LOG_MS):
+        self.slow_requests = max(0, slow_requests)
+        self.slow_log_ms = slow_log_ms
+
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._lock = threading.Lock()  # Création et repli des compartiments, requêtes lentes
+        # Compartiments des threads terminés, repliés à l'export
+        self._retired = _Shard(None)
+
+        # Tas des requêtes les plus lentes : (secondes, n°, détail)
+        self._slowest: List[Tuple[float, int, Dict]] = []
+        self._slow_floor = 0.0
+        self._sequence = 0
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def start(self):
+        self._shard().started += 1
+        return time.perf_counter()
+
+    def finish(self, started: float, route: str, method: str, status: int, size: int,
+               args: Optional[Dict] = None) -> float:
+        """Enregistre une requête terminée ; retourne sa durée en secondes"""
+        seconds = time.perf_counter() - started
+        shard = self._shard()
+
+        stats = shard.routes.get((route, method))
+        if stats is None:
+            stats = shard.routes[(route, method)] = _RouteStats()
+        stats.count += 1
+        stats.seconds += seconds
+        stats.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1  # Premier seuil >= durée
+        stats.bytes += size
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+        # Lecture sans verrou du seuil : la plupart des requêtes ne sont pas parmi les plus lentes
+        if self.slow_requests and seconds > self._slow_floor:
+            self._record_slow(seconds, route, method, status, args)
+        return seconds
+
+    def end(self):
+        """Fin de requête (y compris en cas d'exception) pour le nombre de requêtes en cours"""
+        self._shard().finished += 1
+
+    def _record_slow(self, seconds: float, route: str, method: str, status: int, args: Optional[Dict]):
+        detail = {
+            'route': route,
+            'method': method,
+            'status': status,
+            'args': {key: str(value) for key, value in (args or {}).items()},
+            'ms': round(seconds * 1000, 2),
+            'at': datetime.now().isoformat()
+        }
+        with self._lock:
+            self._sequence += 1
+            entry = (seconds, self._sequence, detail)
+            if len(self._slowest) < self.slow_requests:
+                heapq.heappush(self._slowest, entry)
+            elif seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+            else:
+                return
+            if len(self._slowest) >= self.slow_requests:
+                self._slow_floor = self._slowest[0][0]
+
+        if detail['ms'] >= self.slow_log_ms:
+            logger.warning(f"🐢 Requête lente {method} {route} {detail['args']} → {status} en {detail['ms']} ms")
+
+    def _merged(self) -> Tuple[Dict[Tuple[str, str], _RouteStats], int]:
+        merged: Dict[Tuple[str, str], _RouteStats] = {}
+        in_flight = 0
+
+        with self._lock:
+            # Repli des compartiments des threads terminés (plus aucune écriture possible)
+            alive = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    alive.append(shard)
+                else:
+                    self._fold(self._retired, shard)
+            self._shards = alive
+
+            # Compartiments vivants lus sans arrêter leurs threads : une requête peut manquer à l'appel
+            for shard in [self._retired] + alive:
+                in_flight += shard.started - shard.finished
+                for key, stats in list(shard.routes.items()):
+                    target = merged.get(key)
+                    if target is None:
+                        target = merged[key] = _RouteStats()
+                    target.merge(stats)
+        return merged, max(0, in_flight)
+
+    @staticmethod
+    def _fold(target: _Shard, shard: _Shard):
+        target.started += shard.started
+        target.finished += shard.finished
+        for key, stats in shard.routes.items():
+            existing = target.routes.get(key)
+            if existing is None:
+                existing = target.routes[key] = _RouteStats()
+            existing.merge(stats)
+
+    def get_info(self, include_args: bool = True) -> Dict:
+        """
+        Mesures fusionnées (JSON)
+
+        Args:
+            include_args: Inclure les arguments de route des requêtes les plus
+                          lentes (identifiants de réservation, etc.)
+        """
+        merged, in_flight = self._merged()
+        routes = {}
+        for (route, method), stats in sorted(merged.items()):
+            routes[f"{method} {route}"] = {
+                'count': stats.count,
+                'avg_ms': round(stats.seconds / stats.count * 1000, 2) if stats.count else None,
+                'total_ms': round(stats.seconds * 1000, 1),
+                'bytes': stats.bytes,
+                'statuses': {str(status): value for status, value in sorted(stats.statuses.items())},
+                'buckets': dict(zip([f"{bound:g}" for bound in LATENCY_BUCKETS] + ['+Inf'], stats.buckets))
+            }
+
+        with self._lock:
+            slowest = [detail if include_args else {key: value for key, value in detail.items() if key != 'args'}
+                       for _, _, detail in sorted(self._slowest, reverse=True)]
+            threads = len(self._shards)
+
+        return {'in_flight': in_flight, 'threads': threads, 'routes': routes, 'slowest': slowest}
+
+    def write_prometheus(self, out):
+        """Ajoute les séries des requêtes à un metrics.PrometheusWriter"""
+        merged, in_flight = self._merged()
+        out.add('http_requests_in_flight', in_flight, "Requêtes en cours de traitement")
+
+        for (route, method), stats in sorted(merged.items()):
+            labels = {'route': route, 'method': method}
+            out.add_histogram('http_request_duration_seconds', LATENCY_BUCKETS, stats.buckets, stats.seconds,
+                              "Latence des requêtes par route", labels)
+            out.add('http_response_bytes_total', stats.bytes, "Octets envoyés par route", 'counter', labels)
+            for status, value in sorted(stats.statuses.items()):
+                out.add('http_responses_total', value, "Réponses par route et code HTTP", 'counter',
+                        dict(labels, status=str(status)))
+
+    def install(self, app):
+        """Branche l'instrumentation sur une application Flask"""
+        from flask import request
+
+        # request est un proxy : l'objet réel est résolu une fois par hook
+        @app.before_request
+        def start_request_timer():
+            request._get_current_object().environ[_START_KEY] = self.start()
+
+        @app.after_request
+        def record_request(response):
+            req = request._get_current_object()
+            started = req.environ.get(_START_KEY)
+            if started is not None:
+                rule = req.url_rule
+                self.finish(started, rule.rule if rule is not None else '<unmatched>', req.method,
+                            response.status_code, response.content_length or 0, req.view_args)
+            return response
+
+        @app.teardown_request
+        def end_request(exc):
+            if request._get_current_object().environ.pop(_START_KEY, None) is not None:
+                self.end()
+
+
+# Instance globale
+request_metrics = ESIEERequestMetrics()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Profilage des requêtes en production
+
+- À la demande : un administrateur ajoute l'en-tête X-ESIEE-Profile (ou le
+  paramètre ?_profile=) à une requête. Avec `cprofile` (défaut), elle est
+  exécutée sous cProfile et les statistiques sont écrites en .prof (pstats,
+  snakeviz) ; avec `sample`, sa pile est échantillonnée et écrite en piles
+  repliées .folded (flamegraph.pl, speedscope). Le nom du fichier est
+  renvoyé dans l'en-tête X-Profile.
+- En continu : avec ESIEE_PROFILE_SAMPLE_EVERY=N, une requête sur N est
+  échantillonnée et ses piles sont cumulées dans flamegraph-<pid>.folded,
+  réécrit au plus toutes les ESIEE_PROFILE_FLUSH_SECONDS.
+
+Les fichiers forment un anneau borné (ESIEE_PROFILE_KEEP, les plus anciens
+sont supprimés) dans ESIEE_PROFILE_DIR.
+"""
+
+import cProfile
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get('ESIEE_PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.environ.get('ESIEE_PROFILE_KEEP', '20'))
+SAMPLE_EVERY = int(os.environ.get('ESIEE_PROFILE_SAMPLE_EVERY', '0'))
+SAMPLE_INTERVAL_MS = float(os.environ.get('ESIEE_PROFILE_INTERVAL_MS', '5'))
+FLUSH_SECONDS = float(os.environ.get('ESIEE_PROFILE_FLUSH_SECONDS', '60'))
+
+PROFILE_HEADER = 'X-ESIEE-Profile'
+PROFILE_PARAM = '_profile'
+MODES = ('cprofile', 'sample')
+PROFILE_EXTENSIONS = ('.prof', '.folded')
+
+_STATE_KEY = 'esiee.profile'
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Pile d'une frame au format replié : racine;...;feuille"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def write_folded(path: str, stacks: Counter):
+    """Écrit des piles repliées (une ligne « pile nombre ») de façon atomique"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    os.replace(temp_path, path)
+
+
+class StackSampler:
+    """Thread unique qui relève à intervalle fixe la pile des threads inscrits"""
+
+    def __init__(self, interval_ms: float = SAMPLE_INTERVAL_MS):
+        self.interval = max(interval_ms, 0.1) / 1000
+        self.samples = 0
+        self._targets: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, thread_id: int):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='esiee-stack-sampler', daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        """Piles relevées pour ce thread depuis start()"""
+        with self._lock:
+            return self._targets.pop(thread_id, None) or Counter()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._targets:
+                    frames = sys._current_frames()
+                    for thread_id, stacks in self._targets.items():
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            stacks[collapse_stack(frame)] += 1
+                    self.samples += 1
+                    idle = False
+                else:
+                    # Aucun thread à suivre : attente du prochain start()
+                    self._wake.clear()
+                    idle = True
+
+            if idle:
+                self._wake.wait()
+            else:
+                time.sleep(self.interval)
+
+
+class ESIEERequestProfiler:
+    """Profilage à la demande (administrateurs) et échantillonnage continu d'une requête sur N"""
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, keep: int = PROFILE_KEEP, sample_every: int = SAMPLE_EVERY,
+                 interval_ms: float = SAMPLE_INTERVAL_MS, flush_seconds: float = FLUSH_SECONDS):
+        self.profile_dir = profile_dir
+        self.keep = max(1, keep)
+        self.sample_every = max(0, sample_every)
+        self.flush_seconds = flush_seconds
+        self.sampler = StackSampler(interval_ms)
+
+        self._requests = itertools.count(1)
+        self._flamegraph = Counter()
+        self._flamegraph_lock = threading.Lock()
+        self._flamegraph_dirty = False
+        self._last_flush = time.monotonic()
+        self._stats = {'profiled': 0, 'sampled': 0, 'write_failures': 0}
+
+    @property
+    def flamegraph_file(self) -> str:
+        # Un fichier par worker : plusieurs processus ne s'écrasent pas
+        return os.path.join(self.profile_dir, f"flamegraph-{os.getpid()}.folded")
+
+    def begin(self, mode: Optional[str] = None) -> Optional[Dict]:
+        """
+        Démarre le profilage de la requête courante si besoin
+
+        Args:
+            mode: 'cprofile' ou 'sample' pour une requête d'administrateur, None sinon
+                  (la requête peut alors être retenue par l'échantillonnage continu)
+
+        Returns:
+            État à passer à finish(), None si la requête n'est pas profilée
+        """
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:  # Un seul profileur actif à la fois (Python 3.12+)
+                logger.warning(f"⚠️ Profilage impossible: {e}")
+                return None
+            return {'mode': mode, 'profile': profile, 'started': time.perf_counter()}
+
+        if mode is None and not (self.sample_every and next(self._requests) % self.sample_every == 0):
+            return None
+
+        thread_id = threading.get_ident()
+        self.sampler.start(thread_id)
+        return {'mode': mode or 'continuous', 'thread_id': thread_id, 'started': time.perf_counter()}
+
+    def finish(self, state: Dict, label: str) -> Optional[str]:
+        """Arrête le profilage ; retourne le nom du fichier écrit pour une requête à la demande"""
+        elapsed_ms = (time.perf_counter() - state['started']) * 1000
+
+        if state['mode'] == 'cprofile':
+            profile = state['profile']
+            profile.disable()
+            self._stats['profiled'] += 1
+            return self._write(label, elapsed_ms, '.prof', profile.dump_stats)
+
+        stacks = self.sampler.stop(state['thread_id'])
+        if state['mode'] == 'sample':
+            self._stats['profiled'] += 1
+            return self._write(label, elapsed_ms, '.folded', lambda path: write_folded(path, stacks))
+
+        self._aggregate(stacks)
+        return None
+
+    def _aggregate(self, stacks: Counter):
+        with self._flamegraph_lock:
+            self._stats['sampled'] += 1
+            self._flamegraph.update(stacks)
+            self._flamegraph_dirty = True
+            due = time.monotonic() - self._last_flush >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Réécrit le fichier flamegraph cumulé s'il a changé"""
+        with self._flamegraph_lock:
+            if not self._flamegraph_dirty:
+                return
+            stacks = Counter(self._flamegraph)
+            self._flamegraph_dirty = False
+            self._last_flush = time.monotonic()
+
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            write_folded(self.flamegraph_file, stacks)
+            self._trim()
+        except OSError as e:
+            self._stats['write_failures'] += 1
+            logger.error(f"❌ Erreur lors de l'écriture du flamegraph: {e}")
+
+    def _write(self, label: str, elapsed_ms: float, extension: str, writer: Callable[[str], None]) -> Optional[str]:
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_')[:60]
+        name = f"request-{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}-{elapsed_ms:.0f}ms{extension}"
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            writer(os.path.join(self.profile_dir, name))
+            self._trim()
+        except OSError as e:
+            self._stats['write_failures'] += 1
+            logger.error(f"❌ Erreur lors de l'écriture du profil: {e}")
+            return None
+
+        logger.info(f"🔬 Profil de {label} ({elapsed_ms:.0f} ms) écrit dans {name}")
+        return name
+
+    def _trim(self):
+        """Anneau borné : supprime les profils les plus anciens au-delà de keep"""
+        for entry in self.list_profiles()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.profile_dir, entry['name']))
+            except OSError:
+                pass
+
+    def list_profiles(self) -> List[Dict]:
+        """Fichiers de profil, du plus récent au plus ancien"""
+        try:
+            names = [name for name in os.listdir(self.profile_dir) if name.endswith(PROFILE_EXTENSIONS)]
+        except OSError:
+            return []
+
+        entries = []
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(self.profile_dir, name))
+            except OSError:
+                continue  # Supprimé entre-temps (autre worker)
+            entries.append({
+                'name': name,
+                'bytes': stat.st_size,
+                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                'format': 'pstats' if name.endswith('.prof') else 'folded'
+            })
+        entries.sort(key=lambda entry: entry['modified'], reverse=True)
+        return entries
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Chemin absolu d'un fichier de l'anneau, None si le nom n'en désigne pas un"""
+        if name != os.path.basename(name) or not name.endswith(PROFILE_EXTENSIONS):
+            return None
+        path = os.path.abspath(os.path.join(self.profile_dir, name))
+        return path if os.path.isfile(path) else None
+
+    def get_info(self) -> Dict:
+        return dict(self._stats,
+                    profile_dir=self.profile_dir,
+                    keep=self.keep,
+                    sample_every=self.sample_every,
+                    interval_ms=self.sampler.interval * 1000,
+                    samples=self.sampler.samples,
+                    flamegraph_file=os.path.basename(self.flamegraph_file),
+                    flamegraph_stacks=len(self._flamegraph))
+
+    def install(self, app, is_admin: Callable[[], bool]):
+        """
+        Branche le profilage sur une application Flask
+
+        Args:
+            app: Application Flask
+            is_admin: Vrai si la requête courante vient d'un administrateur (appelé
+                      uniquement quand le profilage est demandé)
+        """
+        from flask import request
+
+        @app.before_request
+        def start_request_profile():
+            req = request._get_current_object()
+            mode = req.headers.get(PROFILE_HEADER)
+            if mode is None and PROFILE_PARAM.encode() in req.query_string:
+                mode = req.args.get(PROFILE_PARAM)
+            if mode is not None:
+                mode = mode if mode in MODES else 'cprofile'
+                if not is_admin():
+                    mode = None
+
+            state = self.begin(mode)
+            if state is not None:
+                req.environ[_STATE_KEY] = state
+
+        @app.after_request
+        def finish_request_profile(response):
+            req = request._get_current_object()
+            state = req.environ.pop(_STATE_KEY, None)
+            if state is not None:
+                rule = req.url_rule
+                name = self.finish(state, f"{req.method} {rule.rule if rule is not None else req.path}")
+                if name:
+                    response.headers['X-Profile'] = name
+            return response
+
+        @app.teardown_request
+        def abort_request_profile(exc):
+            # Exception non gérée : after_request n'a pas été appelé
+            state = request._get_current_object().environ.pop(_STATE_KEY, None)
+            if state is not None:
+                self.finish(state, f"{request.method} {request.path}")
+
+
+# Instance globale
+request_profiler = ESIEERequestProfiler()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Corps JSON pré-sérialisés des endpoints de lecture les plus sollicités
+
+/api/rooms, /api/events/this-week et /api/stats ne changent qu'avec
+l'instantané du cache (et, pour /api/stats, avec la minute courante). Leur
+corps est rendu une fois par clé, puis resservi tel quel avec un ETag fort
+(empreinte du contenu) : une requête If-None-Match correspondante reçoit un
+304 sans aucune sérialisation.
+
+Au rendu, le corps est aussi compressé en gzip (et en brotli si le module
+`brotli` est installé) : la variante adaptée à Accept-Encoding est servie
+sans compression par requête.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, NamedTuple, Tuple
+
+try:
+    import brotli
+except ImportError:  # Optionnel : sans le module, seul gzip est proposé
+    brotli = None
+
+# Compression faite une fois par rendu : niveaux maximaux par défaut
+GZIP_LEVEL = int(os.environ.get('ESIEE_RESPONSE_GZIP_LEVEL', '9'))
+BROTLI_QUALITY = int(os.environ.get('ESIEE_RESPONSE_BROTLI_QUALITY', '11'))
+# En dessous, la compression ne fait rien gagner
+MIN_COMPRESS_BYTES = int(os.environ.get('ESIEE_RESPONSE_MIN_COMPRESS_BYTES', '1024'))
+
+IDENTITY = 'identity'
+
+
+class EncodedBody(NamedTuple):
+    """Variante d'un corps pour un Content-Encoding"""
+    body: bytes
+    etag: str
+    compress_ms: float
+
+
+class RenderedResponse(NamedTuple):
+    """Corps JSON rendu, ses variantes compressées et son ETag"""
+    body: bytes
+    etag: str
+    rendered_at: str
+    variants: Dict[str, EncodedBody]
+
+    @property
+    def encodings(self) -> List[str]:
+        """Encodages disponibles, du plus compact au moins compact"""
+        return sorted(self.variants, key=lambda encoding: len(self.variants[encoding].body))
+
+
+def _compress(encoding: str, body: bytes) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def available_encodings() -> List[str]:
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def render_variants(body: bytes) -> RenderedResponse:
+    """Corps et variantes compressées (ETag distinct par encodage, comme l'exige un ETag fort)"""
+    etag = hashlib.sha1(body).hexdigest()
+    variants = {IDENTITY: EncodedBody(body, etag, 0.0)}
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        for encoding in available_encodings():
+            started = time.perf_counter()
+            compressed = _compress(encoding, body)
+            compress_ms = (time.perf_counter() - started) * 1000
+            if len(compressed) < len(body):
+                variants[encoding] = EncodedBody(compressed, f"{etag}-{encoding}", round(compress_ms, 3))
+
+    return RenderedResponse(body, etag, datetime.now().isoformat(), variants)
+
+
+class ESIEEResponseCache:
+    """Dernier rendu de chaque endpoint, invalidé quand sa clé change"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Hashable, RenderedResponse]] = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'renders': 0, 'not_modified': 0}
+        # Par encodage : réponses servies, octets envoyés, octets et temps de compression évités
+        self._encodings: Dict[str, Dict[str, float]] = {}
+
+    def get(self, name: str, key: Hashable, render: Callable[[], bytes]) -> RenderedResponse:
+        """
+        Corps de l'endpoint pour la clé donnée, rendu par render() si la clé a changé
+
+        Args:
+            name: Nom de l'endpoint
+            key: Ce dont dépend le corps (ex: version de l'instantané)
+            render: Sérialisation complète du corps
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                self._stats['hits'] += 1
+                return entry[1]
+
+        # Rendu hors verrou : deux rendus concurrents d'une même clé donnent le même corps
+        rendered = render_variants(render())
+
+        with self._lock:
+            self._entries[name] = (key, rendered)
+            self._stats['renders'] += 1
+        return rendered
+
+    def record_sent(self, rendered: RenderedResponse, encoding: str, not_modified: bool = False):
+        """Comptabilise une réponse servie (304 compris) pour les statistiques de compression"""
+        variant = rendered.variants[encoding]
+        with self._lock:
+            if not_modified:
+                self._stats['not_modified'] += 1
+
+            stats = self._encodings.setdefault(encoding, {
+                'responses': 0, 'bytes_sent': 0, 'bytes_saved': 0, 'compress_ms_saved': 0.0
+            })
+            stats['responses'] += 1
+            if not not_modified:
+                stats['bytes_sent'] += len(variant.body)
+                stats['bytes_saved'] += len(rendered.body) - len(variant.body)
+                # Compression qu'il aurait fallu refaire pour cette réponse
+                stats['compress_ms_saved'] += variant.compress_ms
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_info(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['encodings'] = {encoding: dict(values, compress_ms_saved=round(values['compress_ms_saved'], 1))
+                                  for encoding, values in self._encodings.items()}
+            stats['endpoints'] = {
+                name: {
+                    'etag': rendered.etag,
+                    'rendered_at': rendered.rendered_at,
+                    'bytes': {encoding: len(variant.body) for encoding, variant in rendered.variants.items()},
+                    'compress_ms': {encoding: variant.compress_ms for encoding, variant in rendered.variants.items()
+                                    if encoding != IDENTITY}
+                }
+                for name, (_, rendered) in self._entries.items()
+            }
+        stats['available_encodings'] = available_encodings()
+        return stats
+
+
+# Instance globale
+response_cache = ESIEEResponseCache()
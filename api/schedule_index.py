@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Index des emplois du temps par salle et par jour de la semaine
+
+Construit une fois par rafraîchissement (et au chargement d'un instantané)
+depuis les événements de chaque salle : pour chaque salle et chaque jour,
+les créneaux triés par début avec les heures déjà formatées. L'emploi du
+temps d'une salle devient une simple lecture de dictionnaire et la
+disponibilité à un instant une recherche dichotomique.
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from itertools import accumulate
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from event_model import Event
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+class DaySchedule(NamedTuple):
+    """Créneaux d'une salle sur un jour, triés par début (minutes depuis minuit)"""
+    entries: List[Dict]
+    starts: List[int]
+    # Fin maximale des créneaux 0..i : un cours long peut couvrir les suivants
+    max_ends: List[int]
+
+
+def _minutes(dt: datetime) -> int:
+    return dt.hour * 60 + dt.minute
+
+
+def empty_week_schedule() -> Dict[str, List[Dict]]:
+    return {day: [] for day in DAY_NAMES}
+
+
+def build_week_schedule(events: Iterable[Event]) -> Dict[str, List[Dict]]:
+    """Emploi du temps client (jour -> créneaux triés) d'une liste d'événements"""
+    return {day: list(day_schedule.entries) for day, day_schedule in zip(DAY_NAMES, _build_days(events))}
+
+
+def _build_days(events: Iterable[Event]) -> List[DaySchedule]:
+    buckets = [[] for _ in DAY_NAMES]
+    for event in events:
+        start_time = event.start_datetime
+        end_time = event.end_datetime
+        if isinstance(start_time, datetime) and isinstance(end_time, datetime):
+            buckets[start_time.weekday()].append(event)
+
+    days = []
+    for bucket in buckets:
+        # Tri stable : à début égal, l'ordre du cache est conservé
+        bucket.sort(key=lambda event: _minutes(event.start_datetime))
+        entries = [{
+            'start': f"{event.start_datetime.hour:02d}:{event.start_datetime.minute:02d}",
+            'end': f"{event.end_datetime.hour:02d}:{event.end_datetime.minute:02d}",
+            'course': event.summary or 'Cours',
+            'full_event': event.to_dict()
+        } for event in bucket]
+        starts = [_minutes(event.start_datetime) for event in bucket]
+        # Un cours qui déborde sur le lendemain occupe la salle jusqu'à minuit
+        ends = [_minutes(event.end_datetime) if event.end_datetime.date() == event.start_datetime.date() else 1440
+                for event in bucket]
+        days.append(DaySchedule(entries, starts, list(accumulate(ends, max))))
+    return days
+
+
+class RoomScheduleIndex:
+    """Salle -> jour -> créneaux triés de la semaine courante"""
+
+    def __init__(self, rooms: Dict[str, List[DaySchedule]]):
+        self.rooms = rooms
+        # Réponses de /api/rooms/<n>/schedule, prêtes à sérialiser
+        self._schedules = {
+            room: {day: day_schedule.entries for day, day_schedule in zip(DAY_NAMES, days)}
+            for room, days in rooms.items()
+        }
+
+    @classmethod
+    def from_room_events(cls, room_events: Dict[str, List[Event]],
+                         previous: Optional['RoomScheduleIndex'] = None,
+                         rebuild_rooms: Optional[set] = None) -> 'RoomScheduleIndex':
+        """
+        Construit l'index depuis les événements de chaque salle
+
+        Args:
+            room_events: Numéro de salle -> événements de la semaine
+            previous: Index précédent, dont les salles hors rebuild_rooms sont reprises
+            rebuild_rooms: Salles modifiées (None = tout reconstruire)
+        """
+        rooms = {}
+        for room, events in room_events.items():
+            if previous is not None and rebuild_rooms is not None and room not in rebuild_rooms \
+                    and room in previous.rooms:
+                rooms[room] = previous.rooms[room]
+            else:
+                rooms[room] = _build_days(events)
+        return cls(rooms)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def schedule(self, room_number: str) -> Dict[str, List[Dict]]:
+        """Emploi du temps de la salle (jours vides inclus)"""
+        return self._schedules.get(room_number) or empty_week_schedule()
+
+    def is_free(self, room_number: str, day: int, minute: int) -> bool:
+        """Vrai si aucun créneau de la salle ne couvre la minute du jour (créneau [début, fin[)"""
+        days = self.rooms.get(room_number)
+        if days is None:
+            return True
+
+        day_schedule = days[day]
+        # Seuls les créneaux commencés avant l'instant peuvent le couvrir
+        started = bisect_right(day_schedule.starts, minute)
+        return started == 0 or day_schedule.max_ends[started - 1] <= minute
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Instantané binaire du cache ESIEE
+
+Remplace le fichier JSON indenté (dates en chaînes, chaque événement recopié
+dans events, week_shards et room_events). Chaque événement n'est stocké
+qu'une fois, en colonnes ; les index (semaines, salles, événements de la
+semaine courante) ne sont que des tableaux d'indices.
+
+Format (version SNAPSHOT_FORMAT_VERSION) :
+    MAGIC (8 octets) | version (uint32) | taille de l'en-tête (uint32)
+    en-tête JSON (métadonnées, tables de chaînes, descripteurs des tableaux)
+    tableaux NumPy bruts, alignés sur 8 octets
+
+L'écriture passe par un fichier temporaire renommé atomiquement (os.replace) ;
+la lecture projette le fichier en mémoire (mmap) et les colonnes du stockage
+en colonnes sont utilisées sans copie.
+"""
+
+import json
+import mmap
+import os
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_model import Event, parse_location
+from event_store import ESIEEEventStore
+from schedule_index import RoomScheduleIndex
+
+MAGIC = b'ESIEESNP'
+SNAPSHOT_FORMAT_VERSION = 1
+
+_PREAMBLE = struct.Struct('<8sII')
+_ALIGN = 8
+_NO_DATE = np.iinfo(np.int64).min
+
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+# Clés de cache_data reconstruites depuis les colonnes (le reste va dans l'en-tête)
+_EVENT_KEYS = ('events', 'week_shards', 'room_events', 'room_schedules', 'room_schedule_index')
+
+
+class SnapshotError(ValueError):
+    """Instantané illisible (format inconnu, version différente, fichier tronqué)"""
+
+
+def _epoch_seconds(value: Optional[datetime]) -> int:
+    if value is None:
+        return _NO_DATE
+    return (value.toordinal() - _EPOCH_ORDINAL) * 86400 + value.hour * 3600 + value.minute * 60 + value.second
+
+
+def schedule_entry(event: Event) -> Dict:
+    """Événement simplifié des emplois du temps client (room_schedules)"""
+    return {
+        'start': event.start_datetime.isoformat() if event.start_datetime else None,
+        'end': event.end_datetime.isoformat() if event.end_datetime else None,
+        'summary': event.summary or 'Cours'
+    }
+
+
+def write_snapshot(path: str, cache_data: Dict, version: int, last_update: Optional[datetime],
+                   event_store: Optional[ESIEEEventStore] = None) -> int:
+    """
+    Écrit l'instantané (fichier temporaire puis renommage atomique)
+
+    Returns:
+        La taille du fichier écrit, en octets
+    """
+    # Table des événements : une entrée par objet Event distinct
+    table: List[Event] = []
+    positions: Dict[int, int] = {}
+
+    def index_of(events: List[Event]) -> np.ndarray:
+        indices = []
+        for event in events:
+            position = positions.get(id(event))
+            if position is None:
+                position = positions[id(event)] = len(table)
+                table.append(event)
+            indices.append(position)
+        return np.array(indices, dtype=np.int32)
+
+    week_keys = list(cache_data.get('week_shards', {}))
+    week_index = [index_of(cache_data['week_shards'][key]) for key in week_keys]
+    events_index = index_of(cache_data.get('events', []))
+    room_names = list(cache_data.get('room_events', {}))
+    room_index = [index_of(cache_data['room_events'][room]) for room in room_names]
+
+    store_index = None
+    if event_store is not None:
+        store_index = index_of(event_store.events)
+
+    summaries: Dict[str, int] = {}
+    locations: Dict[str, int] = {}
+    arrays = {
+        'event_start': np.array([_epoch_seconds(event.start_datetime) for event in table], dtype=np.int64),
+        'event_end': np.array([_epoch_seconds(event.end_datetime) for event in table], dtype=np.int64),
+        'event_summary': np.array([summaries.setdefault(event.summary, len(summaries)) for event in table],
+                                  dtype=np.int32),
+        'event_location': np.array([locations.setdefault(event.room_full, len(locations)) for event in table],
+                                   dtype=np.int32),
+        'week_offsets': np.cumsum([0] + [len(indices) for indices in week_index], dtype=np.int64),
+        'week_events': np.concatenate(week_index) if week_index else np.zeros(0, dtype=np.int32),
+        'current_events': events_index,
+        'room_offsets': np.cumsum([0] + [len(indices) for indices in room_index], dtype=np.int64),
+        'room_events': np.concatenate(room_index) if room_index else np.zeros(0, dtype=np.int32),
+    }
+
+    header = {
+        'last_update': last_update.isoformat() if last_update else None,
+        'version': version,
+        'data': {key: value for key, value in cache_data.items() if key not in _EVENT_KEYS},
+        'uids': [event.uid for event in table],
+        'summaries': list(summaries),
+        'locations': list(locations),
+        'week_keys': week_keys,
+        'room_names': room_names,
+        'store': None
+    }
+
+    if event_store is not None:
+        header['store'] = {
+            'room_names': event_store.room_names,
+            'location_names': event_store.location_names,
+            'summary_names': event_store.summary_names
+        }
+        arrays.update({
+            'store_events': store_index,
+            'store_room_ids': event_store.room_ids,
+            'store_location_ids': event_store.location_ids,
+            'store_summary_ids': event_store.summary_ids,
+            'store_event_ids': event_store.event_ids,
+            'store_starts': event_store.starts,
+            'store_ends': event_store.ends
+        })
+
+    # Descripteurs des tableaux (décalages relatifs au début de la zone des tableaux)
+    descriptors = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        descriptors[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header['arrays'] = descriptors
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    header_bytes += b' ' * (-(_PREAMBLE.size + len(header_bytes)) % _ALIGN)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, SNAPSHOT_FORMAT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays.values():
+            f.write(array.tobytes())
+            f.write(b'\0' * (-array.nbytes % _ALIGN))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    return os.path.getsize(path)
+
+
+def close_mapping(mapping: mmap.mmap) -> bool:
+    """Ferme la projection d'un instantané ; faux si des colonnes NumPy l'utilisent encore"""
+    try:
+        mapping.close()
+    except BufferError:
+        return False
+    return True
+
+
+def read_snapshot(path: str) -> Tuple[Dict, int, Optional[datetime], Optional[ESIEEEventStore], mmap.mmap]:
+    """
+    Charge un instantané
+
+    Returns:
+        (cache_data, version, last_update, event_store, mapping) ; mapping est
+        le fichier projeté sous les colonnes de event_store, à fermer avec
+        close_mapping() quand l'instantané n'est plus utilisé
+
+    Raises:
+        SnapshotError: fichier d'un autre format ou d'une autre version
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < _PREAMBLE.size:
+            raise SnapshotError("instantané tronqué")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, format_version, header_size = _PREAMBLE.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        buffer.close()
+        raise SnapshotError("pas un instantané ESIEE")
+    if format_version != SNAPSHOT_FORMAT_VERSION:
+        buffer.close()
+        raise SnapshotError(f"version {format_version} non supportée (attendue {SNAPSHOT_FORMAT_VERSION})")
+
+    header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + header_size]).decode('utf-8'))
+    base = _PREAMBLE.size + header_size
+
+    def array(name: str) -> np.ndarray:
+        descriptor = header['arrays'][name]
+        dtype = np.dtype(descriptor['dtype'])
+        count = int(np.prod(descriptor['shape'])) if descriptor['shape'] else 1
+        # Vue sur le fichier projeté : pas de copie
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=base + descriptor['offset'])
+
+    # Reconstruire les Event (les datetime identiques sont partagés)
+    datetimes: Dict[int, Optional[datetime]] = {_NO_DATE: None}
+
+    def to_datetime(seconds: int) -> Optional[datetime]:
+        value = datetimes.get(seconds)
+        if value is None and seconds != _NO_DATE:
+            value = datetimes[seconds] = EPOCH + timedelta(seconds=seconds)
+        return value
+
+    summaries = header['summaries']
+    locations = header['locations']
+    table = [
+        Event(uid, to_datetime(start), to_datetime(end), summaries[summary], locations[location],
+              parse_location(locations[location]))
+        for uid, start, end, summary, location in zip(
+            header['uids'], array('event_start').tolist(), array('event_end').tolist(),
+            array('event_summary').tolist(), array('event_location').tolist())
+    ]
+
+    def events_at(indices: np.ndarray) -> List[Event]:
+        return [table[index] for index in indices.tolist()]
+
+    week_offsets = array('week_offsets').tolist()
+    week_events = array('week_events')
+    room_offsets = array('room_offsets').tolist()
+    room_events_index = array('room_events')
+
+    cache_data = dict(header['data'])
+    cache_data['week_shards'] = {
+        key: events_at(week_events[week_offsets[i]:week_offsets[i + 1]])
+        for i, key in enumerate(header['week_keys'])
+    }
+    cache_data['events'] = events_at(array('current_events'))
+    cache_data['room_events'] = {
+        room: events_at(room_events_index[room_offsets[i]:room_offsets[i + 1]])
+        for i, room in enumerate(header['room_names'])
+    }
+    # Les emplois du temps (client et par jour) sont dérivés des événements de chaque salle
+    cache_data['room_schedules'] = {
+        room: sorted((schedule_entry(event) for event in events), key=lambda entry: str(entry['start']))
+        for room, events in cache_data['room_events'].items()
+    }
+    cache_data['room_schedule_index'] = RoomScheduleIndex.from_room_events(cache_data['room_events'])
+
+    event_store = None
+    if header.get('store') is not None:
+        store = header['store']
+        event_store = ESIEEEventStore(
+            events=events_at(array('store_events')),
+            room_names=store['room_names'],
+            location_names=store['location_names'],
+            summary_names=store['summary_names'],
+            room_ids=array('store_room_ids'),
+            location_ids=array('store_location_ids'),
+            summary_ids=array('store_summary_ids'),
+            event_ids=array('store_event_ids'),
+            starts=array('store_starts'),
+            ends=array('store_ends')
+        )
+
+    last_update = datetime.fromisoformat(header['last_update']) if header.get('last_update') else None
+    return cache_data, header.get('version', 0), last_update, event_store, buffer
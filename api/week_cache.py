@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cache LRU des semaines hors de l'horizon préchargé
+
+Les semaines au-delà de ESIEE_PREFETCH_WEEKS (ou passées) étaient
+récupérées en amont à chaque requête. Elles sont désormais gardées en
+mémoire, au plus ESIEE_WEEK_CACHE_SIZE semaines, avec une durée de vie
+selon la semaine : longue pour les semaines passées (l'emploi du temps ne
+bouge plus), courte pour la semaine courante, intermédiaire pour les
+semaines à venir.
+
+Une seule récupération amont par semaine à la fois : les requêtes
+concurrentes pour la même semaine attendent le résultat de la première.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from event_model import Event
+
+logger = logging.getLogger(__name__)
+
+WEEK_CACHE_SIZE = int(os.environ.get('ESIEE_WEEK_CACHE_SIZE', '16'))
+WEEK_CACHE_PAST_TTL_HOURS = float(os.environ.get('ESIEE_WEEK_CACHE_PAST_TTL_HOURS', '24'))
+WEEK_CACHE_CURRENT_TTL_MINUTES = float(os.environ.get('ESIEE_WEEK_CACHE_CURRENT_TTL_MINUTES', '15'))
+WEEK_CACHE_FUTURE_TTL_MINUTES = float(os.environ.get('ESIEE_WEEK_CACHE_FUTURE_TTL_MINUTES', '60'))
+
+
+class _Flight:
+    """Récupération en cours d'une semaine, partagée par les requêtes concurrentes"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.events: Optional[List[Event]] = None
+
+
+class ESIEEWeekCache:
+    """Semaines (clé ISO) -> événements, en LRU borné avec durée de vie par semaine"""
+
+    def __init__(self, max_weeks: int = WEEK_CACHE_SIZE,
+                 past_ttl_hours: float = WEEK_CACHE_PAST_TTL_HOURS,
+                 current_ttl_minutes: float = WEEK_CACHE_CURRENT_TTL_MINUTES,
+                 future_ttl_minutes: float = WEEK_CACHE_FUTURE_TTL_MINUTES):
+        self.max_weeks = max(1, max_weeks)
+        self.past_ttl = past_ttl_hours * 3600
+        self.current_ttl = current_ttl_minutes * 60
+        self.future_ttl = future_ttl_minutes * 60
+
+        # Clé ISO -> (événements, expiration en temps monotone), du moins au plus récemment utilisé
+        self._entries: 'OrderedDict[str, Tuple[List[Event], float]]' = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'loads': 0,
+            'load_failures': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+    def ttl_for(self, monday: datetime, current_monday: datetime) -> float:
+        """Durée de vie (secondes) d'une semaine selon sa position par rapport à la semaine courante"""
+        if monday < current_monday:
+            return self.past_ttl
+        if monday == current_monday:
+            return self.current_ttl
+        return self.future_ttl
+
+    def get(self, week_key: str, ttl: float, loader: Callable[[], Optional[List[Event]]]) -> List[Event]:
+        """
+        Événements de la semaine, récupérés via loader en cas d'absence ou d'expiration
+
+        Args:
+            week_key: Clé ISO de la semaine (ex: "2025-W41")
+            ttl: Durée de vie de l'entrée, en secondes
+            loader: Récupération amont ; None en cas d'échec (rien n'est alors mis en cache)
+        """
+        with self._lock:
+            entry = self._entries.get(week_key)
+            if entry is not None:
+                if entry[1] > time.monotonic():
+                    self._entries.move_to_end(week_key)
+                    self._stats['hits'] += 1
+                    return entry[0]
+                del self._entries[week_key]
+                self._stats['expirations'] += 1
+
+            self._stats['misses'] += 1
+            flight = self._inflight.get(week_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[week_key] = _Flight()
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            flight.done.wait()
+            return flight.events if flight.events is not None else []
+
+        events = None
+        try:
+            events = loader()
+        except Exception as e:
+            logger.warning(f"⚠️ Échec de la récupération de la semaine {week_key}: {e}")
+        finally:
+            with self._lock:
+                self._stats['loads'] += 1
+                if events is None:
+                    self._stats['load_failures'] += 1
+                else:
+                    self._store(week_key, events, ttl)
+                del self._inflight[week_key]
+            flight.events = events
+            flight.done.set()
+
+        return events if events is not None else []
+
+    def _store(self, week_key: str, events: List[Event], ttl: float):
+        # Appelé sous self._lock
+        self._entries[week_key] = (events, time.monotonic() + ttl)
+        self._entries.move_to_end(week_key)
+        while len(self._entries) > self.max_weeks:
+            evicted, _ = self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+            logger.info(f"🗑️ Semaine {evicted} évincée du cache LRU")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_info(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['weeks'] = list(self._entries)
+            stats['in_flight'] = len(self._inflight)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['max_weeks'] = self.max_weeks
+        stats['ttl_seconds'] = {'past': self.past_ttl, 'current': self.current_ttl, 'future': self.future_ttl}
+        return stats